@@ -0,0 +1,64 @@
+"""
+Per-command latency of the two driver backends: chromedriver ("webdriver") and the direct
+DevTools websocket ("cdp").
+
+Both backends launch Chrome the same way; only the path of the commands differs. Each command
+runs RUNS times against a small fixture page and the median is printed per backend.
+
+Run: python benchmarks/backend_latency.py
+"""
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.util.selenium import get_selenium_config, get_web_driver, shutdown_web_drivers
+from tools.util.screenshot import get_b64_screenshot
+
+RUNS = 50
+FIXTURE_URL = "data:text/html,<title>Fixture</title><button onclick=\"this.textContent='Clicked'\">Button</button>" + "<p>Text</p>" * 200
+
+
+def commands(wd):
+    return {
+        "execute_script": lambda: wd.execute_script("return document.title;"),
+        "execute_async_script": lambda: wd.execute_async_script("arguments[arguments.length - 1](1);"),
+        "current_url": lambda: wd.current_url,
+        "execute_cdp_cmd": lambda: wd.execute_cdp_cmd("Runtime.evaluate", {"expression": "1"}),
+        "element click": lambda: wd.execute_script("return document.querySelector('button');").click(),
+        "screenshot": lambda: get_b64_screenshot(wd),
+        "get (navigate)": lambda: wd.get(FIXTURE_URL),
+    }
+
+
+def measure(backend):
+    config = get_selenium_config()
+    config["backend"] = backend
+    config["warm_pool_size"] = 0
+    wd = get_web_driver()
+    try:
+        wd.get(FIXTURE_URL)
+        medians = {}
+        for name, command in commands(wd).items():
+            timings = []
+            for _ in range(RUNS):
+                started = time.perf_counter()
+                command()
+                timings.append((time.perf_counter() - started) * 1000)
+            medians[name] = statistics.median(timings)
+        return medians
+    finally:
+        shutdown_web_drivers()
+
+
+def main():
+    results = {backend: measure(backend) for backend in ("webdriver", "cdp")}
+    print(f"{'command':<22}{'webdriver':>12}{'cdp':>12}")
+    for name in results["webdriver"]:
+        print(f"{name:<22}{results['webdriver'][name]:>9.2f} ms{results['cdp'][name]:>9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Before/after timing of remove_highlight_and_labels on a large fixture page.
+
+The fixture holds ~20k interactive nodes, some of them with borders set inline by the "site".
+The previous cleanup swept every candidate in the document; the current one only reverts what
+the highlighter recorded. The script also checks that the site's own borders survive.
+
+Run: python benchmarks/highlight_cleanup.py
+"""
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.util.selenium import get_web_driver, shutdown_web_drivers
+from tools.util.highlights import highlight_elements_with_labels, remove_highlight_and_labels
+
+SELECTOR = 'a, button, div[onclick], div[role="button"], div[tabindex], span[onclick], span[role="button"], span[tabindex]'
+RUNS = 5
+
+# 5000 rows of a link, a button, an input and a tabindex span; every 10th link has an inline border
+BUILD_PAGE_SCRIPT = """
+document.body.innerHTML = '';
+var rows = arguments[0];
+var fragment = document.createDocumentFragment();
+for (var i = 0; i < rows; i++) {
+    var row = document.createElement('div');
+    var link = document.createElement('a');
+    link.href = '#row-' + i;
+    link.textContent = 'Row ' + i;
+    if (i % 10 === 0) link.style.border = '1px dashed blue';
+    var button = document.createElement('button');
+    button.textContent = 'Open ' + i;
+    var input = document.createElement('input');
+    input.value = 'Value ' + i;
+    var span = document.createElement('span');
+    span.tabIndex = 0;
+    span.textContent = 'Details ' + i;
+    row.append(link, button, input, span);
+    fragment.appendChild(row);
+}
+document.body.appendChild(fragment);
+return document.querySelectorAll('a, button, input, span[tabindex]').length;
+"""
+
+COUNT_SITE_BORDERS_SCRIPT = "return document.querySelectorAll('a[style*=\"dashed\"]').length;"
+
+# The cleanup before targeted tracking: a whole-document selector sweep
+LEGACY_CLEANUP_SCRIPT = """
+document.querySelectorAll('.highlight-label').forEach(label => label.remove());
+var highlightStyle = document.getElementById('highlight-style');
+if (highlightStyle) {
+    highlightStyle.remove();
+}
+document.querySelectorAll('a, button, input, textarea, div[onclick], div[role="button"], div[tabindex], ' +
+    'span[onclick], span[role="button"], span[tabindex]').forEach(element => {
+    element.style.border = '';
+});
+"""
+
+
+def time_cleanup(wd, cleanup):
+    timings = []
+    for _ in range(RUNS):
+        wd.execute_script(BUILD_PAGE_SCRIPT, 5000)
+        highlight_elements_with_labels(wd, SELECTOR, overlay=False)
+        started = time.perf_counter()
+        cleanup()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings, wd.execute_script(COUNT_SITE_BORDERS_SCRIPT)
+
+
+def main():
+    wd = get_web_driver()
+    try:
+        wd.get("about:blank")
+        nodes = wd.execute_script(BUILD_PAGE_SCRIPT, 5000)
+        print(f"Fixture page built with {nodes} interactive nodes.")
+
+        legacy, legacy_borders = time_cleanup(wd, lambda: wd.execute_script(LEGACY_CLEANUP_SCRIPT))
+        current, current_borders = time_cleanup(wd, lambda: remove_highlight_and_labels(wd, overlay=False))
+
+        print(f"Whole-document sweep: median {statistics.median(legacy):7.1f} ms, site borders left: {legacy_borders}/500")
+        print(f"Targeted cleanup:     median {statistics.median(current):7.1f} ms, site borders left: {current_borders}/500")
+    finally:
+        shutdown_web_drivers()
+
+
+if __name__ == "__main__":
+    main()
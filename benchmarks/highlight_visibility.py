@@ -0,0 +1,136 @@
+"""
+Micro-benchmark for the visibility computation of highlight_elements_with_labels.
+
+Builds a synthetic page with ~10k nodes (deeply nested containers, links and buttons, a share of
+them hidden through an ancestor) and compares the previous per-element ancestor walk with the
+current memoized, read-then-write implementation.
+
+Run: python benchmarks/highlight_visibility.py
+"""
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.util.selenium import get_web_driver, shutdown_web_drivers
+from tools.util.highlights import highlight_elements_with_labels, remove_highlight_and_labels
+
+SELECTOR = 'a, button, div[onclick], div[role="button"], div[tabindex], span[onclick], span[role="button"], span[tabindex]'
+RUNS = 5
+
+# 500 sections x 20 nodes, each candidate nested 12 levels deep; every 7th section is hidden
+BUILD_PAGE_SCRIPT = """
+document.body.innerHTML = '';
+document.body.style.margin = '0';
+var sections = arguments[0], depth = arguments[1], hiddenEvery = arguments[2];
+var fragment = document.createDocumentFragment();
+for (var s = 0; s < sections; s++) {
+    var root = document.createElement('section');
+    if (s % hiddenEvery === 0) root.style.display = 'none';
+    var parent = root;
+    for (var d = 0; d < depth; d++) {
+        var wrapper = document.createElement('div');
+        parent.appendChild(wrapper);
+        parent = wrapper;
+    }
+    for (var i = 0; i < 4; i++) {
+        var link = document.createElement('a');
+        link.href = '#item-' + s + '-' + i;
+        link.textContent = 'Item ' + s + '.' + i;
+        parent.appendChild(link);
+        var button = document.createElement('button');
+        button.textContent = 'Action ' + s + '.' + i;
+        parent.appendChild(button);
+    }
+    fragment.appendChild(root);
+}
+document.body.appendChild(fragment);
+return document.getElementsByTagName('*').length;
+"""
+
+# The implementation before the visibility engine: full ancestor walk, run twice per element,
+# with label creation interleaved with layout reads.
+LEGACY_HIGHLIGHT_SCRIPT = """
+var selector = arguments[0];
+function isElementVisible(element) {
+    var rect = element.getBoundingClientRect();
+    if (rect.width <= 0 || rect.height <= 0 ||
+        rect.top >= (window.innerHeight || document.documentElement.clientHeight) ||
+        rect.bottom <= 0 ||
+        rect.left >= (window.innerWidth || document.documentElement.clientWidth) ||
+        rect.right <= 0) {
+        return false;
+    }
+    var parent = element;
+    while (parent) {
+        var style = window.getComputedStyle(parent);
+        if (style.display === 'none' || style.visibility === 'hidden') {
+            return false;
+        }
+        parent = parent.parentElement;
+    }
+    return true;
+}
+function createAndAdjustLabel(element, index) {
+    if (!isElementVisible(element)) return;
+    element.classList.add('highlighted-element');
+    var label = document.createElement('div');
+    label.className = 'highlight-label';
+    label.textContent = index.toString();
+    var rect = element.getBoundingClientRect();
+    label.style.position = 'absolute';
+    label.style.top = (rect.top + window.scrollY - 25) + 'px';
+    label.style.left = (rect.left + window.scrollX) + 'px';
+    document.body.appendChild(label);
+}
+var index = 1;
+document.querySelectorAll(selector).forEach(element => {
+    if (!element.dataset.highlighted && isElementVisible(element)) {
+        element.dataset.highlighted = 'true';
+        createAndAdjustLabel(element, index++);
+    }
+});
+return index - 1;
+"""
+
+RESET_SCRIPT = """
+document.querySelectorAll('.highlight-label').forEach(label => label.remove());
+document.querySelectorAll('[data-highlighted]').forEach(element => {
+    element.classList.remove('highlighted-element');
+    element.removeAttribute('data-highlighted');
+});
+"""
+
+
+def time_runs(wd, run):
+    timings = []
+    for _ in range(RUNS):
+        wd.execute_script(RESET_SCRIPT)
+        started = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def main():
+    wd = get_web_driver()
+    try:
+        wd.get("about:blank")
+        nodes = wd.execute_script(BUILD_PAGE_SCRIPT, 500, 12, 7)
+        print(f"Synthetic page built with {nodes} nodes.")
+
+        legacy = time_runs(wd, lambda: wd.execute_script(LEGACY_HIGHLIGHT_SCRIPT, SELECTOR))
+        current = time_runs(wd, lambda: highlight_elements_with_labels(wd, SELECTOR))
+        remove_highlight_and_labels(wd)
+
+        print(f"Legacy ancestor walk: median {statistics.median(legacy):8.1f} ms over {RUNS} runs")
+        print(f"Visibility engine:    median {statistics.median(current):8.1f} ms over {RUNS} runs")
+        print(f"Speedup: {statistics.median(legacy) / statistics.median(current):.1f}x")
+    finally:
+        shutdown_web_drivers()
+
+
+if __name__ == "__main__":
+    main()
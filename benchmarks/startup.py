@@ -0,0 +1,89 @@
+"""
+Startup cost of the agent: import time of the entry modules and time to the first navigation.
+
+Each measurement runs in a fresh interpreter, so nothing is imported or launched beforehand.
+The first navigation is timed twice: the first run may resolve chromedriver with
+webdriver_manager, the second one uses the path cached on disk.
+
+Run: python benchmarks/startup.py
+"""
+import os
+import re
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = ["main", "tools", "tools.ReadURL", "tools.util.selenium"]
+TOP_IMPORTS = 10
+
+FIRST_NAVIGATION_SCRIPT = """
+import time
+started = time.perf_counter()
+from tools.util.selenium import get_web_driver, shutdown_web_drivers
+imported = time.perf_counter()
+wd = get_web_driver()
+launched = time.perf_counter()
+wd.get("data:text/html,<p>Hello</p>")
+navigated = time.perf_counter()
+shutdown_web_drivers()
+print(f"{imported - started:.3f} {launched - imported:.3f} {navigated - launched:.3f}")
+"""
+
+
+def import_times(module):
+    """
+    Runs python -X importtime for a module and returns (total seconds, [(seconds, imported module)]).
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    entries = []
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|(\s*)(\S+)", line)
+        if match:
+            entries.append((int(match.group(1)) / 1e6, len(match.group(2)), match.group(3)))
+    top_level = [(seconds, name) for seconds, depth, name in entries if depth == 1]
+    return sum(seconds for seconds, _ in top_level), sorted(top_level, reverse=True)
+
+
+def first_navigation():
+    """
+    Returns (import, launch, navigation) seconds measured in a fresh interpreter.
+    """
+    result = subprocess.run(
+        [sys.executable, "-c", FIRST_NAVIGATION_SCRIPT], cwd=REPO_ROOT, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return tuple(float(value) for value in result.stdout.split()[-3:])
+
+
+def main():
+    for module in MODULES:
+        try:
+            total, top = import_times(module)
+        except RuntimeError as e:
+            print(f"import {module}: failed ({e})")
+            continue
+        print(f"import {module}: {total * 1000:.0f} ms")
+        for seconds, name in top[:TOP_IMPORTS]:
+            print(f"    {seconds * 1000:8.1f} ms  {name}")
+
+    for run in ("first", "second"):
+        try:
+            imported, launched, navigated = first_navigation()
+        except RuntimeError as e:
+            print(f"Time to first navigation ({run} run): failed ({e})")
+            continue
+        print(
+            f"Time to first navigation ({run} run): {(imported + launched + navigated) * 1000:.0f} ms "
+            f"(import {imported * 1000:.0f} ms, launch {launched * 1000:.0f} ms, navigation {navigated * 1000:.0f} ms)"
+        )
+
+
+if __name__ == "__main__":
+    main()
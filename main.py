@@ -168,17 +168,25 @@
 import base64
 import re
 import os
-import streamlit as st
+import uuid
 from dotenv import load_dotenv
-from crewai import Agent
-from tools.util.selenium import set_selenium_config, get_web_driver, set_web_driver
-from tools.util.highlights import highlight_elements_with_labels, remove_highlight_and_labels
-from tools.util.screenshot import get_b64_screenshot
-from tools import (
-    ClickElement, ExportFile, GoBack, ReadURL, Scroll,
-    SelectDropdown, SendKeys, SolveCaptcha, WebPageSummarizer,
+from tools.util.selenium import (
+    set_selenium_config, get_selenium_config, get_web_driver, set_web_driver, browsing_session,
+    checkin_web_driver, start_pool_warmer,
+)
+from tools.util.highlights import (
+    highlight_elements_with_labels, remove_highlight_and_labels, is_overlay_mode, get_highlight_viewport,
+    HIGHLIGHT_SELECTORS,
+)
+from tools.util.history_cache import remember_page
+from tools.util.resources import get_session_resource_policy, set_session_resource_policy
+from tools.util.screenshot import (
+    get_b64_screenshot, draw_element_labels, get_screenshot_file_extension, is_duplicate_screenshot,
+    get_last_screenshot_hash, get_last_screenshot_url,
 )
-from langchain_openai import ChatOpenAI
+
+# crewai, langchain_openai, streamlit and the tools are imported where they are first used, so
+# importing this module (e.g. from browsing_agent_test.py) stays fast
 
 # Load environment variables
 load_dotenv()
@@ -188,6 +196,13 @@ class BrowsingAgent:
 
     def __init__(self, selenium_config=None):
         """Initialize the BrowsingAgent with CrewAI-compatible tools and OpenRouter LLM."""
+        from crewai import Agent
+        from langchain_openai import ChatOpenAI
+        from tools import (
+            ActionPlan, ClickElement, ExportFile, GoBack, ReadURL, Scroll,
+            SelectDropdown, SendKeys, SolveCaptcha, WebPageSummarizer,
+        )
+
         # Initialize OpenRouter LLM
         openrouter_llm = ChatOpenAI(
             model="anthropic/claude-3.5-sonnet",
@@ -206,7 +221,7 @@ class BrowsingAgent:
             goal="Help users browse the web and complete tasks easily",
             backstory="I'm your friendly web assistant. I can help you search, shop, read, and interact with websites.",
             tools=[
-                ClickElement(), ExportFile(), GoBack(), ReadURL(),
+                ActionPlan(), ClickElement(), ExportFile(), GoBack(), ReadURL(),
                 Scroll(), SelectDropdown(), SendKeys(), SolveCaptcha(),
                 WebPageSummarizer(),
             ],
@@ -215,10 +230,35 @@ class BrowsingAgent:
         if selenium_config:
             set_selenium_config(selenium_config)
 
-    def process_task(self, user_input: str) -> str:
+        # Launch browsers in the background, so the first browsing action does not wait for Chrome
+        start_pool_warmer()
+
+        # Each agent browses in its own session, so it gets its own pooled WebDriver
+        self.session_id = uuid.uuid4().hex
+
+    def process_task(self, user_input: str, resource_policy=None) -> str:
         """
         Process user input and convert it to appropriate agent commands.
+
+        resource_policy overrides selenium_config["resource_policy"] for this task only,
+        e.g. "text-only" for a summary.
         """
+        with browsing_session(self.session_id):
+            if resource_policy is None:
+                return self._process_task(user_input)
+
+            previous_policy = get_session_resource_policy()
+            set_session_resource_policy(resource_policy)
+            try:
+                return self._process_task(user_input)
+            finally:
+                set_session_resource_policy(previous_policy)
+
+    def close(self):
+        """Return this agent's WebDriver to the pool."""
+        checkin_web_driver(self.session_id)
+
+    def _process_task(self, user_input: str) -> str:
         try:
             # Analyze user input and create appropriate instructions
             if "search for" in user_input.lower() or "find" in user_input.lower():
@@ -272,8 +312,119 @@ class BrowsingAgent:
         """Handle form filling tasks"""
         return "Please provide the website URL and the information you want to fill in the form."
 
+    def process_command(self, command: str) -> str:
+        """Process specific browsing-related commands."""
+        with browsing_session(self.session_id):
+            return self._process_command(command)
+
+    def _process_command(self, command: str) -> str:
+        wd = get_web_driver()
+        # Keep element numbers and page observers between highlights, so re-highlighting after
+        # a scroll or an SPA update only labels what changed
+        incremental = get_selenium_config().get("incremental_highlights", True)
+
+        if command == "[send screenshot]":
+            remove_highlight_and_labels(wd, keep_index=incremental)
+            if self.take_screenshot(skip_unchanged=True):
+                response_text = "Here is the screenshot of the current web page."
+            else:
+                # The matching screenshot may be one of an earlier visit to this page, e.g. after going back
+                response_text = (
+                    f"The page looks the same as the screenshot of {get_last_screenshot_url()} you already got, "
+                    "so no new screenshot was sent."
+                )
+
+            # Remember what the model saw of this page, in case it comes back to it
+            remember_page(wd, screenshot_hash=get_last_screenshot_hash())
+
+        elif command == "[highlight clickable elements]":
+            elements = highlight_elements_with_labels(
+                wd, HIGHLIGHT_SELECTORS["clickable elements"], incremental=incremental
+            )
+            response_text = self._get_highlighted_elements_response(elements)
+            remember_page(wd, HIGHLIGHT_SELECTORS["clickable elements"], elements)
+
+        elif command == "[highlight text fields]":
+            elements = highlight_elements_with_labels(wd, HIGHLIGHT_SELECTORS["text fields"], incremental=incremental)
+            response_text = self._get_highlighted_elements_response(elements)
+            remember_page(wd, HIGHLIGHT_SELECTORS["text fields"], elements)
+
+        elif command == "[highlight dropdowns]":
+            elements = highlight_elements_with_labels(wd, HIGHLIGHT_SELECTORS["dropdowns"], incremental=incremental)
+            response_text = self._get_highlighted_dropdowns_response(elements)
+            remember_page(wd, HIGHLIGHT_SELECTORS["dropdowns"], elements)
+
+        else:
+            return command
+
+        # In overlay mode the page is left untouched, the labels only exist on the screenshot
+        if command != "[send screenshot]" and is_overlay_mode():
+            self.take_screenshot(elements)
+
+        set_web_driver(wd)
+        return response_text
+
+    def take_screenshot(self, elements=None, skip_unchanged=False):
+        """
+        Take a screenshot of the current web page and save it, with element labels drawn on it if given.
+        With skip_unchanged, nothing is saved when the page looks the same as in the last screenshot sent.
+        Returns whether a screenshot was saved.
+        """
+        wd = get_web_driver()
+        screenshot = get_b64_screenshot(wd)
+        if skip_unchanged and is_duplicate_screenshot(screenshot, url=wd.current_url):
+            return False
+        if elements is not None:
+            viewport = get_highlight_viewport(wd)
+            screenshot = draw_element_labels(screenshot, elements, viewport[0] if viewport else None)
+        screenshot_data = base64.b64decode(screenshot)
+        # The extension follows the configured format (JPEG by default)
+        file_name = os.path.splitext(self.SCREENSHOT_FILE_NAME)[0] + get_screenshot_file_extension()
+        with open(file_name, "wb") as screenshot_file:
+            screenshot_file.write(screenshot_data)
+        return True
+
+    def _get_highlighted_elements_response(self, elements) -> str:
+        """Generate response for highlighted elements from the highlight payload."""
+        elements_formatted = ", ".join(
+            f"{element['index']}: {element['text']}" for element in elements if element["text"]
+        )
+
+        return (
+            "Here is the screenshot of the current web page with highlighted elements. "
+            f"Texts of the elements are: {elements_formatted}."
+        )
+
+    def _get_highlighted_dropdowns_response(self, elements) -> str:
+        """Generate response for highlighted dropdowns from the highlight payload."""
+        dropdowns_formatted = "; ".join(
+            f"{element['index']}: {self._format_dropdown_options(element)}" for element in elements
+        )
+
+        return (
+            "Here is the screenshot of the current web page with highlighted dropdowns. "
+            f"Dropdown options are: {dropdowns_formatted}."
+        )
+
+    def _format_dropdown_options(self, element) -> str:
+        """List a dropdown's options by index, marking the selected and disabled ones."""
+        options = []
+        for i, option in enumerate(element.get("options", [])):
+            label = f"[{i}] {option['text']}"
+            if i == element.get("selectedIndex"):
+                label += " (selected)"
+            if option["disabled"]:
+                label += " (disabled)"
+            options.append(label)
+        more = element.get("optionCount", len(options)) - len(options)
+        if more > 0:
+            options.append(f"... {more} more")
+        return ", ".join(options)
+
 def setup_streamlit():
     """Setup the Streamlit interface"""
+    import streamlit as st
+
     st.set_page_config(page_title="Web Assistant", layout="wide")
     st.title("Your Friendly Web Assistant")
     
@@ -283,6 +434,8 @@ def setup_streamlit():
 
 def show_examples():
     """Show example commands to the user"""
+    import streamlit as st
+
     with st.expander("📝 Example Commands"):
         st.markdown("""
         Try these commands:
@@ -293,6 +446,8 @@ def show_examples():
         """)
 
 def main():
+    import streamlit as st
+
     setup_streamlit()
     show_examples()
 
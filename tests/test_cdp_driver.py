@@ -0,0 +1,86 @@
+import pytest
+
+pytest.importorskip("selenium")
+
+from selenium.webdriver.common.keys import Keys
+
+from tools.util.cdp_driver import CDPDriver, CDPElement, _element_resolution_commands, _key_event_commands
+
+class FakeSession:
+    def __init__(self):
+        self.sent = []
+
+    def send_async(self, method, params=None):
+        self.sent.append((method, params))
+
+
+def fake_driver():
+    # A CDPDriver without Chrome: only the attributes the element bookkeeping uses
+    driver = CDPDriver.__new__(CDPDriver)
+    driver.cdp_session = FakeSession()
+    driver._released_objects = []
+    return driver
+
+
+ENTER_UP = ("Input.dispatchKeyEvent", {
+    "type": "keyUp", "modifiers": 0, "key": "Enter", "code": "Enter", "windowsVirtualKeyCode": 13
+})
+
+
+def test_text_is_inserted_at_once():
+    assert _key_event_commands("hello world") == [("Input.insertText", {"text": "hello world"})]
+
+
+def test_special_keys_are_key_events():
+    assert _key_event_commands("ab" + Keys.RETURN + "c") == [
+        ("Input.insertText", {"text": "ab"}),
+        ("Input.dispatchKeyEvent", {
+            "type": "keyDown", "modifiers": 0, "key": "Enter", "code": "Enter", "windowsVirtualKeyCode": 13,
+            "text": "\r",
+        }),
+        ENTER_UP,
+        ("Input.insertText", {"text": "c"}),
+    ]
+
+
+def test_control_a_selects_all():
+    assert _key_event_commands(Keys.CONTROL + "a") == [
+        ("Input.dispatchKeyEvent", {
+            "type": "keyDown", "modifiers": 2, "key": "a", "code": "KeyA", "commands": ["selectAll"],
+        }),
+        ("Input.dispatchKeyEvent", {"type": "keyUp", "modifiers": 2, "key": "a", "code": "KeyA"}),
+    ]
+
+
+def test_shift_alone_types_text():
+    assert _key_event_commands(Keys.SHIFT + "AB") == [("Input.insertText", {"text": "AB"})]
+
+
+def test_null_releases_the_modifiers():
+    commands = _key_event_commands(Keys.CONTROL + "a" + Keys.NULL + "b")
+    assert commands[-1] == ("Input.insertText", {"text": "b"})
+    assert len(commands) == 3
+
+
+def test_returned_elements_are_deleted_from_the_window_once_resolved():
+    commands = _element_resolution_commands([0, 1])
+    assert [params["expression"] for _, params in commands] == [
+        "window.__cdpReturnedElements[0]",
+        "window.__cdpReturnedElements[1]",
+        "delete window.__cdpReturnedElements",
+    ]
+
+
+def test_remote_objects_of_collected_elements_are_released():
+    driver = fake_driver()
+    kept = CDPElement(driver, "kept")
+    CDPElement(driver, "dropped")
+
+    driver.release_objects()
+    assert driver.cdp_session.sent == [("Runtime.releaseObject", {"objectId": "dropped"})]
+
+    del kept
+    driver.release_objects()
+    assert driver.cdp_session.sent[-1] == ("Runtime.releaseObject", {"objectId": "kept"})
+    driver.release_objects()
+    assert len(driver.cdp_session.sent) == 2
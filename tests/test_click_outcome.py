@@ -0,0 +1,92 @@
+import pytest
+
+pytest.importorskip("selenium")
+
+from selenium.common.exceptions import WebDriverException
+
+from tools.util import readiness
+from tools.util.readiness import describe_click_outcome, wait_for_click_outcome
+
+NO_EFFECT = {
+    "navigated": False, "markedUrl": "https://example.com/", "urlChanged": False,
+    "mutations": 0, "network": False, "navigating": False,
+}
+
+
+class FakeDriver:
+    def __init__(self, effect, handles_after=("main",)):
+        self.effect = effect
+        self.window_handles = list(handles_after)
+
+    def execute_async_script(self, script, *args):
+        if isinstance(self.effect, Exception):
+            raise self.effect
+        return self.effect
+
+
+@pytest.fixture
+def waits(monkeypatch):
+    """Page waits of the click outcome, answered with the readiness state set by the test."""
+    calls = []
+
+    def wait_for_page_ready(wd, timeout=None, token=None, require_navigation=False):
+        calls.append({"token": token, "require_navigation": require_navigation})
+        return {"navigated": False, "url": "https://example.com/", "stable": True, "waited": 0.1, **waits.state}
+
+    waits.state = {}
+    monkeypatch.setattr(readiness, "wait_for_page_ready", wait_for_page_ready)
+    waits.calls = calls
+    return waits
+
+
+def outcome(effect, **kwargs):
+    return wait_for_click_outcome(FakeDriver(effect, **kwargs), "token", ["main"])
+
+
+def test_no_effect_returns_without_waiting(waits):
+    result = outcome(NO_EFFECT)
+    assert result["outcome"] == "no effect" and result["readiness"] is None
+    assert waits.calls == []
+
+
+def test_navigation(waits):
+    waits.state = {"navigated": True, "url": "https://example.com/next"}
+    result = outcome({**NO_EFFECT, "navigated": True})
+    assert result["outcome"] == "navigation"
+    assert waits.calls == [{"token": "token", "require_navigation": True}]
+
+
+def test_unloaded_document_is_a_navigation(waits):
+    waits.state = {"navigated": True}
+    assert outcome(WebDriverException("document unloaded"))["outcome"] == "navigation"
+    assert waits.calls[0]["require_navigation"]
+
+
+def test_navigation_taken_over_by_a_router(waits):
+    waits.state = {"url": "https://example.com/next"}
+    result = outcome({**NO_EFFECT, "navigating": True, "urlChanged": True})
+    assert result["outcome"] == "same-page navigation"
+    assert not waits.calls[0]["require_navigation"]
+
+
+def test_url_changed_once_the_data_arrived(waits):
+    waits.state = {"url": "https://example.com/#results"}
+    assert outcome({**NO_EFFECT, "network": True})["outcome"] == "same-page navigation"
+
+
+def test_page_update(waits):
+    assert outcome({**NO_EFFECT, "mutations": 3})["outcome"] == "page update"
+    assert outcome({**NO_EFFECT, "network": True})["outcome"] == "page update"
+
+
+def test_new_tab_is_not_waited_on(waits):
+    result = outcome({**NO_EFFECT, "mutations": 1}, handles_after=("main", "popup"))
+    assert result["outcome"] == "new tab" and result["window"] == "popup"
+    assert waits.calls == []
+
+
+def test_description():
+    result = {"outcome": "no effect", "waited": 0.4, "readiness": None, "window": None}
+    assert describe_click_outcome(result, "https://example.com/").startswith(
+        "Outcome: no effect (0.40s). Nothing changed on the page, the URL stayed https://example.com/."
+    )
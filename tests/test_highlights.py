@@ -0,0 +1,26 @@
+import pytest
+
+from tools.util.highlights import HIDE_HIGHLIGHTS_SCRIPT, REMOVE_HIGHLIGHTS_SCRIPT, remove_highlight_and_labels
+
+
+class FakeDriver:
+    def __init__(self):
+        self.scripts = []
+
+    def execute_script(self, script, *args):
+        self.scripts.append(script)
+
+
+@pytest.mark.parametrize("overlay", [False, True])
+def test_removing_highlights_runs_the_cleanup(overlay):
+    wd = FakeDriver()
+    remove_highlight_and_labels(wd, overlay=overlay)
+    assert wd.scripts == [REMOVE_HIGHLIGHTS_SCRIPT]
+
+
+def test_hiding_highlights_only_touches_dom_labels():
+    wd = FakeDriver()
+    remove_highlight_and_labels(wd, keep_index=True, overlay=True)
+    assert wd.scripts == []
+    remove_highlight_and_labels(wd, keep_index=True, overlay=False)
+    assert wd.scripts == [HIDE_HIGHLIGHTS_SCRIPT]
@@ -0,0 +1,131 @@
+import os
+
+import pytest
+
+from tools.util import http_cache
+from tools.util.http_cache import HTTPCache, _freshness_lifetime, _store_response
+
+SETTINGS = {"domain_ttl": {}, "max_entry_bytes": 1024}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        self.now += 1
+        return self.now
+
+
+class FakeSession:
+    def __init__(self, body=b""):
+        self.body = body
+        self.sent = []
+
+    def send(self, method, params=None):
+        self.sent.append(method)
+        return {"body": self.body.decode("utf-8"), "base64Encoded": False}
+
+    def send_async(self, method, params=None):
+        self.sent.append(method)
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    # Every call returns a later time, so last_access orders the entries by use
+    monkeypatch.setattr(http_cache, "time", FakeClock())
+    cache = HTTPCache(str(tmp_path), max_bytes=250)
+    yield cache
+    cache._db.close()
+
+
+def stored_blobs(cache):
+    return sorted(name for _, _, names in os.walk(os.path.join(cache.path, "blobs")) for name in names)
+
+
+def indexed_blobs(cache):
+    return sorted(row[0] for row in cache._db.execute("SELECT hash FROM blobs"))
+
+
+def test_max_age_minus_age():
+    assert _freshness_lifetime({"cache-control": "max-age=600", "age": "100"}, "example.com", SETTINGS) == 500
+
+
+def test_s_maxage_before_max_age():
+    headers = {"cache-control": "max-age=60, s-maxage=600"}
+    assert _freshness_lifetime(headers, "example.com", SETTINGS) == 600
+
+
+def test_no_cache_is_stored_only_with_a_validator():
+    assert _freshness_lifetime({"cache-control": "no-cache, max-age=600"}, "example.com", SETTINGS) is None
+    headers = {"cache-control": "no-cache, s-maxage=600", "etag": '"v1"'}
+    assert _freshness_lifetime(headers, "example.com", SETTINGS) == 0
+
+
+def test_domain_ttl_before_response_headers():
+    settings = {**SETTINGS, "domain_ttl": {"example.com": 3600}}
+    headers = {"cache-control": "no-cache, max-age=60"}
+    assert _freshness_lifetime(headers, "example.com", settings) == 3600
+    assert _freshness_lifetime(headers, "static.example.com", settings) == 3600
+    assert _freshness_lifetime(headers, "notexample.com", settings) is None
+
+
+def test_no_store_and_private_before_domain_ttl():
+    settings = {**SETTINGS, "domain_ttl": {"example.com": 3600}}
+    assert _freshness_lifetime({"cache-control": "no-store"}, "example.com", settings) is None
+    assert _freshness_lifetime({"cache-control": "private, max-age=60"}, "example.com", settings) is None
+
+
+def test_expires_relative_to_date():
+    headers = {"expires": "Thu, 01 Jan 2026 01:00:00 GMT", "date": "Thu, 01 Jan 2026 00:00:00 GMT"}
+    assert _freshness_lifetime(headers, "example.com", SETTINGS) == 3600
+
+
+def test_evicts_least_recently_used_entries(cache):
+    for key, body in (("a", b"a" * 100), ("b", b"b" * 100)):
+        cache.store(key, 200, {}, body, 2000)
+    cache.lookup("a")
+
+    cache.store("c", 200, {}, b"c" * 100, 2000)
+
+    assert cache.lookup("b") is None
+    assert cache.lookup("a") is not None and cache.lookup("c") is not None
+    assert cache.size() == 200
+
+
+def test_blob_files_match_the_index(cache):
+    cache.store("a", 200, {}, b"x" * 100, 2000)
+    cache.store("b", 200, {}, b"x" * 100, 2000)
+    cache.store("c", 200, {}, b"y" * 100, 2000)
+    assert stored_blobs(cache) == indexed_blobs(cache)
+    assert len(indexed_blobs(cache)) == 2
+
+    # "a" goes first but its body stays, "b" still uses it; "c" goes next, with its body
+    cache.lookup("c")
+    cache.lookup("b")
+    cache.store("d", 200, {}, b"z" * 100, 2000)
+
+    assert cache.lookup("a") is None and cache.lookup("c") is None
+    assert stored_blobs(cache) == indexed_blobs(cache)
+    assert cache.read_body(cache.lookup("b")["blob"]) == b"x" * 100
+    assert cache.size() == sum(os.path.getsize(cache._blob_path(blob)) for blob in stored_blobs(cache))
+
+
+def test_redirects_are_stored_without_reading_the_body(cache):
+    session = FakeSession()
+    params = {"requestId": "1", "request": {"url": "https://example.com/old"}}
+    headers = {"location": "https://example.com/new", "cache-control": "max-age=600"}
+
+    assert _store_response(session, cache, params, "GET https://example.com/old", 301, headers, SETTINGS) is False
+    assert session.sent == []
+    entry = cache.lookup("GET https://example.com/old")
+    assert entry["status"] == 301 and cache.read_body(entry["blob"]) == b""
+
+
+def test_stores_and_fulfills_responses(cache):
+    session = FakeSession(b"<html></html>")
+    params = {"requestId": "1", "request": {"url": "https://example.com/"}}
+
+    assert _store_response(session, cache, params, "GET https://example.com/", 200, {"etag": '"v1"'}, SETTINGS)
+    assert session.sent == ["Fetch.getResponseBody", "Fetch.fulfillRequest"]
+    assert cache.read_body(cache.lookup("GET https://example.com/")["blob"]) == b"<html></html>"
@@ -0,0 +1,27 @@
+import importlib
+import os
+
+import pytest
+
+# Only the packages in requirements.txt may be missing: an ImportError of anything else (e.g. a
+# name a selenium release does not have) fails here instead of being skipped in the other tests
+for package in ("selenium", "pydantic", "crewai_tools", "openai"):
+    pytest.importorskip(package)
+
+import tools
+
+UTIL_DIRECTORY = os.path.join(os.path.dirname(tools.__file__), "util")
+UTIL_MODULES = sorted(
+    name[:-3] for name in os.listdir(UTIL_DIRECTORY) if name.endswith(".py") and name != "__init__.py"
+)
+
+
+@pytest.mark.parametrize("name", tools.__all__)
+def test_tool_modules_import(name):
+    module = importlib.import_module(f"tools.{name}")
+    assert getattr(module, name) is not None
+
+
+@pytest.mark.parametrize("name", UTIL_MODULES)
+def test_util_modules_import(name):
+    importlib.import_module(f"tools.util.{name}")
@@ -0,0 +1,151 @@
+import threading
+import time
+
+import pytest
+
+# Checking a driver in clears the session's history cache, whose module needs selenium
+pytest.importorskip("selenium")
+
+from tools.util import selenium as pool
+
+
+class FakeDriver:
+    def __init__(self, fail_reset=False):
+        self.fail_reset = fail_reset
+        self.resets = 0
+        self.quit_called = False
+
+    def quit(self):
+        self.quit_called = True
+
+
+@pytest.fixture
+def created(monkeypatch):
+    """Drivers launched by the pool, which uses fakes instead of Chrome."""
+    drivers = []
+
+    def create_web_driver():
+        drivers.append(FakeDriver())
+        return drivers[-1]
+
+    def reset_web_driver(wd):
+        if wd.fail_reset:
+            raise RuntimeError("tab crashed")
+        wd.resets += 1
+
+    monkeypatch.setattr(pool, "_create_web_driver", create_web_driver)
+    monkeypatch.setattr(pool, "_apply_session_settings", lambda wd, session_id: None)
+    monkeypatch.setattr(pool, "_reset_web_driver", reset_web_driver)
+    monkeypatch.setattr(pool, "_idle_drivers", [])
+    monkeypatch.setattr(pool, "_session_drivers", {})
+    monkeypatch.setattr(pool, "_session_last_used", {})
+    monkeypatch.setattr(pool, "_pending_creations", 0)
+    monkeypatch.setattr(pool, "_pending_resets", 0)
+    monkeypatch.setattr(
+        pool, "selenium_config",
+        {**pool.selenium_config, "pool_size": 2, "checkout_timeout": 0.2, "session_idle_timeout": 900},
+    )
+    return drivers
+
+
+def test_session_keeps_its_driver(created):
+    first = pool.checkout_web_driver("a")
+    assert pool.checkout_web_driver("a") is first
+    assert pool.checkout_web_driver("b") is not first
+    assert len(created) == 2
+
+
+def test_checkout_times_out_when_the_pool_is_exhausted(created):
+    pool.checkout_web_driver("a")
+    pool.checkout_web_driver("b")
+
+    started = time.monotonic()
+    with pytest.raises(TimeoutError):
+        pool.checkout_web_driver("c")
+    assert time.monotonic() - started < 2
+    assert "c" not in pool._session_last_used
+
+
+def test_checked_in_driver_is_reset_and_reused(created):
+    wd = pool.checkout_web_driver("a")
+    pool.checkin_web_driver("a")
+
+    assert wd.resets == 1 and not wd.quit_called
+    assert pool.get_pool_stats()["idle"] == 1
+    assert pool.checkout_web_driver("b") is wd
+    assert len(created) == 1
+
+
+def test_driver_failing_its_reset_is_quit(created):
+    wd = pool.checkout_web_driver("a")
+    wd.fail_reset = True
+    pool.checkin_web_driver("a")
+
+    assert wd.quit_called
+    stats = pool.get_pool_stats()
+    assert stats["idle"] == 0 and stats["checked_out"] == 0 and stats["resetting"] == 0
+
+
+def test_checkin_with_quit_frees_the_slot(created):
+    wd = pool.checkout_web_driver("a")
+    pool.checkin_web_driver("a", quit=True)
+
+    assert wd.quit_called and wd.resets == 0
+    assert pool.checkout_web_driver("b") is not wd
+
+
+def test_waiting_checkout_gets_the_driver_checked_in(created, monkeypatch):
+    monkeypatch.setitem(pool.selenium_config, "checkout_timeout", 5)
+    pool.checkout_web_driver("a")
+    wd = pool.checkout_web_driver("b")
+
+    timer = threading.Timer(0.1, pool.checkin_web_driver, args=("b",))
+    timer.start()
+    try:
+        assert pool.checkout_web_driver("c") is wd
+    finally:
+        timer.cancel()
+    assert len(created) == 2
+
+
+def test_idle_sessions_are_checked_in(created, monkeypatch):
+    monkeypatch.setitem(pool.selenium_config, "pool_size", 1)
+    monkeypatch.setitem(pool.selenium_config, "session_idle_timeout", 0.05)
+    wd = pool.checkout_web_driver("a")
+    time.sleep(0.1)
+
+    assert pool.checkout_web_driver("b") is wd
+    assert wd.resets == 1
+    assert "a" not in pool._session_drivers
+
+
+def test_replaced_driver_keeps_its_pool_slot(created, monkeypatch):
+    old = pool.checkout_web_driver("a")
+    pool.checkout_web_driver("b")
+    totals = []
+
+    def create_web_driver():
+        totals.append((old.quit_called, pool._pool_total()))
+        created.append(FakeDriver())
+        return created[-1]
+
+    monkeypatch.setattr(pool, "_create_web_driver", create_web_driver)
+    new = pool._replace_web_driver(old, "a")
+
+    assert totals == [(True, 2)]
+    assert pool.checkout_web_driver("a") is new
+    assert pool._pool_total() == 2
+
+
+def test_failed_replacement_frees_the_slot(created, monkeypatch):
+    old = pool.checkout_web_driver("a")
+
+    def create_web_driver():
+        raise RuntimeError("Chrome did not start")
+
+    monkeypatch.setattr(pool, "_create_web_driver", create_web_driver)
+    with pytest.raises(RuntimeError):
+        pool._replace_web_driver(old, "a")
+
+    assert old.quit_called
+    assert pool._pool_total() == 0
@@ -0,0 +1,59 @@
+import pytest
+
+pytest.importorskip("selenium")
+
+from selenium.common.exceptions import WebDriverException
+
+from tools.util import readiness
+from tools.util.readiness import get_navigation_count, wait_for_page_ready
+
+
+def ready(document, url="https://example.com/", **state):
+    return {"stable": True, "navigated": False, "host": "example.com", "url": url, "document": document, **state}
+
+
+class FakeDriver:
+    def __init__(self, *results):
+        self.results = list(results)
+        self.calls = 0
+
+    def execute_async_script(self, script, *args):
+        self.calls += 1
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+@pytest.fixture(autouse=True)
+def no_tracker(monkeypatch):
+    monkeypatch.setattr(readiness, "install_readiness_tracker", lambda wd: None)
+
+
+def test_waits_again_after_the_document_unloaded():
+    wd = FakeDriver(WebDriverException("javascript error: document unloaded while waiting for result"), ready("b"))
+    state = wait_for_page_ready(wd, timeout=5)
+    assert state["navigated"] and state["stable"]
+    assert wd.calls == 2
+
+
+def test_other_errors_are_raised():
+    wd = FakeDriver(WebDriverException("invalid session id"), ready("a"))
+    with pytest.raises(WebDriverException):
+        wait_for_page_ready(wd, timeout=5)
+    assert wd.calls == 1
+
+
+def test_waits_on_the_same_page_are_one_navigation():
+    wd = FakeDriver(
+        ready("a"),
+        ready("a"),  # A click that only updated the page
+        ready("a", url="https://example.com/#details"),  # A same-page navigation
+        ready("b", url="https://example.com/#details"),  # A reload
+        ready("b", url="https://example.com/#details", navigated=True),
+    )
+    counts = []
+    for _ in range(5):
+        wait_for_page_ready(wd, timeout=5)
+        counts.append(get_navigation_count(wd))
+    assert counts == [1, 1, 2, 3, 4]
@@ -0,0 +1,40 @@
+import pytest
+
+from tools.util.resources import TRACKER_DOMAINS, resolve_resource_policy
+from tools.util.selenium import get_selenium_config
+
+
+def test_defaults_to_the_configured_policy(monkeypatch):
+    monkeypatch.setitem(get_selenium_config(), "resource_policy", "no-media")
+    assert resolve_resource_policy()["resource_types"] == ["Font", "Image", "Media"]
+
+
+def test_full_blocks_nothing():
+    assert resolve_resource_policy("full") == {"resource_types": [], "blocked_domains": [], "allowed_domains": []}
+
+
+def test_preset_blocks_trackers():
+    policy = resolve_resource_policy("text-only")
+    assert "Stylesheet" in policy["resource_types"]
+    assert policy["blocked_domains"] == sorted(set(TRACKER_DOMAINS))
+
+
+def test_lists_replace_the_preset_lists():
+    policy = resolve_resource_policy(
+        {"preset": "no-media", "resource_types": ["Media", "Media"], "blocked_domains": ["ads.example.com"]}
+    )
+    assert policy == {"resource_types": ["Media"], "blocked_domains": ["ads.example.com"], "allowed_domains": []}
+
+
+def test_documents_are_never_blocked():
+    assert resolve_resource_policy({"resource_types": ["Document", "Image"]})["resource_types"] == ["Image"]
+
+
+def test_allowed_domains():
+    policy = resolve_resource_policy({"preset": "no-media", "allowed_domains": ["hotjar.com"]})
+    assert policy["allowed_domains"] == ["hotjar.com"]
+
+
+def test_unknown_preset():
+    with pytest.raises(ValueError, match="Unknown resource policy preset 'images-only'"):
+        resolve_resource_policy("images-only")
@@ -0,0 +1,62 @@
+import base64
+import io
+
+import pytest
+
+np = pytest.importorskip("numpy")
+Image = pytest.importorskip("PIL.Image")
+
+from tools.util.screenshot import compute_dhash, get_dedup_stats, get_last_screenshot_url, is_duplicate_screenshot
+from tools.util.selenium import get_selenium_config
+
+
+def encode(pixels):
+    output = io.BytesIO()
+    Image.fromarray(pixels.astype(np.uint8)).save(output, format="PNG")
+    return base64.b64encode(output.getvalue()).decode("ascii")
+
+
+def gradient(width=320, height=200):
+    return np.tile(np.linspace(0, 255, width), (height, 1))
+
+
+def distance(a, b):
+    return bin(a ^ b).count("1")
+
+
+def test_hash_size():
+    assert compute_dhash(encode(gradient()), hash_size=8).bit_length() <= 64
+    assert compute_dhash(encode(gradient()), hash_size=16).bit_length() <= 256
+
+
+def test_similar_images_have_close_hashes():
+    image = gradient()
+    changed = image.copy()
+    changed[100, 100] = 0
+    assert compute_dhash(encode(image)) == compute_dhash(encode(image))
+    assert distance(compute_dhash(encode(image)), compute_dhash(encode(changed))) <= 2
+
+
+def test_different_images_have_distant_hashes():
+    assert distance(compute_dhash(encode(gradient())), compute_dhash(encode(gradient()[:, ::-1]))) > 100
+
+
+def test_duplicates_of_the_last_screenshot_sent():
+    skipped = get_dedup_stats()["skipped"]
+    page, other_page = encode(gradient()), encode(gradient()[:, ::-1])
+
+    assert not is_duplicate_screenshot(page, session_id="dedup", url="https://example.com/")
+    assert is_duplicate_screenshot(page, session_id="dedup", url="https://example.com/other")
+    assert get_last_screenshot_url("dedup") == "https://example.com/"
+    assert not is_duplicate_screenshot(other_page, session_id="dedup", url="https://example.com/other")
+    assert get_dedup_stats()["skipped"] == skipped + 1
+
+    # Sessions are compared with their own screenshots only
+    assert not is_duplicate_screenshot(other_page, session_id="another session")
+
+
+def test_deduplication_can_be_disabled(monkeypatch):
+    monkeypatch.setitem(get_selenium_config(), "screenshot", {"dedup_threshold": None})
+    page = encode(gradient())
+    assert not is_duplicate_screenshot(page, session_id="disabled")
+    assert not is_duplicate_screenshot(page, session_id="disabled")
@@ -0,0 +1,160 @@
+import http.client
+import http.cookiejar
+import io
+import urllib.request
+import urllib.response
+
+import pytest
+
+from tools.util import static_fetch
+from tools.util.static_fetch import (
+    _extract_page_text_with_html_parser,
+    detect_javascript_requirement,
+    extract_page_text,
+)
+from tools.util.selenium import get_selenium_config
+
+SETTINGS = {"min_text_chars": 200}
+TEXT = "Static article text. " * 20
+
+PAGE = f"""
+<html>
+<head><title>An   article</title><style>body {{ color: red; }}</style></head>
+<body>
+<script>var hidden = "script text";</script>
+<div id="app"><p>{TEXT}</p></div>
+<noscript>Please enable JavaScript for comments.</noscript>
+</body>
+</html>
+"""
+
+SPA_PAGE = """
+<html><head><title>App</title></head><body><div id="root"></div><script src="app.js"></script></body></html>
+"""
+
+
+class FakeResponse:
+    def __init__(self, html, url):
+        self.url = url
+        self.status_code = 200
+        self.headers = {"Content-Type": "text/html; charset=utf-8"}
+        self._content = html.encode("utf-8")
+        self.raw = self
+
+    def read(self, size, decode_content=True):
+        return self._content[:size]
+
+    def close(self):
+        pass
+
+
+class FakeHTTPSession:
+    def __init__(self, html):
+        self.html = html
+        self.requests = 0
+
+    def get(self, url, timeout=None, stream=False):
+        self.requests += 1
+        return FakeResponse(self.html, url)
+
+
+@pytest.mark.parametrize("extract", [extract_page_text, _extract_page_text_with_html_parser])
+def test_extracts_visible_text(extract):
+    title, text, empty_spa_root, noscript_text = extract(PAGE)
+    assert title == "An article"
+    assert text == TEXT.strip()
+    assert not empty_spa_root
+    assert "enable JavaScript" in noscript_text
+
+
+@pytest.mark.parametrize("extract", [extract_page_text, _extract_page_text_with_html_parser])
+def test_detects_empty_spa_root(extract):
+    assert extract(SPA_PAGE)[2]
+
+
+def test_usable_page():
+    assert detect_javascript_requirement(TEXT, False, "", SETTINGS, title="An article") is None
+
+
+def test_empty_spa_root():
+    assert detect_javascript_requirement(TEXT, True, "", SETTINGS) == "single-page application rendered by JavaScript"
+
+
+def test_almost_no_text():
+    assert detect_javascript_requirement("Loading...", False, "", SETTINGS) == "almost no text without JavaScript"
+
+
+def test_noscript_notice_only_counts_on_short_pages():
+    assert detect_javascript_requirement(TEXT, False, "Please enable JavaScript", SETTINGS) == (
+        "page asks to enable JavaScript"
+    )
+    assert detect_javascript_requirement(TEXT * 10, False, "Please enable JavaScript", SETTINGS) is None
+
+
+def test_page_text_mentioning_javascript_or_waiting_is_usable():
+    text = TEXT + "Just a moment: JavaScript is required to post comments."
+    assert detect_javascript_requirement(text, False, "", SETTINGS) is None
+
+
+def test_challenge_pages():
+    assert detect_javascript_requirement(TEXT, False, "", SETTINGS, title="Just a moment...") == (
+        "bot protection challenge"
+    )
+    assert detect_javascript_requirement(TEXT, False, "", SETTINGS, challenge=True) == "bot protection challenge"
+
+
+def test_escalated_host_is_tried_again_after_the_ttl(monkeypatch):
+    session = FakeHTTPSession(SPA_PAGE)
+    monkeypatch.setattr(static_fetch, "_get_http_session", lambda: session)
+    monkeypatch.setattr(static_fetch, "_javascript_hosts", {})
+    monkeypatch.setitem(get_selenium_config(), "tiered_fetch", {"javascript_host_ttl": 3600})
+
+    assert static_fetch.fetch_static_page("https://spa.example.com/a")["reason"] == (
+        "single-page application rendered by JavaScript"
+    )
+    assert static_fetch.fetch_static_page("https://spa.example.com/b")["reason"] == (
+        "site renders its pages with JavaScript"
+    )
+    assert session.requests == 1
+
+    monkeypatch.setitem(static_fetch._javascript_hosts, "spa.example.com", 0)
+    session.html = f"<html><head><title>Rendered on the server</title></head><body><p>{TEXT}</p></body></html>"
+    page = static_fetch.fetch_static_page("https://spa.example.com/c")
+    assert page["reason"] is None and page["title"] == "Rendered on the server"
+    assert session.requests == 2
+
+
+class FakeBrowser:
+    def __init__(self, cookies):
+        self.cookies = cookies
+
+    def execute_cdp_cmd(self, cmd, cmd_args):
+        assert cmd == "Network.getCookies"
+        return {"cookies": [cookie for cookie in self.cookies if cookie["domain"] in cmd_args["urls"][0]]}
+
+
+def test_hosts_with_browser_cookies_go_to_the_browser(monkeypatch):
+    from tools.util import selenium
+
+    session = FakeHTTPSession(f"<html><body><p>{TEXT}</p></body></html>")
+    monkeypatch.setattr(static_fetch, "_get_http_session", lambda: session)
+    monkeypatch.setattr(static_fetch, "_javascript_hosts", {})
+    monkeypatch.setitem(
+        selenium._session_drivers, selenium.get_session_id(), FakeBrowser([{"domain": "shop.example.com"}])
+    )
+
+    assert static_fetch.fetch_static_page("https://shop.example.com/cart")["reason"] == (
+        "browser session has cookies for the site"
+    )
+    assert static_fetch.fetch_static_page("https://news.example.org/")["reason"] is None
+    assert session.requests == 1
+
+
+def test_http_client_keeps_no_cookies():
+    headers = http.client.parse_headers(io.BytesIO(b"Set-Cookie: id=1; Path=/\r\n\r\n"))
+    response = urllib.response.addinfourl(None, headers, "https://example.com/")
+    request = urllib.request.Request("https://example.com/")
+
+    jar = http.cookiejar.CookieJar(static_fetch._NoCookiesPolicy())
+    jar.extract_cookies(response, request)
+    assert not list(jar)
@@ -0,0 +1,291 @@
+import asyncio
+from typing import List, Literal, Optional
+from pydantic import BaseModel, Field, root_validator
+from selenium.webdriver import Keys
+from crewai_tools import tool
+
+from .util.selenium import get_web_driver, set_web_driver, get_selenium_config
+from .util.highlights import (
+    HIGHLIGHT_SELECTORS,
+    highlight_elements_with_labels,
+    remove_highlight_and_labels,
+    execute_on_highlighted_element,
+)
+from .util.history_cache import leave_page
+from .util.readiness import mark_navigation, wait_for_page_ready, describe_readiness, describe_click_outcome
+from .util.page_actions import (
+    BULK_FILL_SCRIPT,
+    ELEMENT_AND_TEXT_SCRIPT,
+    SCROLL_SCRIPT,
+    SELECT_OPTIONS_SCRIPT,
+    click_element,
+    type_with_keys,
+)
+
+# Elements a click step may target by their text, on top of the highlighted clickable elements
+CLICK_TARGET_SELECTOR = (
+    HIGHLIGHT_SELECTORS["clickable elements"]
+    + ', input[type="submit"], input[type="button"], [role="link"], [role="tab"], [role="menuitem"], summary, label'
+)
+
+TEXT_FIELD_SELECTOR = HIGHLIGHT_SELECTORS["text fields"] + ", [contenteditable='true']"
+
+# Finds the visible element whose text, label, placeholder, aria-label, title or name matches a text:
+# an exact match first, then one starting with the text, then one containing it. Among equal
+# matches the element with the shortest text (the most specific one) wins.
+FIND_ELEMENT_BY_TEXT_SCRIPT = """
+var selector = arguments[0];
+function normalize(text) {
+    return String(text || '').replace(/\\s+/g, ' ').trim().toLowerCase();
+}
+var wanted = normalize(arguments[1]);
+
+function labelsOf(element) {
+    var texts = [element.innerText, element.getAttribute('aria-label'), element.getAttribute('placeholder'),
+        element.getAttribute('title'), element.getAttribute('name')];
+    if (['submit', 'button', 'reset'].indexOf(element.type) !== -1) texts.push(element.value);
+    if (element.labels) Array.from(element.labels).forEach(label => texts.push(label.innerText));
+    return texts.map(normalize).filter(Boolean);
+}
+
+var best = null, bestRank = 3, bestLength = Infinity;
+document.querySelectorAll(selector).forEach(function(element) {
+    if (element.checkVisibility ? !element.checkVisibility() : !element.getClientRects().length) return;
+    labelsOf(element).forEach(function(text) {
+        var position = text.indexOf(wanted);
+        var rank = text === wanted ? 0 : position === 0 ? 1 : position !== -1 ? 2 : 3;
+        if (rank < bestRank || (rank === bestRank && rank < 3 && text.length < bestLength)) {
+            best = element;
+            bestRank = rank;
+            bestLength = text.length;
+        }
+    });
+});
+return best;
+"""
+
+# Reads the URL and whether the page shows a text, to check a step's expectations in one call
+CHECK_EXPECTATIONS_SCRIPT = """
+function normalize(text) {
+    return String(text || '').replace(/\\s+/g, ' ').trim().toLowerCase();
+}
+var expected = normalize(arguments[0]);
+var text = document.body ? normalize(document.body.innerText) : '';
+return {url: location.href, hasText: !expected || text.indexOf(expected) !== -1};
+"""
+
+# Visible text of the page, or of the elements matching a CSS selector
+EXTRACT_TEXT_SCRIPT = """
+var selector = arguments[0];
+var elements = selector ? Array.from(document.querySelectorAll(selector)) : [document.body];
+return elements.filter(Boolean).map(element => element.innerText.replace(/\\s+/g, ' ').trim()).filter(Boolean).join('\\n');
+"""
+
+# Characters kept from each extract step
+MAX_EXTRACT_CHARS = 5000
+
+# Characters of the highlighted element texts listed per highlight step
+MAX_HIGHLIGHT_SUMMARY_CHARS = 2000
+
+
+class PlanStep(BaseModel):
+    """
+    One action of an ActionPlan.
+    """
+    action: Literal["navigate", "highlight", "click", "type", "select", "scroll", "back", "extract"] = Field(
+        ..., description="Action to run."
+    )
+    url: Optional[str] = Field(None, description="navigate: URL to open.")
+    target: Optional[str] = Field(
+        None,
+        description="click, type and select: number of a highlighted element, or the visible text or label of the element. "
+                    "highlight: 'clickable elements', 'text fields' or 'dropdowns'. "
+                    "extract: optional CSS selector of the elements to read, the whole page by default.",
+    )
+    value: Optional[str] = Field(None, description="type: text to enter. select: value, text or index of the option.")
+    submit: bool = Field(False, description="type: press Enter after typing.")
+    direction: Literal["up", "down"] = Field("down", description="scroll: direction to scroll.")
+    times: int = Field(1, ge=1, le=20, description="scroll: number of screen heights to scroll.")
+    expect_url: Optional[str] = Field(None, description="Stop the plan unless the URL contains this text after the step.")
+    expect_text: Optional[str] = Field(None, description="Stop the plan unless the page shows this text after the step.")
+
+    @root_validator(skip_on_failure=True)
+    def validate_parameters(cls, values):
+        action = values.get("action")
+        if action == "navigate" and not values.get("url"):
+            raise ValueError("A navigate step needs a url.")
+        if action in ("click", "type", "select") and not values.get("target"):
+            raise ValueError(f"A {action} step needs a target: an element number or the element's visible text.")
+        if action in ("type", "select") and values.get("value") is None:
+            raise ValueError(f"A {action} step needs a value.")
+        if action == "highlight" and values.get("target") not in HIGHLIGHT_SELECTORS:
+            raise ValueError(f"A highlight step needs a target among: {', '.join(HIGHLIGHT_SELECTORS)}.")
+        return values
+
+
+@tool("Run a sequence of browser actions")
+class ActionPlan:
+    """
+    This tool runs several browser actions in one step: navigate, highlight, click, type, select, scroll, back and extract.
+    Use it for routine flows whose steps you can predict, e.g. open a site, click "Business", scroll 3 times and extract the text.
+
+    Target elements by their visible text or label, or by number after a highlight step. Add expect_url or expect_text to a step
+    to check that it led where you expected: the plan stops at the first step that fails or diverges and reports what was done.
+    """
+    steps: List[PlanStep] = Field(
+        ...,
+        min_items=1,
+        max_items=30,
+        description="Ordered list of actions to run.",
+        examples=[[
+            {"action": "navigate", "url": "https://news.example.com"},
+            {"action": "click", "target": "Business", "expect_url": "/business"},
+            {"action": "scroll", "direction": "down", "times": 3},
+            {"action": "extract"},
+        ]],
+    )
+
+    def run(self):
+        wd = get_web_driver()
+        trace = []
+        extracts = []
+        highlighted = False
+        stopped_at = None
+
+        for number, step in enumerate(self.steps, start=1):
+            try:
+                description, extract = self._run_step(wd, step)
+                trace.append(f"{number}. {description}")
+                if extract is not None:
+                    extracts.append(extract)
+                highlighted = highlighted or step.action == "highlight"
+                divergence = self._check_expectations(wd, step)
+            except IndexError:
+                divergence = f"element {step.target} is not a valid element number"
+            except Exception as e:
+                divergence = str(e)
+            if divergence:
+                trace.append(f"{number}. Stopped: {divergence}")
+                stopped_at = number
+                break
+
+        # Highlights made by the last step are kept for the next tool, others are removed like ClickElement does
+        if stopped_at is None and self.steps[-1].action == "highlight":
+            self._shared_state.set("elements_highlighted", HIGHLIGHT_SELECTORS[self.steps[-1].target])
+        elif highlighted:
+            remove_highlight_and_labels(wd)
+            self._shared_state.set("elements_highlighted", "")
+        set_web_driver(wd)
+
+        if stopped_at is None:
+            lines = [f"Plan completed: {len(self.steps)} steps."]
+        else:
+            lines = [f"Plan stopped at step {stopped_at} of {len(self.steps)}."]
+        lines += trace
+        for extract in extracts:
+            lines += ["", "Extracted text:", extract]
+        lines += ["", f"Current URL is {wd.current_url}. To further analyze the page, output '[send screenshot]' command."]
+        return "\n".join(lines)
+
+    async def arun(self):
+        """
+        Async version of run(). The plan's steps depend on each other, so the whole plan runs in the
+        default executor, in the session of the calling task.
+        """
+        return await asyncio.to_thread(self.run)
+
+    def _run_step(self, wd, step):
+        """Runs one step and returns its description and the extracted text, if any."""
+        if step.action == "navigate":
+            # The browser is needed for the next steps, so the page is not read over plain HTTP
+            leave_page(wd)
+            wd.get(step.url)
+            return f"Opened {step.url}. {describe_readiness(wait_for_page_ready(wd))}", None
+
+        if step.action == "back":
+            if wd.execute_cdp_cmd("Page.getNavigationHistory", {})["currentIndex"] == 0:
+                raise ValueError("there is no previous page in the browser history")
+            leave_page(wd)
+            token = mark_navigation(wd)
+            wd.back()
+            readiness = wait_for_page_ready(wd, token=token, require_navigation=True)
+            return f"Went back to {wd.current_url}. {describe_readiness(readiness)}", None
+
+        if step.action == "highlight":
+            incremental = get_selenium_config().get("incremental_highlights", True)
+            elements = highlight_elements_with_labels(wd, HIGHLIGHT_SELECTORS[step.target], incremental=incremental)
+            texts = ", ".join(f"{element['index']}: {element['text']}" for element in elements if element["text"])
+            if len(texts) > MAX_HIGHLIGHT_SUMMARY_CHARS:
+                texts = texts[:MAX_HIGHLIGHT_SUMMARY_CHARS] + "..."
+            return f"Highlighted {len(elements)} {step.target}: {texts}", None
+
+        if step.action == "click":
+            if step.target.strip().isdigit():
+                element, element_text = execute_on_highlighted_element(wd, int(step.target), ELEMENT_AND_TEXT_SCRIPT)
+            else:
+                element, element_text = self._find_element(wd, step.target, CLICK_TARGET_SELECTOR), step.target
+            outcome = click_element(wd, element)
+            return f"Clicked '{element_text}'. {describe_click_outcome(outcome, wd.current_url)}", None
+
+        if step.action == "type":
+            element = self._target_element(wd, step.target, TEXT_FIELD_SELECTOR)
+            reports, _ = wd.execute_script(
+                "var elements = [arguments[0]], args = [[arguments[1]]];" + BULK_FILL_SCRIPT, element, step.value
+            )
+            report = reports[0]
+            if report["path"] == "failed":
+                raise ValueError(f"could not type into '{step.target}': {report['reason']}")
+            if report["path"] == "keys":
+                type_with_keys(element, step.value)
+            description = f"Typed into '{step.target}'."
+            if step.submit:
+                leave_page(wd)
+                token = mark_navigation(wd)
+                element.send_keys(Keys.RETURN)
+                description += f" Pressed Enter. {describe_readiness(wait_for_page_ready(wd, token=token))}"
+            return description, None
+
+        if step.action == "select":
+            element = self._target_element(wd, step.target, "select")
+            report = wd.execute_script(
+                "var elements = [arguments[0]], args = [[arguments[1]]];" + SELECT_OPTIONS_SCRIPT, element, step.value
+            )[0]
+            if "error" in report:
+                raise ValueError(f"could not select '{step.value}' in '{step.target}': {report['error']}")
+            return f"Selected '{report['text']}' in '{step.target}' (matched by {report['by']}).", None
+
+        if step.action == "scroll":
+            scrolled = 0
+            while scrolled < step.times and wd.execute_script(SCROLL_SCRIPT, step.direction):
+                scrolled += 1
+            # Give lazy-loaded content the chance to appear before the next step
+            readiness = wait_for_page_ready(wd)
+            edge = "" if scrolled == step.times else f", then reached the {'top' if step.direction == 'up' else 'bottom'}"
+            return f"Scrolled {step.direction} {scrolled} times{edge}. {describe_readiness(readiness)}", None
+
+        text = wd.execute_script(EXTRACT_TEXT_SCRIPT, step.target or "")
+        if len(text) > MAX_EXTRACT_CHARS:
+            text = text[:MAX_EXTRACT_CHARS] + "..."
+        return f"Extracted {len(text)} characters from {step.target or 'the page'}.", text
+
+    def _target_element(self, wd, target, selector):
+        if target.strip().isdigit():
+            return execute_on_highlighted_element(wd, int(target), "return element;")
+        return self._find_element(wd, target, selector)
+
+    def _find_element(self, wd, text, selector):
+        element = wd.execute_script(FIND_ELEMENT_BY_TEXT_SCRIPT, selector, text)
+        if element is None:
+            raise ValueError(f"no visible element matches '{text}'")
+        return element
+
+    def _check_expectations(self, wd, step):
+        """Returns how the page diverges from the step's expectations, or None."""
+        if not step.expect_url and not step.expect_text:
+            return None
+        state = wd.execute_script(CHECK_EXPECTATIONS_SCRIPT, step.expect_text or "")
+        if step.expect_url and step.expect_url not in state["url"]:
+            return f"expected the URL to contain '{step.expect_url}', but it is {state['url']}"
+        if not state["hasText"]:
+            return f"expected the page to show '{step.expect_text}', but it does not"
+        return None
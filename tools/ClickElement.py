@@ -1,15 +1,22 @@
-import time
 from pydantic import Field
-from selenium.webdriver.common.by import By
 from crewai_tools import tool
 
+from .util.page_actions import ELEMENT_AND_TEXT_SCRIPT, click_element, async_click_element
 from .util.selenium import get_web_driver, set_web_driver
-from .util.highlights import remove_highlight_and_labels
+from .util.async_driver import get_async_web_driver
+from .util.highlights import (
+    remove_highlight_and_labels,
+    execute_on_highlighted_element,
+    async_remove_highlight_and_labels,
+    async_execute_on_highlighted_element,
+)
+from .util.readiness import describe_click_outcome
 
 @tool("Click on a highlighted element")
 class ClickElement:
     """
-    This tool clicks on an element on the current web page based on its number.
+    This tool clicks on an element on the current web page based on its number. It reports what the click did
+    (navigation, new tab, page update or no effect), and switches to a tab the click opened.
 
     Before using this tool, ensure that clickable elements on the page are highlighted by outputting the '[highlight clickable elements]' message.
     """
@@ -20,45 +27,60 @@ class ClickElement:
 
     def run(self):
         wd = get_web_driver()
+        self._check_highlighted()
 
-        # Ensure elements are highlighted before clicking
-        if "button" not in self._shared_state.get("elements_highlighted", ""):
-            raise ValueError(
-                "Please highlight clickable elements on the page first by outputting '[highlight clickable elements]' message. "
-                "You must output just the message without calling the tool first, so the user can respond with the screenshot."
-            )
+        try:
+            element, element_text = execute_on_highlighted_element(wd, self.element_number, ELEMENT_AND_TEXT_SCRIPT)
+            # Wait only as long as whatever the click triggered needs
+            outcome = click_element(wd, element)
+            result = self._describe_click(element_text, wd.current_url, outcome)
+        except IndexError:
+            result = "Element number is invalid. Please try again with a valid element number."
+        except Exception as e:
+            result = str(e)
 
-        # Retrieve all highlighted elements
-        all_elements = wd.find_elements(By.CSS_SELECTOR, ".highlighted-element")
+        # Clean up highlights and reset state
+        wd = remove_highlight_and_labels(wd)
+        set_web_driver(wd)
 
-        try:
-            # Validate element number and click
-            element_text = all_elements[self.element_number - 1].text
-            element_text = element_text.strip() if element_text else ""
-            try:
-                all_elements[self.element_number - 1].click()
-            except Exception as e:
-                if "element click intercepted" in str(e).lower():
-                    wd.execute_script("arguments[0].click();", all_elements[self.element_number - 1])
-                else:
-                    raise e
+        self._shared_state.set("elements_highlighted", "")
+
+        return result
 
-            time.sleep(3)
+    async def arun(self):
+        """Async version of run(), for sessions sharing one event loop."""
+        driver = await get_async_web_driver()
+        self._check_highlighted()
 
-            result = (
-                f"Clicked on element {self.element_number}. Text on clicked element: '{element_text}'. "
-                f"Current URL is {wd.current_url}. To further analyze the page, output '[send screenshot]' command."
+        try:
+            element, element_text = await async_execute_on_highlighted_element(
+                driver, self.element_number, ELEMENT_AND_TEXT_SCRIPT
             )
+            outcome = await async_click_element(driver, element)
+            result = self._describe_click(element_text, await driver.get_current_url(), outcome)
         except IndexError:
             result = "Element number is invalid. Please try again with a valid element number."
         except Exception as e:
             result = str(e)
 
-        # Clean up highlights and reset state
-        wd = remove_highlight_and_labels(wd)
-        wd.execute_script("document.body.style.zoom='1.5'")
-        set_web_driver(wd)
+        await async_remove_highlight_and_labels(driver)
+        await driver.run(set_web_driver, driver.wd)
 
         self._shared_state.set("elements_highlighted", "")
 
-        return result
\ No newline at end of file
+        return result
+
+    def _check_highlighted(self):
+        # Ensure elements are highlighted before clicking
+        if "button" not in self._shared_state.get("elements_highlighted", ""):
+            raise ValueError(
+                "Please highlight clickable elements on the page first by outputting '[highlight clickable elements]' message. "
+                "You must output just the message without calling the tool first, so the user can respond with the screenshot."
+            )
+
+    def _describe_click(self, element_text, url, outcome):
+        return (
+            f"Clicked on element {self.element_number}. Text on clicked element: '{element_text}'. "
+            f"{describe_click_outcome(outcome, url)} "
+            "To further analyze the page, output '[send screenshot]' command."
+        )
@@ -56,6 +56,15 @@ import os
 from typing import Optional
 
 from .util.selenium import get_web_driver
+from .util.async_driver import get_async_web_driver
+
+# Parameters for generating the PDF
+PRINT_PARAMS = {
+    "landscape": False,
+    "displayHeaderFooter": False,
+    "printBackground": True,
+    "preferCSSPageSize": True,
+}
 
 @tool("Export current web page as a file")
 class ExportFile:
@@ -73,20 +82,13 @@ class ExportFile:
         if not self.api_key:
             raise ValueError("OpenAI API key must be provided either through constructor or OPENAI_API_KEY environment variable")
         self.client = openai.OpenAI(api_key=self.api_key)
+        self.async_client = openai.AsyncOpenAI(api_key=self.api_key)
 
     def run(self):
         wd = get_web_driver()
 
-        # Define parameters for generating the PDF
-        params = {
-            "landscape": False,
-            "displayHeaderFooter": False,
-            "printBackground": True,
-            "preferCSSPageSize": True,
-        }
-
         # Generate the PDF via Chrome DevTools Protocol (CDP)
-        result = wd.execute_cdp_cmd("Page.printToPDF", params)
+        result = wd.execute_cdp_cmd("Page.printToPDF", PRINT_PARAMS)
         pdf_data = result["data"]
 
         # Decode the PDF data
@@ -120,4 +122,27 @@ class ExportFile:
                 try:
                     os.remove(pdf_file_name)
                 except Exception as e:
-                    print(f"Warning: Could not delete temporary file {pdf_file_name}: {e}")
\ No newline at end of file
+                    print(f"Warning: Could not delete temporary file {pdf_file_name}: {e}")
+
+    async def arun(self):
+        """
+        Async version of run(), for sessions sharing one event loop.
+        The PDF is uploaded from memory, without a temporary file.
+        """
+        driver = await get_async_web_driver()
+
+        result = await driver.execute_cdp_cmd("Page.printToPDF", PRINT_PARAMS)
+        pdf_bytes = base64.b64decode(result["data"])
+
+        import uuid
+        response = await self.async_client.files.create(
+            file=(f"exported_file_{uuid.uuid4()}.pdf", pdf_bytes), purpose="assistants"
+        )
+        file_id = response.id
+
+        self._shared_state.set("file_id", file_id)
+
+        return (
+            f"Success. File exported with id: `{file_id}`. "
+            f"You can now send this file id back to the user."
+        )
\ No newline at end of file
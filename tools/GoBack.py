@@ -1,26 +1,112 @@
-import time
 from crewai_tools import tool
 
 from .util.selenium import get_web_driver, set_web_driver
+from .util.async_driver import get_async_web_driver
+from .util.history_cache import leave_page, restore_page
+from .util.screenshot import set_last_screenshot_hash
+from .util.readiness import (
+    mark_navigation,
+    wait_for_page_ready,
+    describe_readiness,
+    async_mark_navigation,
+    async_wait_for_page_ready,
+)
+
+# Characters of the remembered page text returned for an unchanged page
+MAX_RESTORED_TEXT_CHARS = 2000
+
+# Characters of the remembered element texts listed for an unchanged page
+MAX_RESTORED_ELEMENTS_CHARS = 2000
 
 @tool("Go back one page in browser history")
 class GoBack:
     """
     This tool allows you to go back 1 page in the browser history.
     Use it in case of a mistake or if a page shows unexpected content.
+
+    If the previous page did not change since you last saw it, its highlighted element numbers stay valid
+    and are listed in the result, so you do not need to highlight it again.
     """
 
     def run(self):
         wd = get_web_driver()
 
+        # Without a previous page wd.back() does nothing, and waiting for a navigation would take the full timeout
+        if wd.execute_cdp_cmd("Page.getNavigationHistory", {})["currentIndex"] == 0:
+            return self._describe_no_history(wd.current_url)
+
         # Navigate back in browser history
+        leave_page(wd)
+        token = mark_navigation(wd)
         wd.back()
 
-        # Wait for the page to load
-        time.sleep(3)
+        # Wait for the previous page to be committed and stable
+        readiness = wait_for_page_ready(wd, token=token, require_navigation=True)
+
+        # Reuse what is known about the page if it did not change since
+        restored = restore_page(wd)
+        self._restore_state(restored)
 
         # Update the web driver state
         set_web_driver(wd)
 
         # Return success message with current URL
-        return f"Success. Went back 1 page. Current URL is: {wd.current_url}"
\ No newline at end of file
+        return self._describe_back(wd.current_url, readiness, restored)
+
+    async def arun(self):
+        """Async version of run(), for sessions sharing one event loop."""
+        driver = await get_async_web_driver()
+
+        if (await driver.execute_cdp_cmd("Page.getNavigationHistory", {}))["currentIndex"] == 0:
+            return self._describe_no_history(await driver.get_current_url())
+
+        await driver.run(leave_page, driver.wd)
+        token = await async_mark_navigation(driver)
+        await driver.back()
+        readiness = await async_wait_for_page_ready(driver, token=token, require_navigation=True)
+
+        restored = await driver.run(restore_page, driver.wd)
+        self._restore_state(restored)
+
+        await driver.run(set_web_driver, driver.wd)
+
+        return self._describe_back(await driver.get_current_url(), readiness, restored)
+
+    def _restore_state(self, restored):
+        # Highlights of the page left behind are not valid here, only the restored ones are
+        if restored and restored.get("elements") is not None:
+            self._shared_state.set("elements_highlighted", restored["selector"])
+        else:
+            self._shared_state.set("elements_highlighted", "")
+
+        # A screenshot of the page looking the same as the one already seen does not need to be sent again.
+        # The URL goes with the hash, so the duplicate reply names the page the screenshot was taken of.
+        if restored and restored.get("screenshot_hash") is not None:
+            set_last_screenshot_hash(restored["screenshot_hash"], url=restored["url"])
+
+    def _describe_no_history(self, url):
+        return f"There is no previous page in the browser history. Current URL is: {url}."
+
+    def _describe_back(self, url, readiness, restored):
+        result = f"Success. Went back 1 page. Current URL is: {url}. {describe_readiness(readiness)}"
+        if not restored:
+            return result
+        if not restored["unchanged"]:
+            return result + " The page changed since you last saw it."
+
+        source = "restored from the browser cache" if restored["restored_from_cache"] else "loaded again"
+        result += f" The page was {source} and has not changed since you last saw it."
+        if restored.get("elements") is not None:
+            texts = ", ".join(
+                f"{element['index']}: {element['text']}" for element in restored["elements"] if element["text"]
+            )
+            if len(texts) > MAX_RESTORED_ELEMENTS_CHARS:
+                texts = texts[:MAX_RESTORED_ELEMENTS_CHARS] + "..."
+            result += (
+                " The highlighted elements kept their numbers, use them without highlighting the page again. "
+                f"Texts of the elements are: {texts}."
+            )
+        text = restored["text"]
+        if len(text) > MAX_RESTORED_TEXT_CHARS:
+            text = text[:MAX_RESTORED_TEXT_CHARS] + "..."
+        return result + f"\nPage text: {text}"
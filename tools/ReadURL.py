@@ -1,8 +1,13 @@
-import time
+import asyncio
+
 from pydantic import Field
 from crewai_tools import tool
 
-from .util.selenium import get_web_driver, set_web_driver
+from .util.selenium import get_web_driver, set_web_driver, get_selenium_config, defer_page, discard_deferred_page
+from .util.async_driver import get_async_web_driver
+from .util.history_cache import leave_page, forget_current_page
+from .util.readiness import wait_for_page_ready, describe_readiness, async_wait_for_page_ready
+from .util.static_fetch import fetch_static_page, get_tiered_fetch_settings
 
 @tool("Navigate to a URL in the browser")
 class ReadURL:
@@ -28,23 +33,74 @@ class ReadURL:
     )
 
     def run(self):
+        self._reset_page()
+
+        # Static pages are read with a plain HTTP request; the browser only loads them once a
+        # tool needs it. A Chrome profile means logged-in sessions, which only the browser has.
+        if self._use_static_fetch():
+            page = fetch_static_page(self.url)
+            if page["reason"] is None:
+                return self._defer(page)
+
         wd = get_web_driver()
 
         # Open the provided URL
+        leave_page(wd)
         wd.get(self.url)
 
-        # Wait for the page to load
-        time.sleep(2)
+        # Wait until the page is stable instead of a fixed delay
+        readiness = wait_for_page_ready(wd)
 
         # Update the web driver state
         set_web_driver(wd)
 
+        # Return a message with the current URL and next steps
+        return self._describe_page(wd.current_url, readiness)
+
+    async def arun(self):
+        """Async version of run(), for sessions sharing one event loop."""
+        self._reset_page()
+
+        if self._use_static_fetch():
+            # The plain HTTP client is blocking, the request runs in the default executor
+            page = await asyncio.to_thread(fetch_static_page, self.url)
+            if page["reason"] is None:
+                return self._defer(page)
+
+        driver = await get_async_web_driver()
+        await driver.run(leave_page, driver.wd)
+        await driver.get(self.url)
+        readiness = await async_wait_for_page_ready(driver)
+
+        await driver.run(set_web_driver, driver.wd)
+
+        return self._describe_page(await driver.get_current_url(), readiness)
+
+    def _reset_page(self):
+        # The new page replaces any page read without the browser before
+        discard_deferred_page()
+
         # Clear highlighted elements from shared state
         self._shared_state.set("elements_highlighted", "")
 
-        # Return a message with the current URL and next steps
+    def _use_static_fetch(self):
+        return get_tiered_fetch_settings()["enabled"] and not get_selenium_config().get("chrome_profile_path")
+
+    def _defer(self, page):
+        # The browser stays on the page left behind, which is not recorded for going back to it
+        forget_current_page()
+        defer_page(page)
+        return (
+            f"Current URL is: {page['url']}\n"
+            f"Page title: {page['title']}\n"
+            "The page was read without the browser. Use the WebPageSummarizer tool to analyze its content "
+            "or output '[highlight clickable elements]' for further navigation."
+        )
+
+    def _describe_page(self, url, readiness):
         return (
-            f"Current URL is: {wd.current_url}\n"
+            f"Current URL is: {url}\n"
+            f"{describe_readiness(readiness)}\n"
             "Please output '[send screenshot]' next to analyze the current web page "
             "or '[highlight clickable elements]' for further navigation."
-        )
\ No newline at end of file
+        )
@@ -1,58 +1,240 @@
 from typing import Literal
 from pydantic import Field
+from selenium.common.exceptions import WebDriverException
 from crewai_tools import tool
 
-from .util.selenium import get_web_driver, set_web_driver
+from .util.page_actions import SCROLL_SCRIPT
+from .util.selenium import get_web_driver, set_web_driver, get_selenium_config
+from .util.async_driver import get_async_web_driver
+
+# One harvest step: scrolls down by one viewport height, waits until whatever the scroll triggered
+# (lazy loading, infinite scroll) settled, and returns the text and links that appeared since the
+# previous step. Text is collected per block element, so nested elements are not repeated, and only
+# from visible blocks. Collected nodes are remembered on the page, which also covers virtualized
+# lists that drop the items scrolled past.
+HARVEST_STEP_SCRIPT = """
+var options = arguments[0];
+var done = arguments[arguments.length - 1];
+
+if (options.reset || !window.__browsingHarvest) {
+    window.__browsingHarvest = {nodes: new WeakSet(), links: new WeakSet(), texts: new Set(), hrefs: new Set()};
+}
+var harvest = window.__browsingHarvest;
+var collected = {texts: [], links: []};
+
+function normalize(text) {
+    return text.replace(/\\s+/g, ' ').trim();
+}
+
+function pageHeight() {
+    return Math.max(document.body.scrollHeight, document.documentElement.scrollHeight);
+}
+
+function collect() {
+    var blocks = new Map();
+    var blockOfParent = new Map();
+    var walker = document.createTreeWalker(document.body, NodeFilter.SHOW_TEXT);
+    var node;
+    while ((node = walker.nextNode())) {
+        if (harvest.nodes.has(node) || !node.nodeValue.trim()) continue;
+        var parent = node.parentElement;
+        if (!parent || parent.closest('script, style, noscript, template, svg, #highlight-labels')) {
+            harvest.nodes.add(node);
+            continue;
+        }
+        var block = blockOfParent.get(parent);
+        if (!block) {
+            block = parent;
+            while (block.parentElement && getComputedStyle(block).display.indexOf('inline') === 0) {
+                block = block.parentElement;
+            }
+            blockOfParent.set(parent, block);
+        }
+        if (!blocks.has(block)) blocks.set(block, []);
+        blocks.get(block).push(node);
+    }
+
+    blocks.forEach(function(nodes, block) {
+        // Hidden blocks are left for a later step, they may be revealed
+        if (block.checkVisibility ? !block.checkVisibility() : !block.getClientRects().length) return;
+        nodes.forEach(function(node) { harvest.nodes.add(node); });
+        var text = normalize(nodes.map(function(node) { return node.nodeValue; }).join(' '));
+        if (text && !harvest.texts.has(text)) {
+            harvest.texts.add(text);
+            collected.texts.push(text);
+        }
+    });
+
+    document.querySelectorAll('a[href]').forEach(function(link) {
+        if (harvest.links.has(link)) return;
+        harvest.links.add(link);
+        var href = link.href;
+        if (!/^https?:/.test(href) || harvest.hrefs.has(href)) return;
+        harvest.hrefs.add(href);
+        collected.links.push({
+            text: normalize(link.innerText || link.getAttribute('aria-label') || '').slice(0, 100),
+            href: href
+        });
+    });
+}
+
+if (options.reset) collect();
+var startHeight = pageHeight();
+var startPosition = window.pageYOffset;
+window.scrollBy(0, window.innerHeight);
+var moved = window.pageYOffset !== startPosition;
+var started = performance.now();
+
+function check() {
+    var now = performance.now();
+    var state = window.__browsingReadiness;
+    var settled = now - started >= options.minWaitMs && (!state || (
+        state.inflight <= options.maxInflight &&
+        now - state.lastNetwork >= options.networkIdleMs &&
+        now - state.lastMutation >= options.domQuietMs
+    ));
+    if (!settled && now - started < options.timeoutMs) return setTimeout(check, 50);
+
+    collect();
+    var height = pageHeight();
+    done({
+        texts: collected.texts,
+        links: collected.links,
+        moved: moved,
+        grew: height > startHeight,
+        atBottom: window.pageYOffset + window.innerHeight >= height - 2
+    });
+}
+check();
+"""
+
+# Time given to lazy-load triggers (e.g. IntersectionObservers) to start their requests after a scroll
+HARVEST_MIN_WAIT_MS = 200
+
+# Longest wait for the page to settle after one harvest scroll
+HARVEST_STEP_TIMEOUT_MS = 5000
+
+# Harvesting stops once this much text was collected
+MAX_HARVEST_CHARS = 20000
+
+# Links listed in the harvest result at most
+MAX_HARVEST_LINKS = 200
 
 @tool("Scroll the current web page")
 class Scroll:
     """
     This tool allows you to scroll the current web page up or down by 1 screen height.
+
+    With harvest=True it instead scrolls down repeatedly until the page stops growing or max_scrolls is reached,
+    and returns all the text and links that appeared along the way. Use it to read feeds, search results and
+    infinite-scroll listings in one step.
     """
     direction: Literal["up", "down"] = Field(..., description="Direction to scroll.")
+    harvest: bool = Field(
+        False,
+        description="Scroll down until the end of the page and return the text and links found on the way, "
+                    "instead of scrolling 1 screen height.",
+    )
+    max_scrolls: int = Field(10, ge=1, le=50, description="Maximum number of screen heights to scroll in harvest mode.")
 
     def run(self):
         wd = get_web_driver()
 
-        # Get the screen height of the browser window
-        height = wd.get_window_size()["height"]
+        if self.harvest:
+            texts, links = [], []
+            reason = f"limit of {self.max_scrolls} scrolls reached"
+            for step in range(self.max_scrolls):
+                try:
+                    harvested = wd.execute_async_script(HARVEST_STEP_SCRIPT, self._harvest_options(step == 0))
+                except WebDriverException:
+                    reason = "page navigated away"
+                    break
+                stop_reason = self._add_harvested(harvested, texts, links)
+                if stop_reason:
+                    reason = stop_reason
+                    break
+            result = self._describe_harvest(texts, links, step + 1, reason)
+        else:
+            result = self._describe_scroll(wd.execute_script(SCROLL_SCRIPT, self.direction))
+
+        # Update the web driver state
+        set_web_driver(wd)
+
+        return result
+
+    async def arun(self):
+        """Async version of run(), for sessions sharing one event loop."""
+        driver = await get_async_web_driver()
 
-        # Get the zoom level of the page
-        zoom_level = wd.execute_script("return document.body.style.zoom || '1';")
-        zoom_level = (
-            float(zoom_level.strip("%")) / 100 if "%" in zoom_level else float(zoom_level)
+        if self.harvest:
+            texts, links = [], []
+            reason = f"limit of {self.max_scrolls} scrolls reached"
+            for step in range(self.max_scrolls):
+                try:
+                    harvested = await driver.execute_async_script(HARVEST_STEP_SCRIPT, self._harvest_options(step == 0))
+                except WebDriverException:
+                    reason = "page navigated away"
+                    break
+                stop_reason = self._add_harvested(harvested, texts, links)
+                if stop_reason:
+                    reason = stop_reason
+                    break
+            result = self._describe_harvest(texts, links, step + 1, reason)
+        else:
+            result = self._describe_scroll(await driver.execute_script(SCROLL_SCRIPT, self.direction))
+
+        await driver.run(set_web_driver, driver.wd)
+
+        return result
+
+    def _describe_scroll(self, scrolled):
+        if not scrolled:
+            edge = "top" if self.direction == "up" else "bottom"
+            return f"Reached the {edge} of the page. Cannot scroll {self.direction} any further.\n"
+        return (
+            f"Scrolled {self.direction} by 1 screen height. "
+            "Make sure to output '[send screenshot]' command to analyze the page after scrolling."
         )
 
-        # Adjust the height based on the zoom level
-        adjusted_height = height / zoom_level
-
-        # Get current scroll position and total scroll height
-        current_scroll_position = wd.execute_script("return window.pageYOffset;")
-        total_scroll_height = wd.execute_script("return document.body.scrollHeight;")
-
-        result = ""
-
-        # Scroll up logic
-        if self.direction == "up":
-            if current_scroll_position == 0:
-                result = "Reached the top of the page. Cannot scroll up any further.\n"
-            else:
-                wd.execute_script(f"window.scrollBy(0, -{adjusted_height});")
-                result = (
-                    "Scrolled up by 1 screen height. Make sure to output '[send screenshot]' command to analyze the page after scrolling."
-                )
-
-        # Scroll down logic
-        elif self.direction == "down":
-            if current_scroll_position + adjusted_height >= total_scroll_height:
-                result = "Reached the bottom of the page. Cannot scroll down any further.\n"
-            else:
-                wd.execute_script(f"window.scrollBy(0, {adjusted_height});")
-                result = (
-                    "Scrolled down by 1 screen height. Make sure to output '[send screenshot]' command to analyze the page after scrolling."
-                )
+    def _harvest_options(self, reset):
+        config = get_selenium_config()
+        return {
+            "reset": reset,
+            "minWaitMs": HARVEST_MIN_WAIT_MS,
+            "timeoutMs": HARVEST_STEP_TIMEOUT_MS,
+            "maxInflight": config.get("max_inflight_requests", 2),
+            "networkIdleMs": config.get("network_idle_ms", 500),
+            "domQuietMs": config.get("dom_quiet_ms", 300),
+        }
 
-        # Update the web driver state
-        set_web_driver(wd)
+    def _add_harvested(self, harvested, texts, links):
+        """Adds the content of one harvest step and returns why harvesting should stop, if it should."""
+        texts.extend(harvested["texts"])
+        links.extend(harvested["links"])
+        if sum(len(text) for text in texts) >= MAX_HARVEST_CHARS:
+            return f"{MAX_HARVEST_CHARS} characters collected"
+        if harvested["atBottom"] and not harvested["grew"]:
+            return "end of the page reached"
+        if not harvested["moved"] and not harvested["grew"]:
+            return "page does not scroll any further"
+        return None
+
+    def _describe_harvest(self, texts, links, scrolls, reason):
+        lines = [
+            f"Scrolled down {scrolls} times, stopped: {reason}. "
+            f"Found {len(texts)} text blocks and {len(links)} links.",
+            "",
+            "Text:",
+        ]
+        chars = 0
+        for text in texts:
+            if chars + len(text) > MAX_HARVEST_CHARS:
+                lines.append(text[:MAX_HARVEST_CHARS - chars] + "...")
+                break
+            lines.append(text)
+            chars += len(text)
 
-        return result
\ No newline at end of file
+        if links:
+            lines += ["", "Links:"]
+            lines += [f"- {link['text'] or '(no text)'}: {link['href']}" for link in links[:MAX_HARVEST_LINKS]]
+        return "\n".join(lines)
@@ -1,25 +1,31 @@
 from typing import Dict
 from pydantic import Field, root_validator
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.select import Select
 from crewai_tools import tool
 
+from .util.page_actions import SELECT_OPTIONS_SCRIPT
 from .util.selenium import get_web_driver, set_web_driver
-from .util.highlights import remove_highlight_and_labels
+from .util.async_driver import get_async_web_driver
+from .util.highlights import (
+    remove_highlight_and_labels,
+    execute_on_highlighted_elements,
+    async_remove_highlight_and_labels,
+    async_execute_on_highlighted_elements,
+)
 
 @tool("Select options from dropdowns on the page")
 class SelectDropdown:
     """
-    This tool selects an option in a dropdown on the current web page based on the sequence number of the element 
-    and the index of the option to select.
+    This tool selects options in dropdowns on the current web page based on the sequence number of each dropdown
+    and the option to select: its value, its visible text or its index. A number is matched against the option
+    values and texts first, and only taken as an index (starting at 0) when no option has it as value or text.
 
     Before using this tool, ensure that dropdown elements on the page are highlighted by outputting the '[highlight dropdowns]' message.
     """
     key_value_pairs: Dict[str, str] = Field(
         ...,
         description="A dictionary where the key is the sequence number of the dropdown element, "
-                    "and the value is the index of the option to select.",
-        examples=[{"1": 0, "2": 1}, {"3": 2}],
+                    "and the value is the value, the visible text or the index of the option to select.",
+        examples=[{"1": "0", "2": "1"}, {"3": "United States"}],
     )
 
     @root_validator(pre=True)
@@ -27,35 +33,21 @@ class SelectDropdown:
         if not values.get("key_value_pairs"):
             raise ValueError(
                 "key_value_pairs is required. Example format: "
-                "key_value_pairs={'1': 0, '2': 1}"
+                "key_value_pairs={'1': 0, '2': 'United States'}"
             )
         return values
 
     def run(self):
         wd = get_web_driver()
-
-        # Ensure dropdown elements are highlighted
-        if "select" not in self._shared_state.get("elements_highlighted", ""):
-            raise ValueError(
-                "Please highlight dropdown elements on the page first by outputting '[highlight dropdowns]' message. "
-                "You must output just the message without calling the tool first, so the user can respond with the screenshot."
-            )
-
-        # Retrieve all highlighted elements
-        all_elements = wd.find_elements(By.CSS_SELECTOR, ".highlighted-element")
+        self._check_highlighted()
 
         try:
-            # Iterate through key-value pairs and select the corresponding options
-            for key, value in self.key_value_pairs.items():
-                key = int(key)
-                element = all_elements[key - 1]
-                select = Select(element)
-                select.select_by_index(int(value))
-
-            result = (
-                "Success. Option is selected in the dropdown. "
-                "To further analyze the page, output '[send screenshot]' command."
+            # Resolve and select the options of all dropdowns in a single round trip
+            indices = [int(key) for key in self.key_value_pairs]
+            reports = execute_on_highlighted_elements(
+                wd, indices, SELECT_OPTIONS_SCRIPT, [str(value) for value in self.key_value_pairs.values()]
             )
+            result = self._describe_selection(indices, reports)
         except Exception as e:
             result = str(e)
 
@@ -63,4 +55,44 @@ class SelectDropdown:
         remove_highlight_and_labels(wd)
         set_web_driver(wd)
 
-        return result
\ No newline at end of file
+        return result
+
+    async def arun(self):
+        """Async version of run(), for sessions sharing one event loop."""
+        driver = await get_async_web_driver()
+        self._check_highlighted()
+
+        try:
+            indices = [int(key) for key in self.key_value_pairs]
+            reports = await async_execute_on_highlighted_elements(
+                driver, indices, SELECT_OPTIONS_SCRIPT, [str(value) for value in self.key_value_pairs.values()]
+            )
+            result = self._describe_selection(indices, reports)
+        except Exception as e:
+            result = str(e)
+
+        await async_remove_highlight_and_labels(driver)
+        await driver.run(set_web_driver, driver.wd)
+
+        return result
+
+    def _check_highlighted(self):
+        # Ensure dropdown elements are highlighted
+        if "select" not in self._shared_state.get("elements_highlighted", ""):
+            raise ValueError(
+                "Please highlight dropdown elements on the page first by outputting '[highlight dropdowns]' message. "
+                "You must output just the message without calling the tool first, so the user can respond with the screenshot."
+            )
+
+    def _describe_selection(self, indices, reports):
+        lines = []
+        for index, report in zip(indices, reports):
+            if "error" in report:
+                lines.append(f"Dropdown {index}: {report['error']}")
+            else:
+                lines.append(f"Dropdown {index}: selected '{report['text']}' (matched by {report['by']}).")
+        status = "Error." if any("error" in report for report in reports) else "Success."
+        return (
+            f"{status} {' '.join(lines)} "
+            "To further analyze the page, output '[send screenshot]' command."
+        )
@@ -1,12 +1,25 @@
-import time
 from typing import Dict
 from pydantic import Field, root_validator
 from selenium.webdriver import Keys
-from selenium.webdriver.common.by import By
 from crewai_tools import tool
 
+from .util.page_actions import BULK_FILL_SCRIPT, type_with_keys
 from .util.selenium import get_web_driver, set_web_driver
-from .util.highlights import remove_highlight_and_labels
+from .util.async_driver import get_async_web_driver
+from .util.history_cache import leave_page
+from .util.highlights import (
+    remove_highlight_and_labels,
+    execute_on_highlighted_elements,
+    async_remove_highlight_and_labels,
+    async_execute_on_highlighted_elements,
+)
+from .util.readiness import (
+    mark_navigation,
+    wait_for_page_ready,
+    describe_readiness,
+    async_mark_navigation,
+    async_wait_for_page_ready,
+)
 
 @tool("Send keys to input fields on the page")
 class SendKeys:
@@ -36,41 +49,27 @@ class SendKeys:
 
     def run(self):
         wd = get_web_driver()
+        self._check_highlighted()
 
-        # Ensure input fields are highlighted
-        if "input" not in self._shared_state.get("elements_highlighted", ""):
-            raise ValueError(
-                "Please highlight input elements on the page first by outputting '[highlight text fields]' message. "
-                "You must output just the message without calling the tool first, so the user can respond with the screenshot."
-            )
+        try:
+            indices = [int(key) for key in self.elements_and_texts]
+            values = [str(value) for value in self.elements_and_texts.values()]
 
-        # Retrieve all highlighted elements
-        all_elements = wd.find_elements(By.CSS_SELECTOR, ".highlighted-element")
+            # Set all values in a single round trip
+            reports, elements = execute_on_highlighted_elements(wd, indices, BULK_FILL_SCRIPT, values)
 
-        try:
-            for i, (key, value) in enumerate(self.elements_and_texts.items()):
-                key = int(key)
-                element = all_elements[key - 1]
-
-                # Click, clear, and send keys to the input field
-                try:
-                    element.click()
-                    element.send_keys(Keys.CONTROL + "a")  # Select all text
-                    element.send_keys(Keys.DELETE)
-                    element.clear()
-                except Exception:
-                    pass
-                element.send_keys(value)
-
-                # Press Enter on the last field
-                if i == len(self.elements_and_texts) - 1:
-                    element.send_keys(Keys.RETURN)
-                    time.sleep(3)
-
-            result = (
-                f"Sent input to elements and pressed Enter. Current URL is {wd.current_url}. "
-                "To further analyze the page, output '[send screenshot]' command."
-            )
+            # Type into the fields that rejected the programmatic value
+            for report, element, value in zip(reports, elements, values):
+                if report["path"] == "keys":
+                    type_with_keys(element, value)
+
+            # Press Enter on the last field, which may submit a form
+            leave_page(wd)
+            token = mark_navigation(wd)
+            elements[-1].send_keys(Keys.RETURN)
+            readiness = wait_for_page_ready(wd, token=token)
+
+            result = self._describe_input(indices, reports, wd.current_url, readiness)
         except Exception as e:
             result = str(e)
 
@@ -78,4 +77,55 @@ class SendKeys:
         remove_highlight_and_labels(wd)
         set_web_driver(wd)
 
-        return result
\ No newline at end of file
+        return result
+
+    async def arun(self):
+        """Async version of run(), for sessions sharing one event loop."""
+        driver = await get_async_web_driver()
+        self._check_highlighted()
+
+        try:
+            indices = [int(key) for key in self.elements_and_texts]
+            values = [str(value) for value in self.elements_and_texts.values()]
+
+            reports, elements = await async_execute_on_highlighted_elements(driver, indices, BULK_FILL_SCRIPT, values)
+
+            for report, element, value in zip(reports, elements, values):
+                if report["path"] == "keys":
+                    await driver.run(type_with_keys, element, value)
+
+            await driver.run(leave_page, driver.wd)
+            token = await async_mark_navigation(driver)
+            await driver.send_keys(elements[-1], Keys.RETURN)
+            readiness = await async_wait_for_page_ready(driver, token=token)
+
+            result = self._describe_input(indices, reports, await driver.get_current_url(), readiness)
+        except Exception as e:
+            result = str(e)
+
+        await async_remove_highlight_and_labels(driver)
+        await driver.run(set_web_driver, driver.wd)
+
+        return result
+
+    def _check_highlighted(self):
+        # Ensure input fields are highlighted
+        if "input" not in self._shared_state.get("elements_highlighted", ""):
+            raise ValueError(
+                "Please highlight input elements on the page first by outputting '[highlight text fields]' message. "
+                "You must output just the message without calling the tool first, so the user can respond with the screenshot."
+            )
+
+    def _describe_input(self, indices, reports, url, readiness):
+        fields = []
+        for index, report in zip(indices, reports):
+            if report["path"] == "native":
+                fields.append(f"Element {index}: value set directly")
+            elif report["path"] == "keys":
+                fields.append(f"Element {index}: typed key by key ({report['reason']})")
+            else:
+                fields.append(f"Element {index}: not filled ({report['reason']})")
+        return (
+            f"Sent input to elements and pressed Enter. {'; '.join(fields)}. Current URL is {url}. "
+            f"{describe_readiness(readiness)} To further analyze the page, output '[send screenshot]' command."
+        )
@@ -59,7 +59,8 @@ import openai
 from selenium.webdriver.common.by import By
 from crewai_tools import tool
 
-from .util.selenium import get_web_driver, set_web_driver
+from .util.selenium import get_web_driver, set_web_driver, get_deferred_page
+from .util.async_driver import get_async_web_driver
 
 @tool("Summarize the content of the current webpage")
 class WebPageSummarizer:
@@ -80,6 +81,7 @@ class WebPageSummarizer:
         if not self.api_key:
             raise ValueError("OpenAI API key must be provided either through constructor or OPENAI_API_KEY environment variable")
         self.client = openai.OpenAI(api_key=self.api_key)
+        self.async_client = openai.AsyncOpenAI(api_key=self.api_key)
         self.model = model
         self.max_chars = max_chars
 
@@ -109,13 +111,18 @@ class WebPageSummarizer:
             Exception: If there are errors accessing the webpage or generating the summary
         """
         try:
-            wd = get_web_driver()
-            
-            # Extract text from the webpage
-            try:
-                content = wd.find_element(By.TAG_NAME, "body").text
-            except Exception as e:
-                return f"Error extracting webpage content: {str(e)}"
+            # A page read without the browser already has its text, no need to load it in Chrome
+            page = get_deferred_page()
+            if page is not None:
+                content = page["text"]
+            else:
+                wd = get_web_driver()
+
+                # Extract text from the webpage
+                try:
+                    content = wd.find_element(By.TAG_NAME, "body").text
+                except Exception as e:
+                    return f"Error extracting webpage content: {str(e)}"
 
             # Clean and prepare the content
             content = self.clean_text(content)
@@ -127,20 +134,7 @@ class WebPageSummarizer:
             try:
                 completion = self.client.chat.completions.create(
                     model=self.model,
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": (
-                                "Your task is to summarize the content of the provided webpage. "
-                                "The summary should be concise and informative, capturing the main points and takeaways of the page. "
-                                "Focus on key information and maintain a clear structure."
-                            ),
-                        },
-                        {
-                            "role": "user",
-                            "content": f"Summarize the content of the following webpage:\n\n{content}",
-                        },
-                    ],
+                    messages=self.summary_messages(content),
                     temperature=0.0,
                 )
 
@@ -155,6 +149,72 @@ class WebPageSummarizer:
         except Exception as e:
             return f"Error accessing webpage: {str(e)}"
 
+    async def arun(self) -> str:
+        """
+        Async version of run(), for sessions sharing one event loop.
+
+        Returns:
+            str: Summarized content of the webpage
+        """
+        try:
+            page = get_deferred_page()
+            if page is not None:
+                content = page["text"]
+            else:
+                driver = await get_async_web_driver()
+                try:
+                    content = await driver.execute_script("return document.body ? document.body.innerText : '';")
+                except Exception as e:
+                    return f"Error extracting webpage content: {str(e)}"
+
+            content = self.clean_text(content)
+
+            if not content.strip():
+                return "Error: No content found on the webpage to summarize."
+
+            try:
+                completion = await self.async_client.chat.completions.create(
+                    model=self.model,
+                    messages=self.summary_messages(content),
+                    temperature=0.0,
+                )
+
+                return completion.choices[0].message.content
+
+            except openai.APIError as e:
+                return f"Error generating summary: {str(e)}"
+
+            except Exception as e:
+                return f"Unexpected error during summarization: {str(e)}"
+
+        except Exception as e:
+            return f"Error accessing webpage: {str(e)}"
+
+    def summary_messages(self, content: str) -> list:
+        """
+        Build the chat messages asking for a summary of the content.
+
+        Args:
+            content: Cleaned text of the webpage
+
+        Returns:
+            List of chat messages for the OpenAI API
+        """
+        return [
+            {
+                "role": "system",
+                "content": (
+                    "Your task is to summarize the content of the provided webpage. "
+                    "The summary should be concise and informative, capturing the main points and takeaways of the page. "
+                    "Focus on key information and maintain a clear structure."
+                ),
+            },
+            {
+                "role": "user",
+                "content": f"Summarize the content of the following webpage:\n\n{content}",
+            },
+        ]
+
 # Example usage if run directly
 if __name__ == "__main__":
     try:
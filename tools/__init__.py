@@ -0,0 +1,29 @@
+import importlib
+
+# Tools are imported on first access, so importing the package (or one tool) does not load
+# the dependencies of all the others
+__all__ = [
+    "ActionPlan",
+    "ClickElement",
+    "ExportFile",
+    "GoBack",
+    "ReadURL",
+    "Scroll",
+    "SelectDropdown",
+    "SendKeys",
+    "SolveCaptcha",
+    "WebPageSummarizer",
+]
+
+
+def __getattr__(name):
+    if name not in __all__:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    tool = getattr(importlib.import_module(f".{name}", __name__), name)
+    # Importing the submodule set the package attribute to the module, replace it with the tool
+    globals()[name] = tool
+    return tool
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
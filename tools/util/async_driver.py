@@ -0,0 +1,220 @@
+import asyncio
+import json
+import time
+import uuid
+import weakref
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+from .cdp import CDPError
+from .cdp_driver import (
+    CLICK_POINT_SCRIPT,
+    PAGE_LOAD_TIMEOUT,
+    WAIT_FOR_LOAD_SCRIPT,
+    CDPDriver,
+    _collect_element_markers,
+    _element_resolution_commands,
+    _key_event_commands,
+    _mouse_click_commands,
+    _replace_element_markers,
+    _script_result,
+)
+from .selenium import get_web_driver
+
+# AsyncDriver of each driver, so per-driver state is shared by all tools of a session
+_async_drivers = weakref.WeakKeyDictionary()
+
+
+class AsyncDriver:
+    """
+    Awaitable interface to a WebDriver, so one event loop can run many browsing sessions.
+
+    On the cdp backend commands are written to the page's DevTools websocket and their results
+    awaited, so no thread is held while Chrome works: a page wait is a single pending future.
+    The chromedriver client of the webdriver backend only has blocking calls, which run in the
+    default executor instead.
+
+    Elements returned by scripts are the driver's own (CDPElement or WebElement); pass them to
+    click(), clear() and send_keys() here instead of calling their blocking methods.
+    """
+
+    def __init__(self, wd):
+        self.wd = wd
+        self.native = isinstance(wd, CDPDriver)
+
+    async def run(self, function, *args):
+        """Runs a blocking call in the default executor."""
+        return await asyncio.to_thread(function, *args)
+
+    async def execute_cdp_cmd(self, cmd, cmd_args=None, timeout=None):
+        """Sends a raw CDP command and returns its result."""
+        if not self.native:
+            return await self.run(self.wd.execute_cdp_cmd, cmd, cmd_args or {})
+        session = self.wd.cdp_session
+        return await self._wait(session.send_async(cmd, cmd_args), cmd, timeout or session.timeout)
+
+    async def send_pipelined(self, commands):
+        """
+        Sends several CDP commands without waiting between them and returns their results in order.
+
+        Parameters:
+            commands: List of (method, params) tuples.
+        """
+        if not self.native:
+            return await self.run(lambda: [self.wd.execute_cdp_cmd(method, params) for method, params in commands])
+        session = self.wd.cdp_session
+        futures = [session.send_async(method, params) for method, params in commands]
+        return await self._wait(futures, "Pipelined commands", session.timeout)
+
+    async def execute_script(self, script, *args):
+        """Runs a script body with `arguments`, like WebDriver's execute_script."""
+        if not self.native:
+            return await self.run(self.wd.execute_script, script, *args)
+        return await self._call(script, args, asynchronous=False)
+
+    async def execute_async_script(self, script, *args):
+        """Runs a script body whose last argument is the completion callback."""
+        if not self.native:
+            return await self.run(self.wd.execute_async_script, script, *args)
+        return await self._call(script, args, asynchronous=True)
+
+    async def get(self, url):
+        """Navigates to a URL and waits for the new document to load."""
+        if not self.native:
+            return await self.run(self.wd.get, url)
+        token = await self._tag_document()
+        result = await self.execute_cdp_cmd("Page.navigate", {"url": url})
+        if result.get("errorText"):
+            raise WebDriverException(f"unknown error: {result['errorText']}")
+        if result.get("loaderId"):
+            await self._wait_for_load(token)
+
+    async def back(self):
+        """Goes back one entry in the history and waits for the page to load."""
+        if not self.native:
+            return await self.run(self.wd.back)
+        history = await self.execute_cdp_cmd("Page.getNavigationHistory")
+        if history["currentIndex"] <= 0:
+            return
+        token = await self._tag_document()
+        entry = history["entries"][history["currentIndex"] - 1]
+        await self.execute_cdp_cmd("Page.navigateToHistoryEntry", {"entryId": entry["id"]})
+        await self._wait_for_load(token)
+
+    async def get_current_url(self):
+        if not self.native:
+            return await self.run(getattr, self.wd, "current_url")
+        return await self._evaluate("location.href")
+
+    async def get_title(self):
+        if not self.native:
+            return await self.run(getattr, self.wd, "title")
+        return await self._evaluate("document.title")
+
+    async def click(self, element):
+        """Clicks an element's center with real mouse events, like WebElement.click()."""
+        if not self.native:
+            return await self.run(element.click)
+        point = await self._call_on(element, CLICK_POINT_SCRIPT)
+        await self.send_pipelined(_mouse_click_commands(point))
+
+    async def clear(self, element):
+        if not self.native:
+            return await self.run(element.clear)
+        await self._call_on(
+            element,
+            "function() { this.value = ''; this.dispatchEvent(new Event('input', {bubbles: true})); "
+            "this.dispatchEvent(new Event('change', {bubbles: true})); }",
+        )
+
+    async def send_keys(self, element, *value):
+        """Focuses an element and types text; selenium Keys are sent as key events."""
+        if not self.native:
+            return await self.run(element.send_keys, *value)
+        await self._call_on(element, "function() { this.focus(); }")
+        commands = _key_event_commands("".join(value))
+        if commands:
+            await self.send_pipelined(commands)
+
+    async def _wait(self, futures, method, timeout):
+        if isinstance(futures, list):
+            awaitable = asyncio.gather(*(asyncio.wrap_future(future) for future in futures))
+        else:
+            awaitable = asyncio.wrap_future(futures)
+        try:
+            return await asyncio.wait_for(awaitable, timeout)
+        except CDPError as e:
+            raise WebDriverException(str(e))
+        except asyncio.TimeoutError:
+            raise TimeoutException(f"{method} did not return within {timeout}s")
+
+    async def _evaluate(self, expression):
+        result = await self.execute_cdp_cmd("Runtime.evaluate", {"expression": expression, "returnByValue": True})
+        return result["result"].get("value")
+
+    async def _tag_document(self):
+        token = uuid.uuid4().hex
+        await self._evaluate(f"window.__cdpNavigationToken = {json.dumps(token)}")
+        return token
+
+    async def _wait_for_load(self, token):
+        deadline = time.monotonic() + PAGE_LOAD_TIMEOUT
+        while time.monotonic() < deadline:
+            try:
+                await self._call(WAIT_FOR_LOAD_SCRIPT, (token,), asynchronous=True, timeout=deadline - time.monotonic())
+                return
+            except TimeoutException:
+                return
+            except WebDriverException:
+                # The tagged document was replaced while waiting, wait on the new one
+                await asyncio.sleep(0.05)
+
+    async def _call(self, script, args, asynchronous, timeout=None):
+        self.wd.release_objects()
+        method, params = self.wd._script_command(script, args, asynchronous)
+        result = await self.execute_cdp_cmd(
+            method, params, timeout=timeout or (self.wd._script_timeout if asynchronous else None)
+        )
+        value = _script_result(result)
+        markers = _collect_element_markers(value)
+        if not markers:
+            return value
+        results = await self.send_pipelined(_element_resolution_commands(markers))
+        return _replace_element_markers(value, self.wd, markers, results)
+
+    async def _call_on(self, element, function, *args):
+        result = await self.execute_cdp_cmd(
+            "Runtime.callFunctionOn",
+            {
+                "functionDeclaration": function,
+                "objectId": element.object_id,
+                "arguments": [{"value": arg} for arg in args],
+                "returnByValue": True,
+            },
+        )
+        return _script_result(result)
+
+
+def get_async_driver(wd):
+    """
+    Returns the AsyncDriver of a driver.
+
+    Parameters:
+        wd: WebDriver instance, as returned by get_web_driver().
+    """
+    driver = _async_drivers.get(wd)
+    if driver is None:
+        driver = _async_drivers[wd] = AsyncDriver(wd)
+    return driver
+
+
+async def get_async_web_driver():
+    """
+    Async counterpart of get_web_driver(): checks out the current session's driver and returns
+    its AsyncDriver.
+
+    The checkout runs in the default executor, as it may launch Chrome, wait for a free pool slot
+    or load a deferred page. Run each session in its own task inside browsing_session(), the
+    session id is carried by the task's context.
+    """
+    return get_async_driver(await asyncio.to_thread(get_web_driver))
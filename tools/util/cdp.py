@@ -0,0 +1,208 @@
+import itertools
+import json
+import logging
+import queue
+import threading
+import weakref
+from concurrent.futures import Future
+from urllib.request import urlopen
+
+logger = logging.getLogger(__name__)
+
+
+class CDPError(Exception):
+    """Raised when a Chrome DevTools Protocol command fails or the connection is lost."""
+
+
+class CDPSession:
+    """
+    A Chrome DevTools Protocol connection to one target, over its own websocket.
+
+    chromedriver only relays commands, so whatever needs CDP events (request interception,
+    lifecycle events) goes through this session instead. Responses are read on a background
+    thread and events are dispatched on another one, so event handlers may send commands.
+    """
+
+    def __init__(self, websocket_url, timeout=30):
+        try:
+            import websocket
+        except ImportError as e:
+            logger.error("Missing package: %s. Please install the required dependencies.", e)
+            raise ImportError
+
+        self.websocket_url = websocket_url
+        self.timeout = timeout
+        self._ws = websocket.create_connection(
+            websocket_url, timeout=timeout, suppress_origin=True, enable_multithread=True
+        )
+        self._ws.settimeout(None)
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._handlers = {}
+        self._events = queue.Queue()
+        self._closed = False
+
+        threading.Thread(target=self._read_loop, name="cdp-reader", daemon=True).start()
+        threading.Thread(target=self._dispatch_loop, name="cdp-events", daemon=True).start()
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def send_async(self, method, params=None):
+        """
+        Sends a command without waiting for its result.
+
+        Parameters:
+            method: CDP method, e.g. "Page.navigate".
+            params: Dictionary of command parameters.
+
+        Returns:
+            A Future resolved with the command result.
+        """
+        if self._closed:
+            raise CDPError("The DevTools connection is closed.")
+
+        future = Future()
+        command_id = next(self._ids)
+        with self._pending_lock:
+            self._pending[command_id] = future
+        try:
+            self._ws.send(json.dumps({"id": command_id, "method": method, "params": params or {}}))
+        except Exception as e:
+            with self._pending_lock:
+                self._pending.pop(command_id, None)
+            raise CDPError(f"Could not send {method}: {e}")
+        return future
+
+    def send(self, method, params=None, timeout=None):
+        """
+        Sends a command and waits for its result.
+
+        Parameters:
+            method: CDP method, e.g. "Page.navigate".
+            params: Dictionary of command parameters.
+            timeout: Seconds to wait for the result. Defaults to the session timeout.
+
+        Returns:
+            The result dictionary of the command.
+        """
+        return self.send_async(method, params).result(timeout=timeout or self.timeout)
+
+    def on(self, event, handler):
+        """
+        Registers a handler called with the params of every matching event.
+
+        Parameters:
+            event: CDP event, e.g. "Fetch.requestPaused".
+            handler: Callable taking the event params.
+        """
+        self._handlers.setdefault(event, []).append(handler)
+
+    def close(self):
+        """Closes the connection."""
+        self._closed = True
+        try:
+            self._ws.close()
+        except Exception:
+            pass
+
+    def _read_loop(self):
+        while not self._closed:
+            try:
+                message = json.loads(self._ws.recv())
+            except Exception:
+                break
+
+            if "id" in message:
+                with self._pending_lock:
+                    future = self._pending.pop(message["id"], None)
+                # Futures awaited from asyncio are cancelled when the wait times out; marking
+                # the others running keeps them from being cancelled before the result is set
+                if future is None or not future.set_running_or_notify_cancel():
+                    continue
+                if "error" in message:
+                    future.set_exception(CDPError(message["error"].get("message", str(message["error"]))))
+                else:
+                    future.set_result(message.get("result", {}))
+            elif "method" in message:
+                self._events.put(message)
+
+        self._closed = True
+        self._events.put(None)
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if future.set_running_or_notify_cancel():
+                future.set_exception(CDPError("The DevTools connection was closed."))
+
+    def _dispatch_loop(self):
+        while True:
+            message = self._events.get()
+            if message is None:
+                break
+            for handler in self._handlers.get(message["method"], []):
+                try:
+                    handler(message.get("params", {}))
+                except Exception as e:
+                    logger.warning("Error in CDP handler for %s: %s", message["method"], e)
+
+
+# Page sessions opened for each driver
+_page_sessions = weakref.WeakKeyDictionary()
+
+
+def forget_driver(wd):
+    """
+    Closes the page session opened for a driver, e.g. once the driver moved to another tab.
+    The next get_cdp_session() call opens a session to the driver's current page.
+
+    Parameters:
+        wd: Selenium WebDriver instance.
+    """
+    session = _page_sessions.pop(wd, None)
+    if session is not None:
+        session.close()
+
+
+def get_debugger_address(wd):
+    """
+    Returns the "host:port" of the driver's Chrome remote debugging endpoint.
+
+    Parameters:
+        wd: Selenium WebDriver instance.
+    """
+    address = wd.capabilities.get("goog:chromeOptions", {}).get("debuggerAddress")
+    if not address:
+        raise CDPError("The browser does not expose a remote debugging address.")
+    return address
+
+
+def get_cdp_session(wd):
+    """
+    Returns a DevTools session attached to the driver's current page, opening it on first use.
+
+    Parameters:
+        wd: Selenium WebDriver instance.
+
+    Returns:
+        CDPSession instance.
+    """
+    # The direct CDP backend (cdp_driver.CDPDriver) already holds a session
+    session = getattr(wd, "cdp_session", None) or _page_sessions.get(wd)
+    if session is not None and not session.closed:
+        return session
+
+    # chromedriver window handles are the DevTools target ids
+    target_id = wd.current_window_handle
+    with urlopen(f"http://{get_debugger_address(wd)}/json/list", timeout=10) as response:
+        targets = json.load(response)
+
+    for target in targets:
+        if target.get("id") == target_id and target.get("webSocketDebuggerUrl"):
+            session = CDPSession(target["webSocketDebuggerUrl"])
+            _page_sessions[wd] = session
+            return session
+
+    raise CDPError(f"No DevTools target found for window {target_id}.")
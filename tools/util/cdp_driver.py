@@ -0,0 +1,444 @@
+import base64
+import concurrent.futures
+import json
+import time
+import uuid
+import weakref
+
+from selenium.common.exceptions import (
+    ElementClickInterceptedException,
+    JavascriptException,
+    TimeoutException,
+    WebDriverException,
+)
+from selenium.webdriver.common.keys import Keys
+
+from .cdp import CDPError, get_cdp_session
+
+# Converts DOM elements in a script result (top level or inside an array) into markers, so the
+# result can be returned by value. The elements are kept on the window until they are resolved,
+# which deletes them again.
+RESULT_CONVERSION_SCRIPT = """
+function(result) {
+    var elements = [];
+    function convert(value) {
+        if (value instanceof Element) {
+            elements.push(value);
+            return {__cdpElement: elements.length - 1};
+        }
+        if (Array.isArray(value)) return value.map(convert);
+        return value;
+    }
+    var converted = convert(result);
+    if (elements.length) window.__cdpReturnedElements = elements;
+    return converted;
+}
+"""
+
+# Resolves once the document that replaced the tagged one has loaded, or on a same-document
+# history navigation
+WAIT_FOR_LOAD_SCRIPT = """
+var token = arguments[0], done = arguments[arguments.length - 1];
+if (window.__cdpNavigationToken === token) {
+    window.addEventListener('popstate', function() { done(true); }, {once: true});
+    return;
+}
+if (document.readyState === 'complete') {
+    done(true);
+} else {
+    window.addEventListener('load', function() { done(true); }, {once: true});
+}
+"""
+
+# Scrolls an element into view and returns the point to click, if the element is hit there
+CLICK_POINT_SCRIPT = """
+function() {
+    this.scrollIntoView({block: 'center', inline: 'center'});
+    var rect = this.getBoundingClientRect();
+    var x = rect.left + rect.width / 2, y = rect.top + rect.height / 2;
+    var hit = document.elementFromPoint(x, y);
+    var intercepted = !hit || (hit !== this && !this.contains(hit));
+    return {x: x, y: y, intercepted: intercepted, by: intercepted && hit ? hit.outerHTML.slice(0, 200) : null};
+}
+"""
+
+# Input.dispatchKeyEvent parameters of the special keys the tools send
+SPECIAL_KEYS = {
+    Keys.RETURN: {"key": "Enter", "code": "Enter", "windowsVirtualKeyCode": 13, "text": "\r"},
+    Keys.ENTER: {"key": "Enter", "code": "Enter", "windowsVirtualKeyCode": 13, "text": "\r"},
+    Keys.TAB: {"key": "Tab", "code": "Tab", "windowsVirtualKeyCode": 9},
+    Keys.BACKSPACE: {"key": "Backspace", "code": "Backspace", "windowsVirtualKeyCode": 8},
+    Keys.DELETE: {"key": "Delete", "code": "Delete", "windowsVirtualKeyCode": 46},
+    Keys.ESCAPE: {"key": "Escape", "code": "Escape", "windowsVirtualKeyCode": 27},
+    Keys.ARROW_DOWN: {"key": "ArrowDown", "code": "ArrowDown", "windowsVirtualKeyCode": 40},
+    Keys.ARROW_UP: {"key": "ArrowUp", "code": "ArrowUp", "windowsVirtualKeyCode": 38},
+}
+
+# CDP modifier bits of the modifier keys, held until the end of a send_keys() call
+MODIFIER_KEYS = {Keys.ALT: 1, Keys.CONTROL: 2, Keys.COMMAND: 4, Keys.SHIFT: 8}
+
+# Editing commands Chrome only runs when they are passed explicitly
+KEY_COMMANDS = {(2, "a"): "selectAll", (4, "a"): "selectAll"}
+
+# How long get() and back() wait for the new document to load
+PAGE_LOAD_TIMEOUT = 30
+
+
+class CDPDriver:
+    """
+    WebDriver backend that runs commands over a direct DevTools websocket instead of chromedriver.
+
+    It implements the part of the Selenium WebDriver API the tools use (get, back, current_url,
+    execute_script, execute_async_script, execute_cdp_cmd, quit) with one CDP round trip each,
+    and returns CDPElement instances for DOM elements. Chrome is still launched through the
+    wrapped chromedriver session; anything not implemented here is delegated to it.
+    """
+
+    def __init__(self, wd):
+        self._wd = wd
+        self.cdp_session = get_cdp_session(wd)
+        self._script_timeout = 30
+        # Remote object ids of elements Python no longer references, see release_objects()
+        self._released_objects = []
+
+    def __getattr__(self, name):
+        # Only called for attributes not defined here: capabilities, service, switch_to, find_element...
+        if name == "_wd":
+            raise AttributeError(name)
+        return getattr(self._wd, name)
+
+    @property
+    def webdriver(self):
+        """The wrapped chromedriver session."""
+        return self._wd
+
+    def switch_to_window(self, handle):
+        """Moves the driver to another tab and reconnects the websocket to that tab's page."""
+        self._wd.switch_to.window(handle)
+        self.cdp_session.close()
+        self.cdp_session = get_cdp_session(self._wd)
+        # The remote objects of the previous tab went away with its connection
+        self._released_objects.clear()
+
+    @property
+    def current_url(self):
+        return self._evaluate("location.href")
+
+    @property
+    def title(self):
+        return self._evaluate("document.title")
+
+    def get(self, url):
+        """Navigates to a URL and waits for the new document to load."""
+        token = self._tag_document()
+        result = self._send("Page.navigate", {"url": url})
+        if result.get("errorText"):
+            raise WebDriverException(f"unknown error: {result['errorText']}")
+        # Same-document navigations (e.g. to a fragment) have no loader and nothing to wait for
+        if result.get("loaderId"):
+            self._wait_for_load(token)
+
+    def back(self):
+        """Goes back one entry in the history and waits for the page to load."""
+        history = self._send("Page.getNavigationHistory")
+        if history["currentIndex"] <= 0:
+            return
+        token = self._tag_document()
+        entry = history["entries"][history["currentIndex"] - 1]
+        self._send("Page.navigateToHistoryEntry", {"entryId": entry["id"]})
+        self._wait_for_load(token)
+
+    def execute_script(self, script, *args):
+        """Runs a script body with `arguments`, like WebDriver's execute_script."""
+        return self._call(script, args, asynchronous=False)
+
+    def execute_async_script(self, script, *args):
+        """Runs a script body whose last argument is the completion callback."""
+        return self._call(script, args, asynchronous=True)
+
+    def execute_cdp_cmd(self, cmd, cmd_args):
+        """Sends a raw CDP command."""
+        return self._send(cmd, cmd_args)
+
+    def send_pipelined(self, commands):
+        """
+        Sends several CDP commands without waiting between them and returns their results in order.
+
+        Parameters:
+            commands: List of (method, params) tuples.
+        """
+        try:
+            futures = [self.cdp_session.send_async(method, params) for method, params in commands]
+            return [future.result(timeout=self.cdp_session.timeout) for future in futures]
+        except CDPError as e:
+            raise WebDriverException(str(e))
+        except concurrent.futures.TimeoutError:
+            raise TimeoutException(f"Pipelined commands did not return within {self.cdp_session.timeout}s")
+
+    def release_objects(self):
+        """
+        Releases the remote objects of the elements garbage collected since the last command, so
+        the page does not keep every element a script ever returned alive.
+        """
+        while self._released_objects:
+            self.cdp_session.send_async("Runtime.releaseObject", {"objectId": self._released_objects.pop()})
+
+    def set_script_timeout(self, time_to_wait):
+        self._script_timeout = time_to_wait
+        self._wd.set_script_timeout(time_to_wait)
+
+    def print_page(self, print_options=None):
+        """Returns the page as a base64-encoded PDF."""
+        return self._send("Page.printToPDF", print_options or {})["data"]
+
+    def get_screenshot_as_base64(self):
+        return self._send("Page.captureScreenshot", {"format": "png"})["data"]
+
+    def quit(self):
+        self.cdp_session.close()
+        self._wd.quit()
+
+    def _send(self, method, params=None, timeout=None):
+        try:
+            return self.cdp_session.send(method, params, timeout=timeout)
+        except CDPError as e:
+            raise WebDriverException(str(e))
+        except concurrent.futures.TimeoutError:
+            raise TimeoutException(f"{method} did not return within {timeout or self.cdp_session.timeout}s")
+
+    def _evaluate(self, expression):
+        result = self._send("Runtime.evaluate", {"expression": expression, "returnByValue": True})
+        return result["result"].get("value")
+
+    def _tag_document(self):
+        token = uuid.uuid4().hex
+        self._evaluate(f"window.__cdpNavigationToken = {json.dumps(token)}")
+        return token
+
+    def _wait_for_load(self, token):
+        deadline = time.monotonic() + PAGE_LOAD_TIMEOUT
+        while time.monotonic() < deadline:
+            try:
+                self._call(WAIT_FOR_LOAD_SCRIPT, (token,), asynchronous=True, timeout=deadline - time.monotonic())
+                return
+            except TimeoutException:
+                return
+            except WebDriverException:
+                # The tagged document was replaced while waiting, wait on the new one
+                time.sleep(0.05)
+
+    def _call(self, script, args, asynchronous, timeout=None):
+        self.release_objects()
+        method, params = self._script_command(script, args, asynchronous)
+        result = self._send(method, params, timeout=timeout or (self._script_timeout if asynchronous else None))
+        return self._resolve_elements(_script_result(result))
+
+    def _script_command(self, script, args, asynchronous):
+        """Returns the (method, params) of the CDP command running a WebDriver-style script."""
+        body = f"function() {{\n{script}\n}}"
+        if asynchronous:
+            function = (
+                "function() { var args = Array.prototype.slice.call(arguments); "
+                "return new Promise(function(resolve, reject) { args.push(resolve); "
+                f"try {{ ({body}).apply(window, args); }} catch (e) {{ reject(e); }} }}).then({RESULT_CONVERSION_SCRIPT}); }}"
+            )
+        else:
+            function = f"function() {{ return ({RESULT_CONVERSION_SCRIPT})(({body}).apply(window, arguments)); }}"
+
+        elements = [arg for arg in args if isinstance(arg, CDPElement)]
+        if elements:
+            # Called on the first element, which only serves as the target of the call
+            return "Runtime.callFunctionOn", {
+                "functionDeclaration": function,
+                "objectId": elements[0].object_id,
+                "arguments": [
+                    {"objectId": arg.object_id} if isinstance(arg, CDPElement) else {"value": arg} for arg in args
+                ],
+                "returnByValue": True,
+                "awaitPromise": asynchronous,
+            }
+        return "Runtime.evaluate", {
+            "expression": f"({function}).apply(window, {json.dumps(list(args))})",
+            "returnByValue": True,
+            "awaitPromise": asynchronous,
+        }
+
+    def _resolve_elements(self, value):
+        markers = _collect_element_markers(value)
+        if not markers:
+            return value
+
+        # Resolve all returned elements in one pipelined batch
+        results = self.send_pipelined(_element_resolution_commands(markers))
+        return _replace_element_markers(value, self, markers, results)
+
+
+class CDPElement:
+    """
+    DOM element returned by CDPDriver, with the WebElement methods the tools use.
+    """
+
+    def __init__(self, driver, object_id):
+        self._driver = driver
+        self.object_id = object_id
+        # Queued only: a finalizer may run in the middle of a command, which must not send another one
+        weakref.finalize(self, driver._released_objects.append, object_id)
+
+    def __eq__(self, other):
+        return isinstance(other, CDPElement) and other.object_id == self.object_id
+
+    def __hash__(self):
+        return hash(self.object_id)
+
+    @property
+    def text(self):
+        return self._call("function() { return this.innerText; }")
+
+    @property
+    def tag_name(self):
+        return self._call("function() { return this.tagName.toLowerCase(); }")
+
+    @property
+    def screenshot_as_base64(self):
+        rect = self._call(
+            "function() { this.scrollIntoView({block: 'center'}); var r = this.getBoundingClientRect(); "
+            "return {x: r.left + window.scrollX, y: r.top + window.scrollY, width: r.width, height: r.height}; }"
+        )
+        clip = {**rect, "scale": 1}
+        return self._driver.execute_cdp_cmd("Page.captureScreenshot", {"format": "png", "clip": clip})["data"]
+
+    @property
+    def screenshot_as_png(self):
+        return base64.b64decode(self.screenshot_as_base64)
+
+    def get_attribute(self, name):
+        return self._call("function(name) { return this.getAttribute(name); }", name)
+
+    def is_displayed(self):
+        return self._call("function() { return this.checkVisibility ? this.checkVisibility() : !!this.offsetParent; }")
+
+    def click(self):
+        """Clicks the element's center with real mouse events, like WebElement.click()."""
+        point = self._call(CLICK_POINT_SCRIPT)
+        self._driver.send_pipelined(_mouse_click_commands(point))
+
+    def clear(self):
+        self._call(
+            "function() { this.value = ''; this.dispatchEvent(new Event('input', {bubbles: true})); "
+            "this.dispatchEvent(new Event('change', {bubbles: true})); }"
+        )
+
+    def send_keys(self, *value):
+        """Focuses the element and types text; selenium Keys are sent as key events."""
+        self._call("function() { this.focus(); }")
+        commands = _key_event_commands("".join(value))
+        if commands:
+            self._driver.send_pipelined(commands)
+
+    def _call(self, function, *args):
+        result = self._driver.execute_cdp_cmd(
+            "Runtime.callFunctionOn",
+            {
+                "functionDeclaration": function,
+                "objectId": self.object_id,
+                "arguments": [{"value": arg} for arg in args],
+                "returnByValue": True,
+            },
+        )
+        return _script_result(result)
+
+
+def _script_result(result):
+    # Value of a Runtime.evaluate / callFunctionOn result, or the script error it reports
+    if "exceptionDetails" in result:
+        details = result["exceptionDetails"]
+        message = details.get("exception", {}).get("description") or details.get("text", "Script error")
+        raise JavascriptException(f"javascript error: {message}")
+    return result["result"].get("value")
+
+
+def _collect_element_markers(value):
+    markers = []
+
+    def collect(item):
+        if isinstance(item, dict) and set(item) == {"__cdpElement"}:
+            markers.append(item["__cdpElement"])
+        elif isinstance(item, list):
+            for child in item:
+                collect(child)
+
+    collect(value)
+    return markers
+
+
+def _element_resolution_commands(markers):
+    # Resolved elements are held by their remote objects, the window does not need to keep them
+    commands = [("Runtime.evaluate", {"expression": f"window.__cdpReturnedElements[{marker}]"}) for marker in markers]
+    commands.append(("Runtime.evaluate", {"expression": "delete window.__cdpReturnedElements"}))
+    return commands
+
+
+def _replace_element_markers(value, driver, markers, results):
+    objects = {marker: CDPElement(driver, result["result"]["objectId"]) for marker, result in zip(markers, results)}
+
+    def replace(item):
+        if isinstance(item, dict) and set(item) == {"__cdpElement"}:
+            return objects[item["__cdpElement"]]
+        if isinstance(item, list):
+            return [replace(child) for child in item]
+        return item
+
+    return replace(value)
+
+
+def _mouse_click_commands(point):
+    # Mouse events clicking the point returned by CLICK_POINT_SCRIPT
+    if point["intercepted"]:
+        raise ElementClickInterceptedException(
+            f"element click intercepted: Element is not clickable at point ({point['x']:.0f}, {point['y']:.0f}). "
+            f"Other element would receive the click: {point['by']}"
+        )
+    mouse = {"x": point["x"], "y": point["y"], "button": "left", "clickCount": 1}
+    return [
+        ("Input.dispatchMouseEvent", {"type": "mouseMoved", "x": point["x"], "y": point["y"]}),
+        ("Input.dispatchMouseEvent", {"type": "mousePressed", **mouse}),
+        ("Input.dispatchMouseEvent", {"type": "mouseReleased", **mouse}),
+    ]
+
+
+def _key_event_commands(value):
+    # Input commands typing a string; selenium Keys become key events, modifiers are held to the end
+    commands = []
+    modifiers = 0
+    text = ""
+
+    def flush_text():
+        nonlocal text
+        if text:
+            commands.append(("Input.insertText", {"text": text}))
+            text = ""
+
+    for character in value:
+        if character == Keys.NULL:
+            flush_text()
+            modifiers = 0
+        elif character in MODIFIER_KEYS:
+            flush_text()
+            modifiers |= MODIFIER_KEYS[character]
+        elif character in SPECIAL_KEYS or (modifiers and modifiers != 8):
+            flush_text()
+            key = SPECIAL_KEYS.get(character) or {"key": character, "code": f"Key{character.upper()}"}
+            key_down = {"type": "keyDown", "modifiers": modifiers, **key}
+            command = KEY_COMMANDS.get((modifiers, character.lower()))
+            if command:
+                key_down["commands"] = [command]
+            if modifiers:
+                key_down.pop("text", None)
+            commands.append(("Input.dispatchKeyEvent", key_down))
+            commands.append(("Input.dispatchKeyEvent", {
+                "type": "keyUp", "modifiers": modifiers, **{k: v for k, v in key.items() if k != "text"}
+            }))
+        else:
+            text += character
+    flush_text()
+    return commands
@@ -1,139 +1,641 @@
-def highlight_elements_with_labels(driver, selector):
+import uuid
+import weakref
+
+from .selenium import get_selenium_config
+
+
+class StaleElementHandleError(ValueError):
+    """Raised when a highlighted element is used after the page or its highlights changed."""
+
+
+# Generation of the last highlight pass run through each driver. A handle is only valid while the
+# page still holds that generation in its registry (window.__browsingHighlights). Generations are
+# unique tokens made here, so a page that was reloaded or replaced never holds a matching one.
+_highlight_generations = weakref.WeakKeyDictionary()
+
+# Viewport size ([width, height] in CSS pixels) of the last highlight pass run through each driver,
+# used to map element boxes onto screenshots
+_highlight_viewports = weakref.WeakKeyDictionary()
+
+# Elements labeled by the "[highlight ...]" commands
+HIGHLIGHT_SELECTORS = {
+    "clickable elements": (
+        'a, button, div[onclick], div[role="button"], div[tabindex], span[onclick], span[role="button"], span[tabindex]'
+    ),
+    "text fields": "input, textarea",
+    "dropdowns": "select",
+}
+
+# Looks up a highlighted element by its label index. The registry holds WeakRefs, so highlighted
+# nodes removed from the page can still be garbage collected.
+RESOLVE_HIGHLIGHTED_ELEMENT_SCRIPT = """
+    var index = arguments[0];
+    var generation = arguments[1];
+    var registry = window.__browsingHighlights;
+    if (!registry || registry.generation !== generation) return {error: 'stale'};
+    var record = registry.entries.get(index);
+    if (!record) return {error: 'invalid'};
+    var element = record.ref.deref();
+    if (!element || !element.isConnected) return {error: 'detached'};
+"""
+
+# Looks up several highlighted elements at once, reporting the first index that cannot be resolved
+RESOLVE_HIGHLIGHTED_ELEMENTS_SCRIPT = """
+    var indices = arguments[0];
+    var generation = arguments[1];
+    var registry = window.__browsingHighlights;
+    if (!registry || registry.generation !== generation) return {error: 'stale', index: indices[0]};
+    var elements = [];
+    for (var i = 0; i < indices.length; i++) {
+        var record = registry.entries.get(indices[i]);
+        if (!record) return {error: 'invalid', index: indices[i]};
+        var element = record.ref.deref();
+        if (!element || !element.isConnected) return {error: 'detached', index: indices[i]};
+        elements.push(element);
+    }
+"""
+
+# Hides the highlights for a clean screenshot, keeping the element numbers and observers
+HIDE_HIGHLIGHTS_SCRIPT = """
+    var highlightStyle = document.getElementById('highlight-style');
+    if (highlightStyle) highlightStyle.disabled = true;
+    var container = document.getElementById('highlight-labels');
+    if (container) container.style.display = 'none';
+"""
+
+# Only the elements, labels and style the highlighter recorded are reverted (see cleanup() in
+# the highlight script); borders and attributes set by the site itself are left alone
+REMOVE_HIGHLIGHTS_SCRIPT = """
+    var registry = window.__browsingHighlights;
+    if (registry && registry.cleanup) registry.cleanup();
+"""
+
+
+def is_overlay_mode(overlay=None):
+    """
+    Tells whether labels are drawn onto screenshots instead of being injected into the page.
+
+    Parameters:
+        overlay: Explicit choice. Defaults to selenium_config["highlight_mode"] == "overlay".
+    """
+    if overlay is None:
+        return get_selenium_config().get("highlight_mode", "dom") == "overlay"
+    return overlay
+
+
+def highlight_elements_with_labels(
+    driver, selector, max_text_length=100, max_options=10, incremental=False, overlay=None
+):
     """
     Highlights elements on the page that match the given CSS selector by adding a red border and labels.
 
+    The same script call returns a description of every labeled element, so callers never need
+    further WebDriver round trips to read texts or dropdown options.
+
+    In incremental mode a MutationObserver, an IntersectionObserver and a scroll listener stay
+    alive on the page. The next incremental call with the same selector only labels candidates
+    that were inserted or scrolled into view since, retires labels of removed nodes and keeps
+    the numbers of all other elements.
+
+    In overlay mode the page DOM is never modified: elements are only measured and registered, and
+    the labels are drawn onto the screenshot afterwards (see screenshot.draw_element_labels).
+
     Parameters:
         driver: Selenium WebDriver instance.
         selector: CSS selector for the elements to be highlighted.
+        max_text_length: Maximum number of characters kept from each element's text.
+        max_options: Maximum number of options returned for each dropdown.
+        incremental: Update the previous highlights instead of re-scanning the whole document.
+        overlay: Skip the DOM changes. Defaults to selenium_config["highlight_mode"] == "overlay".
 
     Returns:
-        Updated WebDriver instance with highlighted elements.
-    """
-    script = f"""
-        // Helper function to check if an element is visible
-        function isElementVisible(element) {{
-            var rect = element.getBoundingClientRect();
-            if (rect.width <= 0 || rect.height <= 0 ||
-                rect.top >= (window.innerHeight || document.documentElement.clientHeight) ||
-                rect.bottom <= 0 ||
-                rect.left >= (window.innerWidth || document.documentElement.clientWidth) ||
-                rect.right <= 0) {{
-                return false;
-            }}
-            // Check if any parent element is hidden
-            var parent = element;
-            while (parent) {{
-                var style = window.getComputedStyle(parent);
-                if (style.display === 'none' || style.visibility === 'hidden') {{
-                    return false;
-                }}
-                parent = parent.parentElement;
-            }}
-            return true;
-        }}
-
-        // Remove previous labels and highlights
-        document.querySelectorAll('.highlight-label').forEach(label => label.remove());
-        document.querySelectorAll('.highlighted-element').forEach(element => {{
-            element.classList.remove('highlighted-element');
-            element.removeAttribute('data-highlighted');
-        }});
-
-        // Inject custom styles for highlighting
-        var styleElement = document.getElementById('highlight-style');
-        if (!styleElement) {{
-            styleElement = document.createElement('style');
-            styleElement.id = 'highlight-style';
-            document.head.appendChild(styleElement);
-        }}
-        styleElement.textContent = `
-            .highlighted-element {{
-                border: 2px solid red !important;
-                position: relative;
-                box-sizing: border-box;
-            }}
-            .highlight-label {{
-                position: absolute;
-                z-index: 2147483647;
-                background: yellow;
-                color: black;
-                font-size: 25px;
-                padding: 3px 5px;
-                border: 1px solid black;
-                border-radius: 3px;
-                white-space: nowrap;
-                box-shadow: 0px 0px 2px #000;
-                top: -25px;
-                left: 0;
-                display: none;
-            }}
-        `;
-
-        // Function to create and append labels
-        function createAndAdjustLabel(element, index) {{
-            if (!isElementVisible(element)) return;
-
-            element.classList.add('highlighted-element');
-            var label = document.createElement('div');
-            label.className = 'highlight-label';
-            label.textContent = index.toString();
-            label.style.display = 'block';
-
-            // Position the label
-            var rect = element.getBoundingClientRect();
-            var top = rect.top + window.scrollY - 25;
-            var left = rect.left + window.scrollX;
-
-            label.style.top = top + 'px';
-            label.style.left = left + 'px';
-
-            document.body.appendChild(label);
-        }}
-
-        // Apply highlighting to matching elements
-        var allElements = document.querySelectorAll('{selector}');
-        var index = 1;
-        allElements.forEach(element => {{
-            if (!element.dataset.highlighted && isElementVisible(element)) {{
-                element.dataset.highlighted = 'true';
-                createAndAdjustLabel(element, index++);
-            }}
-        }});
-    """
-
-    driver.execute_script(script)
-    return driver
+        List of dictionaries, one per labeled element in the viewport, with the keys index, tag, text
+        and bbox ([left, top, width, height] in viewport pixels), plus role, href, name and type when
+        present. Dropdowns also have options (dictionaries with value, text and disabled, in order),
+        optionCount and selectedIndex.
+    """
+    script = """
+        var selector = arguments[0];
+        var options = arguments[1];
+        var done = arguments[arguments.length - 1];
+
+        var viewportWidth = window.innerWidth || document.documentElement.clientWidth;
+        var viewportHeight = window.innerHeight || document.documentElement.clientHeight;
+
+        // Visibility engine. The hidden state of every ancestor is resolved at most once per pass,
+        // so the cost is O(elements + distinct ancestors) instead of O(elements x depth).
+        var hiddenCache = new Map();
+        var nativeCheck = typeof Element.prototype.checkVisibility === 'function';
+
+        function isHidden(element) {
+            if (!element) return false;
+            var cached = hiddenCache.get(element);
+            if (cached !== undefined) return cached;
+            var style = window.getComputedStyle(element);
+            var hidden = style.display === 'none' || style.visibility === 'hidden' || isHidden(element.parentElement);
+            hiddenCache.set(element, hidden);
+            return hidden;
+        }
+
+        function isInViewport(left, top, width, height) {
+            return width > 0 && height > 0 &&
+                top < viewportHeight && top + height > 0 &&
+                left < viewportWidth && left + width > 0;
+        }
+
+        function isElementVisible(element, rect) {
+            // Cheap geometry test first, style resolution only for on-screen candidates
+            if (!isInViewport(rect.left, rect.top, rect.width, rect.height)) return false;
+            if (nativeCheck) {
+                return element.checkVisibility({checkVisibilityCSS: true, visibilityProperty: true});
+            }
+            return !isHidden(element);
+        }
+
+        // Compact description of a labeled element, returned to Python
+        function describeElement(element, index) {
+            var text = element.innerText || element.value || element.getAttribute('aria-label') ||
+                element.getAttribute('placeholder') || '';
+            var entry = {
+                index: index,
+                tag: element.tagName.toLowerCase(),
+                text: text.replace(/\\s+/g, ' ').trim().slice(0, options.maxTextLength)
+            };
+            ['role', 'href', 'name', 'type'].forEach(attribute => {
+                var value = element.getAttribute(attribute);
+                if (value) entry[attribute] = attribute === 'href' ? element.href : value;
+            });
+            if (entry.tag === 'select') {
+                entry.options = Array.from(element.options).slice(0, options.maxOptions).map(option => ({
+                    value: option.value,
+                    text: option.text.replace(/\\s+/g, ' ').trim(),
+                    disabled: option.disabled
+                }));
+                entry.optionCount = element.options.length;
+                entry.selectedIndex = element.selectedIndex;
+            }
+            return entry;
+        }
+
+        function isOwnNode(node) {
+            return node.id === 'highlight-labels' || (node.classList && node.classList.contains('highlight-label'));
+        }
+
+        function ensureStyleAndContainer() {
+            var styleElement = document.getElementById('highlight-style');
+            if (!styleElement) {
+                styleElement = document.createElement('style');
+                styleElement.id = 'highlight-style';
+                styleElement.textContent = `
+                    .highlighted-element {
+                        border: 2px solid red !important;
+                        position: relative;
+                        box-sizing: border-box;
+                    }
+                    #highlight-labels {
+                        position: absolute;
+                        top: 0;
+                        left: 0;
+                        width: 0;
+                        height: 0;
+                        z-index: 2147483647;
+                    }
+                    .highlight-label {
+                        position: absolute;
+                        z-index: 2147483647;
+                        background: yellow;
+                        color: black;
+                        font-size: 25px;
+                        padding: 3px 5px;
+                        border: 1px solid black;
+                        border-radius: 3px;
+                        white-space: nowrap;
+                        box-shadow: 0px 0px 2px #000;
+                    }
+                `;
+                document.head.appendChild(styleElement);
+            }
+            styleElement.disabled = false;
+
+            var container = document.getElementById('highlight-labels');
+            if (!container) {
+                container = document.createElement('div');
+                container.id = 'highlight-labels';
+                document.body.appendChild(container);
+            }
+            container.style.display = '';
+            return container;
+        }
+
+        // Read phase: all layout reads happen here, before any DOM write, so layout is computed once
+        function collectTargets(state, candidates) {
+            var scrollX = window.scrollX;
+            var scrollY = window.scrollY;
+            var targets = [];
+            candidates.forEach(element => {
+                if (state.indexOf.has(element)) return;
+                var rect = element.getBoundingClientRect();
+                if (!isElementVisible(element, rect)) return;
+                var index = state.nextIndex++;
+                state.indexOf.set(element, index);
+                targets.push({
+                    element: element,
+                    index: index,
+                    entry: describeElement(element, index),
+                    docRect: [Math.round(rect.left + scrollX), Math.round(rect.top + scrollY),
+                        Math.round(rect.width), Math.round(rect.height)]
+                });
+            });
+            return targets;
+        }
+
+        // Write phase: mark elements and append all labels at once. Overlay mode only registers them.
+        function labelTargets(state, targets) {
+            var container = state.overlay ? null : ensureStyleAndContainer();
+            var labels = document.createDocumentFragment();
+            targets.forEach(target => {
+                var label = null;
+                if (container) {
+                    target.element.dataset.highlighted = 'true';
+                    target.element.classList.add('highlighted-element');
+
+                    label = document.createElement('div');
+                    label.className = 'highlight-label';
+                    label.textContent = target.index.toString();
+                    label.style.top = (target.docRect[1] - 25) + 'px';
+                    label.style.left = target.docRect[0] + 'px';
+                    labels.appendChild(label);
+                }
+
+                // Register the element, so tools can act on it by index without re-querying the DOM
+                state.entries.set(target.index, {
+                    ref: new WeakRef(target.element),
+                    label: label,
+                    marked: !!container,
+                    entry: target.entry,
+                    docRect: target.docRect
+                });
+            });
+            if (container) container.appendChild(labels);
+        }
+
+        // Labeled elements currently in the viewport, positions derived without layout reads
+        function viewportEntries(state) {
+            var scrollX = window.scrollX;
+            var scrollY = window.scrollY;
+            var result = [];
+            state.entries.forEach(record => {
+                var left = record.docRect[0] - scrollX;
+                var top = record.docRect[1] - scrollY;
+                if (!isInViewport(left, top, record.docRect[2], record.docRect[3])) return;
+                result.push(Object.assign({}, record.entry, {bbox: [left, top, record.docRect[2], record.docRect[3]]}));
+            });
+            return result;
+        }
+
+        function observe(state, candidates) {
+            var intersectionObserver = new IntersectionObserver(records => {
+                records.forEach(record => {
+                    if (record.isIntersecting && !state.indexOf.has(record.target)) state.pending.add(record.target);
+                });
+            });
+            candidates.forEach(element => intersectionObserver.observe(element));
+
+            var mutationObserver = new MutationObserver(records => {
+                records.forEach(record => {
+                    record.addedNodes.forEach(node => {
+                        if (node.nodeType !== Node.ELEMENT_NODE || isOwnNode(node)) return;
+                        if (node.matches(state.selector)) intersectionObserver.observe(node);
+                        node.querySelectorAll(state.selector).forEach(element => intersectionObserver.observe(element));
+                        state.dirty = true;
+                    });
+                    record.removedNodes.forEach(node => {
+                        if (node.nodeType === Node.ELEMENT_NODE && !isOwnNode(node)) state.removals = true;
+                    });
+                });
+            });
+            mutationObserver.observe(document.body, {childList: true, subtree: true});
+
+            var onScroll = () => { state.dirty = true; };
+            window.addEventListener('scroll', onScroll, {passive: true, capture: true});
+
+            state.intersectionObserver = intersectionObserver;
+            state.disconnect = () => {
+                intersectionObserver.disconnect();
+                mutationObserver.disconnect();
+                window.removeEventListener('scroll', onScroll, {capture: true});
+            };
+        }
+
+        // Reverts exactly what this highlighter changed, in O(highlighted elements). The element
+        // handles stay registered, so tools can still act on the numbers after a cleanup.
+        function cleanup(state) {
+            if (state.disconnect) {
+                state.disconnect();
+                state.disconnect = null;
+            }
+            state.entries.forEach(record => {
+                record.label = null;
+                if (!record.marked) return;
+                var element = record.ref.deref();
+                if (element) {
+                    element.classList.remove('highlighted-element');
+                    element.removeAttribute('data-highlighted');
+                }
+                record.marked = false;
+            });
+            var container = document.getElementById('highlight-labels');
+            if (container) container.remove();
+            var styleElement = document.getElementById('highlight-style');
+            if (styleElement) styleElement.remove();
+        }
+
+        function fullPass() {
+            // Remove previous labels and highlights
+            var previous = window.__browsingHighlights;
+            if (previous && previous.cleanup) previous.cleanup();
+
+            var state = window.__browsingHighlights = {
+                generation: options.generation,
+                selector: selector,
+                overlay: options.overlay,
+                entries: new Map(),
+                indexOf: new WeakMap(),
+                nextIndex: 1,
+                pending: new Set(),
+                removals: false,
+                dirty: false,
+                disconnect: null
+            };
+            state.cleanup = () => cleanup(state);
+
+            var candidates = document.querySelectorAll(selector);
+            labelTargets(state, collectTargets(state, candidates));
+            if (options.incremental) observe(state, candidates);
+            return state;
+        }
+
+        function incrementalPass(state) {
+            // Collect intersection changes that are queued but not delivered yet
+            state.intersectionObserver.takeRecords().forEach(record => {
+                if (record.isIntersecting && !state.indexOf.has(record.target)) state.pending.add(record.target);
+            });
+
+            // Retire labels of elements that left the document
+            if (state.removals) {
+                state.entries.forEach((record, index) => {
+                    var element = record.ref.deref();
+                    if (element && element.isConnected) return;
+                    if (element) state.indexOf.delete(element);
+                    if (record.label) record.label.remove();
+                    state.entries.delete(index);
+                });
+                state.removals = false;
+            }
+
+            var candidates = Array.from(state.pending).filter(element => element.isConnected);
+            state.pending.clear();
+            state.dirty = false;
+            labelTargets(state, collectTargets(state, candidates));
+            return state;
+        }
+
+        function finish(state) {
+            done({
+                generation: state.generation,
+                // Without scrollbars, like the clip of the screenshots the boxes are drawn on
+                viewport: [document.documentElement.clientWidth, document.documentElement.clientHeight],
+                elements: viewportEntries(state)
+            });
+        }
+
+        var current = window.__browsingHighlights;
+        if (options.incremental && current && current.disconnect && current.selector === selector &&
+                current.overlay === options.overlay) {
+            if (!current.dirty && !current.removals && !current.pending.size) return finish(incrementalPass(current));
+
+            // Let the observers deliver changes from the last scroll or DOM update first
+            var fired = false;
+            var run = () => {
+                if (fired) return;
+                fired = true;
+                finish(incrementalPass(current));
+            };
+            requestAnimationFrame(() => setTimeout(run, 0));
+            setTimeout(run, 100);
+        } else {
+            finish(fullPass());
+        }
+    """
+
+    options = {
+        "maxTextLength": max_text_length,
+        "maxOptions": max_options,
+        "incremental": incremental,
+        "overlay": is_overlay_mode(overlay),
+        # Used by a full pass only, an incremental pass keeps the numbers and generation it updates
+        "generation": uuid.uuid4().hex,
+    }
+    result = driver.execute_async_script(script, selector, options)
+    _highlight_generations[driver] = result["generation"]
+    _highlight_viewports[driver] = result["viewport"]
+    return result["elements"]
+
+
+def get_highlight_viewport(driver):
+    """
+    Returns the viewport size ([width, height] in CSS pixels) measured by the last highlight pass, or None.
+
+    Parameters:
+        driver: Selenium WebDriver instance.
+    """
+    return _highlight_viewports.get(driver)
+
+
+def get_highlight_generation(driver):
+    """
+    Returns the generation of the last highlight pass run through a driver, or None.
+
+    Parameters:
+        driver: Selenium WebDriver instance.
+    """
+    return _highlight_generations.get(driver)
+
+
+def restore_highlight_handles(driver, generation, viewport):
+    """
+    Makes the element numbers of an earlier highlight pass valid again, for a page that still holds
+    that pass in its registry (e.g. a page restored from the back/forward cache).
+
+    Parameters:
+        driver: Selenium WebDriver instance.
+        generation: Generation of the highlight pass, see get_highlight_generation().
+        viewport: Viewport size measured by the pass, see get_highlight_viewport().
+    """
+    _highlight_generations[driver] = generation
+    _highlight_viewports[driver] = viewport
+
+
+def forget_driver(driver):
+    """
+    Forgets the last highlight pass run through a driver, e.g. once the driver moved to another tab.
+
+    Parameters:
+        driver: Selenium WebDriver instance.
+    """
+    _highlight_generations.pop(driver, None)
+    _highlight_viewports.pop(driver, None)
 
 
-def remove_highlight_and_labels(driver):
+def execute_on_highlighted_element(driver, index, script, *args):
+    """
+    Resolves a highlighted element by its label number and runs a script on it, in a single round trip.
+
+    Parameters:
+        driver: Selenium WebDriver instance.
+        index: Number of the element as shown on its label.
+        script: JavaScript function body. The resolved element is available as `element` and the
+            extra arguments as `args`; its return value is passed back.
+        *args: Extra arguments for the script.
+
+    Returns:
+        The value returned by the script.
+
+    Raises:
+        IndexError: If no element was labeled with that number.
+        StaleElementHandleError: If the page was re-highlighted, navigated or the element was removed.
+    """
+    wrapped_script, generation = _highlighted_element_script(driver, script)
+    result = driver.execute_script(wrapped_script, int(index), generation, *args)
+    return _highlighted_element_value(result, index)
+
+
+async def async_execute_on_highlighted_element(driver, index, script, *args):
+    """
+    Awaitable version of execute_on_highlighted_element().
+
+    Parameters:
+        driver: AsyncDriver instance.
+        index: Number of the element as shown on its label.
+        script: JavaScript function body, see execute_on_highlighted_element().
+        *args: Extra arguments for the script.
+
+    Returns:
+        The value returned by the script.
+    """
+    wrapped_script, generation = _highlighted_element_script(driver.wd, script)
+    result = await driver.execute_script(wrapped_script, int(index), generation, *args)
+    return _highlighted_element_value(result, index)
+
+
+def execute_on_highlighted_elements(driver, indices, script, *args):
+    """
+    Resolves several highlighted elements by their label numbers and runs one script on all of them,
+    in a single round trip.
+
+    Parameters:
+        driver: Selenium WebDriver instance.
+        indices: Numbers of the elements as shown on their labels.
+        script: JavaScript function body. The resolved elements are available as `elements`, in the
+            order of indices, and the extra arguments as `args`; its return value is passed back.
+        *args: Extra arguments for the script.
+
+    Returns:
+        The value returned by the script.
+
+    Raises:
+        IndexError: If no element was labeled with one of the numbers.
+        StaleElementHandleError: If the page was re-highlighted, navigated or an element was removed.
+    """
+    wrapped_script, generation = _highlighted_element_script(driver, script, multiple=True)
+    result = driver.execute_script(wrapped_script, [int(index) for index in indices], generation, *args)
+    return _highlighted_element_value(result, indices[0] if indices else None)
+
+
+async def async_execute_on_highlighted_elements(driver, indices, script, *args):
+    """
+    Awaitable version of execute_on_highlighted_elements().
+
+    Parameters:
+        driver: AsyncDriver instance.
+        indices: Numbers of the elements as shown on their labels.
+        script: JavaScript function body, see execute_on_highlighted_elements().
+        *args: Extra arguments for the script.
+
+    Returns:
+        The value returned by the script.
+    """
+    wrapped_script, generation = _highlighted_element_script(driver.wd, script, multiple=True)
+    result = await driver.execute_script(wrapped_script, [int(index) for index in indices], generation, *args)
+    return _highlighted_element_value(result, indices[0] if indices else None)
+
+
+def _highlighted_element_script(driver, script, multiple=False):
+    generation = _highlight_generations.get(driver)
+    if generation is None:
+        raise StaleElementHandleError("No elements are highlighted on this page. Highlight the elements first.")
+
+    if multiple:
+        resolve_script, variable = RESOLVE_HIGHLIGHTED_ELEMENTS_SCRIPT, "elements"
+    else:
+        resolve_script, variable = RESOLVE_HIGHLIGHTED_ELEMENT_SCRIPT, "element"
+    wrapped_script = (
+        resolve_script
+        + "var args = Array.prototype.slice.call(arguments, 2);\n"
+        + f"return {{value: (function({variable}, args) {{" + script + f"}})({variable}, args)}};"
+    )
+    return wrapped_script, generation
+
+
+def _highlighted_element_value(result, index):
+    error = result.get("error")
+    index = result.get("index", index)
+    if error == "invalid":
+        raise IndexError(f"No highlighted element has number {index}.")
+    if error:
+        raise StaleElementHandleError(
+            f"Element {index} is no longer available because the page changed since the elements were highlighted. "
+            "Highlight the elements again and retry with the new element number."
+        )
+    return result.get("value")
+
+
+def remove_highlight_and_labels(driver, keep_index=False, overlay=None):
     """
     Removes all highlights and labels from the page, reverting the changes made by the highlighting function.
 
     Parameters:
         driver: Selenium WebDriver instance.
+        keep_index: Only hide the highlights (e.g. for a clean screenshot) and keep the element numbers
+            and observers, so the next incremental highlight can show them again.
+        overlay: Overlay mode draws nothing into the page, so there is nothing to hide; removing still
+            disconnects the observers of incremental highlighting. Defaults to
+            selenium_config["highlight_mode"] == "overlay".
 
     Returns:
         Updated WebDriver instance with highlights removed.
     """
-    selector = (
-        'a, button, input, textarea, div[onclick], div[role="button"], div[tabindex], '
-        'span[onclick], span[role="button"], span[tabindex]'
-    )
-    script = f"""
-        // Remove all labels
-        document.querySelectorAll('.highlight-label').forEach(label => label.remove());
+    if not keep_index:
+        driver.execute_script(REMOVE_HIGHLIGHTS_SCRIPT)
+    elif not is_overlay_mode(overlay):
+        driver.execute_script(HIDE_HIGHLIGHTS_SCRIPT)
+    return driver
 
-        // Remove custom style for highlights
-        var highlightStyle = document.getElementById('highlight-style');
-        if (highlightStyle) {{
-            highlightStyle.remove();
-        }}
 
-        // Remove inline styles for highlighted elements
-        document.querySelectorAll('{selector}').forEach(element => {{
-            element.style.border = '';
-        }});
+async def async_remove_highlight_and_labels(driver, keep_index=False, overlay=None):
     """
+    Awaitable version of remove_highlight_and_labels().
 
-    driver.execute_script(script)
+    Parameters:
+        driver: AsyncDriver instance.
+        keep_index: Only hide the highlights and keep the element numbers and observers.
+        overlay: Overlay mode has nothing to hide. Defaults to selenium_config["highlight_mode"] == "overlay".
+
+    Returns:
+        The same AsyncDriver instance.
+    """
+    if not keep_index:
+        await driver.execute_script(REMOVE_HIGHLIGHTS_SCRIPT)
+    elif not is_overlay_mode(overlay):
+        await driver.execute_script(HIDE_HIGHLIGHTS_SCRIPT)
     return driver
@@ -0,0 +1,247 @@
+import collections
+import logging
+
+from .selenium import get_selenium_config, get_session_id
+from .readiness import get_document_count
+from .highlights import (
+    get_highlight_generation,
+    get_highlight_viewport,
+    highlight_elements_with_labels,
+    remove_highlight_and_labels,
+    restore_highlight_handles,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HISTORY_CACHE_SETTINGS = {
+    "enabled": True,
+    "max_entries": 50,  # Pages remembered per session, least recently used are forgotten first
+    "max_text_chars": 20000,  # Text kept per page
+}
+
+# Reads what the history cache keeps of the current page. The text fingerprint (FNV-1a hash and
+# length of the visible text) tells whether the page changed since it was recorded; element labels
+# are hidden while the text is read, so they do not count as a change.
+PAGE_SNAPSHOT_SCRIPT = """
+var maxChars = arguments[0];
+var labels = document.getElementById('highlight-labels');
+var display = labels ? labels.style.display : null;
+if (labels) labels.style.display = 'none';
+var text = document.body ? document.body.innerText : '';
+if (labels) labels.style.display = display;
+
+var hash = 0x811c9dc5;
+for (var i = 0; i < text.length; i++) {
+    hash ^= text.charCodeAt(i);
+    hash = Math.imul(hash, 0x01000193);
+}
+var registry = window.__browsingHighlights;
+var state = window.__browsingReadiness;
+return {
+    url: location.href,
+    title: document.title,
+    fingerprint: (hash >>> 0).toString(16) + ':' + text.length,
+    text: text.slice(0, maxChars),
+    generation: registry ? registry.generation : null,
+    restoredFromCache: !!(state && state.restoredFromCache)
+};
+"""
+
+# session_id -> OrderedDict of navigation entry id -> recorded page, least recently used first
+_history_entries = {}
+
+# session_id -> what the model saw of the current page, recorded by leave_page()
+_pending_pages = {}
+
+_history_stats = {"lookups": 0, "restored": 0, "restored_from_bfcache": 0, "changed": 0, "misses": 0}
+
+
+def get_history_cache_settings():
+    """
+    Returns the history cache settings: selenium_config["history_cache"] on top of the defaults.
+    """
+    return {**DEFAULT_HISTORY_CACHE_SETTINGS, **(get_selenium_config().get("history_cache") or {})}
+
+
+def remember_page(wd, selector=None, elements=None, screenshot_hash=None):
+    """
+    Notes what the model saw of the current page. Nothing is read from the browser here: the page
+    is only recorded in the history cache by leave_page(), once per visit, so going back to it later
+    can reuse what the model already knows about it.
+
+    Parameters:
+        wd: Selenium WebDriver instance.
+        selector: Selector of the highlight pass that returned the elements.
+        elements: Highlight payload returned by highlight_elements_with_labels().
+        screenshot_hash: Perceptual hash of the screenshot the model saw of the page.
+    """
+    if not get_history_cache_settings()["enabled"]:
+        return
+
+    # A navigation the tools did not announce through leave_page() starts a new page
+    navigation = get_document_count(wd)
+    pending = _pending_pages.get(get_session_id())
+    if pending is None or pending["navigation"] != navigation:
+        pending = _pending_pages[get_session_id()] = {"navigation": navigation}
+
+    if elements is not None:
+        pending["highlights"] = {
+            "selector": selector,
+            "elements": elements,
+            "generation": get_highlight_generation(wd),
+            "viewport": get_highlight_viewport(wd),
+        }
+    if screenshot_hash is not None:
+        pending["screenshot_hash"] = screenshot_hash
+
+
+def leave_page(wd):
+    """
+    Records the current page under its navigation history entry, if the model saw anything of it
+    since the last call. Tools call it right before an action that may load another page.
+
+    What was recorded for the entry before is kept as long as the page text did not change, so a
+    highlight and a screenshot taken on different visits end up in the same record.
+
+    Parameters:
+        wd: Selenium WebDriver instance.
+    """
+    pending = _pending_pages.pop(get_session_id(), None)
+    settings = get_history_cache_settings()
+    if not settings["enabled"] or pending is None or pending["navigation"] != get_document_count(wd):
+        return
+
+    try:
+        entry_id = _current_entry_id(wd)
+        snapshot = wd.execute_script(PAGE_SNAPSHOT_SCRIPT, settings["max_text_chars"])
+    except Exception as e:
+        # The cache is an optimization only, browsing goes on without it
+        logger.warning("Could not record the page in the history cache: %s", e)
+        return
+
+    entries = _history_entries.setdefault(get_session_id(), collections.OrderedDict())
+    record = entries.pop(entry_id, None)
+    if record is None or not _matches(record, snapshot):
+        record = {}
+    record.update(
+        url=snapshot["url"], title=snapshot["title"], fingerprint=snapshot["fingerprint"], text=snapshot["text"]
+    )
+    record.update((key, pending[key]) for key in ("highlights", "screenshot_hash") if key in pending)
+
+    entries[entry_id] = record
+    while len(entries) > settings["max_entries"]:
+        entries.popitem(last=False)
+
+
+def forget_current_page(session_id=None):
+    """
+    Drops what the model saw of the current page without recording it, e.g. when the session moves
+    on to a page read without the browser.
+
+    Parameters:
+        session_id: Browsing session. Defaults to the current session.
+    """
+    _pending_pages.pop(session_id or get_session_id(), None)
+
+
+def restore_page(wd):
+    """
+    Looks up the current page in the history cache, e.g. right after going back to it.
+
+    A page restored from the back/forward cache still holds its element registry, so the element
+    numbers of its last highlight stay valid as they are. A page loaded again is highlighted again
+    with the same selector, and its numbers are only reused if every element got the same number
+    and text. Either way the record is only served while the page text is unchanged.
+
+    Parameters:
+        wd: Selenium WebDriver instance.
+
+    Returns:
+        None if the page was never recorded. Otherwise a dictionary with "unchanged",
+        "restored_from_cache" (back/forward cache) and "url"; unchanged pages also have "title",
+        "text" and "screenshot_hash", and "selector" and "elements" when their highlights are still valid.
+    """
+    settings = get_history_cache_settings()
+    entries = _history_entries.get(get_session_id())
+    if not settings["enabled"] or not entries:
+        return None
+
+    _history_stats["lookups"] += 1
+    try:
+        entry_id = _current_entry_id(wd)
+        record = entries.get(entry_id)
+        if record is None:
+            _history_stats["misses"] += 1
+            return None
+        snapshot = wd.execute_script(PAGE_SNAPSHOT_SCRIPT, settings["max_text_chars"])
+    except Exception as e:
+        logger.warning("Could not look up the page in the history cache: %s", e)
+        return None
+
+    result = {"unchanged": False, "restored_from_cache": snapshot["restoredFromCache"], "url": snapshot["url"]}
+    if not _matches(record, snapshot):
+        del entries[entry_id]
+        _history_stats["changed"] += 1
+        return result
+
+    entries.move_to_end(entry_id)
+    _history_stats["restored"] += 1
+    if snapshot["restoredFromCache"]:
+        _history_stats["restored_from_bfcache"] += 1
+    result.update(
+        unchanged=True, title=record["title"], text=record["text"], screenshot_hash=record.get("screenshot_hash")
+    )
+
+    highlights = record.get("highlights")
+    try:
+        if highlights and _restore_highlights(wd, highlights, snapshot["generation"]):
+            result.update(selector=highlights["selector"], elements=highlights["elements"])
+    except Exception as e:
+        logger.warning("Could not restore the highlighted elements: %s", e)
+    return result
+
+
+def forget_history(session_id=None):
+    """
+    Drops everything the history cache recorded for a session.
+
+    Parameters:
+        session_id: Browsing session. Defaults to the current session.
+    """
+    session_id = session_id or get_session_id()
+    _history_entries.pop(session_id, None)
+    _pending_pages.pop(session_id, None)
+
+
+def get_history_cache_stats():
+    """
+    Returns history cache statistics: lookups, pages restored (and how many of them came from the
+    back/forward cache), recorded pages that had changed, and pages never recorded.
+    """
+    return dict(_history_stats)
+
+
+def _current_entry_id(wd):
+    history = wd.execute_cdp_cmd("Page.getNavigationHistory", {})
+    return history["entries"][history["currentIndex"]]["id"]
+
+
+def _matches(record, snapshot):
+    return record["url"] == snapshot["url"] and record["fingerprint"] == snapshot["fingerprint"]
+
+
+def _restore_highlights(wd, highlights, generation):
+    if generation is not None and generation == highlights["generation"]:
+        # Restored from the back/forward cache: the page kept the registry of the highlighted elements
+        restore_highlight_handles(wd, highlights["generation"], highlights["viewport"])
+        remove_highlight_and_labels(wd)
+        return True
+
+    # The page was loaded again, label its elements again and compare them with the recorded ones
+    incremental = get_selenium_config().get("incremental_highlights", True)
+    elements = highlight_elements_with_labels(wd, highlights["selector"], incremental=incremental)
+    remove_highlight_and_labels(wd)
+    if [(e["index"], e["text"]) for e in elements] != [(e["index"], e["text"]) for e in highlights["elements"]]:
+        return False
+    highlights.update(generation=get_highlight_generation(wd), viewport=get_highlight_viewport(wd))
+    return True
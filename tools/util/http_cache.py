@@ -0,0 +1,412 @@
+import base64
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urldefrag, urlparse
+
+from .selenium import get_selenium_config
+
+DEFAULT_HTTP_CACHE_SETTINGS = {
+    "enabled": False,
+    "path": os.path.join(os.path.expanduser("~"), ".cache", "browsing-agent", "http"),
+    "max_bytes": 512 * 1024 * 1024,  # Size cap of all stored bodies, least recently used ones go first
+    "max_entry_bytes": 16 * 1024 * 1024,  # Larger responses are not stored
+    "domain_ttl": {},  # Seconds a response of a domain (and its subdomains) stays fresh, regardless of its headers
+}
+
+CACHEABLE_STATUS_CODES = {200, 203, 300, 301, 308, 404, 410}
+
+# The cache stores decoded bodies, so the transfer headers no longer apply when serving them
+HOP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection", "keep-alive"}
+
+# Cache instances per directory, shared by every driver of the process
+_caches = {}
+_caches_lock = threading.Lock()
+
+# Cache statistics, see get_http_cache_stats()
+_stats_lock = threading.Lock()
+_cache_stats = {"lookups": 0, "hits": 0, "revalidated": 0, "misses": 0, "stored": 0, "bytes_served": 0, "evicted": 0}
+
+
+class HTTPCache:
+    """
+    Disk cache of HTTP responses, shared by every driver on the host.
+
+    Bodies are content-addressed: each distinct body is stored once under blobs/ by its SHA-256,
+    whatever URLs it was served for. The index of URLs, headers and expiry times is a SQLite
+    database, which also makes the cache safe to share between processes.
+    """
+
+    def __init__(self, path, max_bytes):
+        self.path = path
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.join(path, "blobs"), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(path, "index.sqlite3"), timeout=10, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS blobs (hash TEXT PRIMARY KEY, size INTEGER NOT NULL);
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                blob TEXT NOT NULL REFERENCES blobs(hash),
+                status INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS entries_last_access ON entries(last_access);
+            """
+        )
+        self._db.commit()
+
+    def lookup(self, key):
+        """
+        Returns the entry of a request key as a dictionary (status, headers, blob, expires_at), or None.
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT blob, status, headers, expires_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+        return {"blob": row[0], "status": row[1], "headers": json.loads(row[2]), "expires_at": row[3]}
+
+    def read_body(self, blob):
+        """
+        Returns the body stored under a content hash, or None if it was evicted meanwhile.
+        """
+        try:
+            with open(self._blob_path(blob), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def store(self, key, status, headers, body, expires_at):
+        """
+        Stores a response and evicts the least recently used entries beyond the size cap.
+        """
+        blob = hashlib.sha256(body).hexdigest()
+        blob_path = self._blob_path(blob)
+        if not os.path.exists(blob_path):
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            temporary_path = f"{blob_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temporary_path, "wb") as f:
+                f.write(body)
+            os.replace(temporary_path, blob_path)
+
+        with self._lock:
+            self._db.execute("INSERT OR IGNORE INTO blobs (hash, size) VALUES (?, ?)", (blob, len(body)))
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (key, blob, status, headers, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, blob, status, json.dumps(headers), expires_at, time.time()),
+            )
+            self._db.commit()
+            self._evict()
+
+    def refresh(self, key, headers, expires_at):
+        """
+        Updates the headers and expiry of an entry after a successful revalidation.
+        """
+        with self._lock:
+            self._db.execute(
+                "UPDATE entries SET headers = ?, expires_at = ?, last_access = ? WHERE key = ?",
+                (json.dumps(headers), expires_at, time.time(), key),
+            )
+            self._db.commit()
+
+    def size(self):
+        """
+        Returns the total size of the stored bodies in bytes.
+        """
+        with self._lock:
+            return self._db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        # Evict down to 90% of the cap, so the next few stores do not evict again
+        target = self.max_bytes * 0.9
+        evicted = 0
+        for key, blob in self._db.execute("SELECT key, blob FROM entries ORDER BY last_access").fetchall():
+            if total <= target:
+                break
+            self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            evicted += 1
+            if self._db.execute("SELECT 1 FROM entries WHERE blob = ? LIMIT 1", (blob,)).fetchone():
+                continue
+            size = self._db.execute("SELECT size FROM blobs WHERE hash = ?", (blob,)).fetchone()
+            self._db.execute("DELETE FROM blobs WHERE hash = ?", (blob,))
+            total -= size[0] if size else 0
+            try:
+                os.remove(self._blob_path(blob))
+            except FileNotFoundError:
+                pass
+        self._db.commit()
+        _count("evicted", evicted)
+
+    def _blob_path(self, blob):
+        return os.path.join(self.path, "blobs", blob[:2], blob)
+
+
+def get_http_cache_settings():
+    """
+    Returns the HTTP cache settings: selenium_config["http_cache"] on top of the defaults.
+    """
+    return {**DEFAULT_HTTP_CACHE_SETTINGS, **(get_selenium_config().get("http_cache") or {})}
+
+
+def get_http_cache():
+    """
+    Returns the cache of the configured directory, opening it on first use.
+    """
+    settings = get_http_cache_settings()
+    path = os.path.expanduser(settings["path"])
+    with _caches_lock:
+        cache = _caches.get(path)
+        if cache is None:
+            cache = _caches[path] = HTTPCache(path, settings["max_bytes"])
+        cache.max_bytes = settings["max_bytes"]
+        return cache
+
+
+def enable_http_cache(wd):
+    """
+    Serves a driver's requests from the shared disk cache, when selenium_config["http_cache"] enables it.
+
+    GET requests are looked up when they are paused by Fetch: fresh entries are fulfilled from disk,
+    stale ones with a validator are revalidated with If-None-Match/If-Modified-Since, and cacheable
+    responses (Cache-Control, Expires, ETag, Last-Modified or a domain TTL) are stored on the way back.
+
+    Parameters:
+        wd: Selenium WebDriver instance.
+    """
+    from .interception import get_request_interceptor, has_request_interceptor
+
+    settings = get_http_cache_settings()
+    if not settings["enabled"]:
+        if has_request_interceptor(wd):
+            get_request_interceptor(wd).remove_handler("http_cache")
+        return
+
+    patterns = [{"urlPattern": "*", "requestStage": "Request"}, {"urlPattern": "*", "requestStage": "Response"}]
+    interceptor = get_request_interceptor(wd)
+    if not interceptor.has_handler("http_cache"):
+        # After the resource policy, so blocked requests are never served from the cache
+        interceptor.set_handler("http_cache", _make_cache_handler(get_http_cache()), patterns, order=10)
+
+
+def get_http_cache_stats():
+    """
+    Returns cache statistics: lookups, fresh hits, successful revalidations, misses, responses stored,
+    entries evicted, bytes served from disk and the hit ratio (hits and revalidations per lookup).
+    """
+    with _stats_lock:
+        stats = dict(_cache_stats)
+    served = stats["hits"] + stats["revalidated"]
+    stats["hit_ratio"] = round(served / stats["lookups"], 3) if stats["lookups"] else 0.0
+    return stats
+
+
+def _count(name, amount=1):
+    with _stats_lock:
+        _cache_stats[name] += amount
+
+
+def _make_cache_handler(cache):
+    # Requests sent with validators, waiting for a 304: requestId -> (key, cached entry)
+    revalidating = {}
+
+    def handle(session, params):
+        request = params["request"]
+        if not _is_cacheable_request(request):
+            return False
+
+        key = _cache_key(request)
+        settings = get_http_cache_settings()
+
+        if "responseStatusCode" in params or "responseErrorReason" in params:
+            pending = revalidating.pop(params["requestId"], None)
+            if "responseErrorReason" in params:
+                return False
+
+            status = params["responseStatusCode"]
+            headers = _header_dict(params.get("responseHeaders", []))
+            if status == 304 and pending:
+                return _serve_revalidated(session, cache, params, key, pending, headers, settings)
+            return _store_response(session, cache, params, key, status, headers, settings)
+
+        _count("lookups")
+        entry = cache.lookup(key)
+        if entry is None:
+            _count("misses")
+            return False
+
+        if entry["expires_at"] > time.time():
+            body = cache.read_body(entry["blob"])
+            if body is not None:
+                _fulfill(session, params["requestId"], entry["status"], entry["headers"], body)
+                _count("hits")
+                _count("bytes_served", len(body))
+                return True
+
+        validators = {}
+        if "etag" in entry["headers"]:
+            validators["If-None-Match"] = entry["headers"]["etag"]
+        if "last-modified" in entry["headers"]:
+            validators["If-Modified-Since"] = entry["headers"]["last-modified"]
+        if not validators:
+            _count("misses")
+            return False
+
+        revalidating[params["requestId"]] = (key, entry)
+        headers = {**request.get("headers", {}), **validators}
+        session.send_async(
+            "Fetch.continueRequest",
+            {"requestId": params["requestId"], "headers": [{"name": n, "value": v} for n, v in headers.items()]},
+        )
+        return True
+
+    return handle
+
+
+def _serve_revalidated(session, cache, params, key, pending, headers, settings):
+    _, entry = pending
+    body = cache.read_body(entry["blob"])
+    if body is None:
+        _count("misses")
+        return False
+
+    # A 304 carries the updated caching headers of the stored response
+    merged = {**entry["headers"], **{n: v for n, v in headers.items() if not n.startswith("content-")}}
+    lifetime = _freshness_lifetime(merged, urlparse(params["request"]["url"]).hostname or "", settings)
+    if lifetime is not None:
+        cache.refresh(key, merged, time.time() + lifetime)
+
+    _fulfill(session, params["requestId"], entry["status"], merged, body)
+    _count("revalidated")
+    _count("bytes_served", len(body))
+    return True
+
+
+def _store_response(session, cache, params, key, status, headers, settings):
+    if status not in CACHEABLE_STATUS_CODES or "set-cookie" in headers:
+        return False
+    if headers.get("vary", "").strip().lower() not in ("", "accept-encoding"):
+        return False
+    if int(headers.get("content-length", 0) or 0) > settings["max_entry_bytes"]:
+        return False
+
+    lifetime = _freshness_lifetime(headers, urlparse(params["request"]["url"]).hostname or "", settings)
+    if lifetime is None:
+        return False
+
+    if 300 <= status < 400:
+        # Fetch.getResponseBody fails on redirects. Their headers are the whole response, so the
+        # entry is stored without a body and the redirect goes on unchanged.
+        cache.store(key, status, headers, b"", time.time() + lifetime)
+        _count("stored")
+        return False
+
+    result = session.send("Fetch.getResponseBody", {"requestId": params["requestId"]})
+    body = base64.b64decode(result["body"]) if result.get("base64Encoded") else result["body"].encode("utf-8")
+    if len(body) <= settings["max_entry_bytes"]:
+        cache.store(key, status, headers, body, time.time() + lifetime)
+        _count("stored")
+
+    # The body has been read, so the response is handed over in full
+    _fulfill(session, params["requestId"], status, headers, body)
+    return True
+
+
+def _fulfill(session, request_id, status, headers, body):
+    session.send_async(
+        "Fetch.fulfillRequest",
+        {
+            "requestId": request_id,
+            "responseCode": status,
+            "responseHeaders": [{"name": n, "value": v} for n, v in headers.items() if n not in HOP_HEADERS],
+            "body": base64.b64encode(body).decode("ascii"),
+        },
+    )
+
+
+def _is_cacheable_request(request):
+    if request.get("method", "GET") != "GET" or not request["url"].startswith(("http://", "https://")):
+        return False
+    headers = {name.lower(): value for name, value in request.get("headers", {}).items()}
+    if "authorization" in headers or "range" in headers:
+        return False
+    return "no-cache" not in headers.get("cache-control", "") and "no-cache" not in headers.get("pragma", "")
+
+
+def _cache_key(request):
+    return "GET " + urldefrag(request["url"])[0]
+
+
+def _header_dict(header_entries):
+    headers = {}
+    for header in header_entries:
+        name = header["name"].lower()
+        headers[name] = f"{headers[name]}, {header['value']}" if name in headers else header["value"]
+    return headers
+
+
+def _parse_cache_control(value):
+    directives = {}
+    for part in value.split(","):
+        name, _, argument = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = argument.strip('"')
+    return directives
+
+
+def _parse_http_date(value):
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def _freshness_lifetime(headers, host, settings):
+    """
+    Returns how many seconds a response stays fresh, or None if it must not be stored.
+    """
+    cache_control = _parse_cache_control(headers.get("cache-control", ""))
+    if "no-store" in cache_control or "private" in cache_control:
+        return None
+
+    for domain, ttl in settings["domain_ttl"].items():
+        if host == domain or host.endswith("." + domain):
+            return ttl
+
+    # The cache is shared by every driver on the host, so the shared cache lifetime comes first
+    max_age = next(
+        (cache_control[name] for name in ("s-maxage", "max-age") if cache_control.get(name, "").isdigit()), None
+    )
+
+    lifetime = 0
+    if "no-cache" in cache_control:
+        lifetime = 0
+    elif max_age is not None:
+        age = headers.get("age", "0")
+        lifetime = int(max_age) - (int(age) if age.isdigit() else 0)
+    elif "expires" in headers:
+        expires = _parse_http_date(headers["expires"])
+        date = _parse_http_date(headers.get("date", "")) or time.time()
+        lifetime = expires - date if expires is not None else 0
+
+    # Without a lifetime the response is still worth keeping if it can be revalidated
+    if lifetime <= 0 and "etag" not in headers and "last-modified" not in headers:
+        return None
+    return max(0, lifetime)
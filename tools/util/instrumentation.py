@@ -0,0 +1,151 @@
+import json
+import weakref
+
+from .selenium import get_selenium_config
+from .readiness import READINESS_TRACKER_SCRIPT
+
+# Selectors of pop-ups removed from every page ("*") or from pages of a domain and its subdomains.
+# Extend with register_popup_rule() or selenium_config["popup_rules"].
+POPUP_RULES = {
+    "*": ["modal", "popup", "overlay", "dialog"],
+    "linkedin.com": ["div.msg-overlay-list-bubble", "div.ml4.msg-overlay-list-bubble__tablet-height"],
+}
+
+# Removes pop-ups matching the rules of the current host once the document is parsed, once it is
+# loaded and whenever the DOM changes afterwards (debounced).
+POPUP_REMOVAL_SCRIPT = """
+(function(rules) {
+    if (window.__browsingPopupRemoval) return;
+    window.__browsingPopupRemoval = true;
+
+    var host = location.hostname;
+    var selectors = [];
+    Object.keys(rules).forEach(function(domain) {
+        if (domain === '*' || host === domain || host.endsWith('.' + domain)) {
+            selectors = selectors.concat(rules[domain]);
+        }
+    });
+    if (!selectors.length) return;
+    var selector = selectors.join(', ');
+
+    function removePopups() {
+        document.querySelectorAll(selector).forEach(function(element) {
+            element.remove();
+        });
+    }
+
+    var timer = null;
+    function scheduleRemoval() {
+        if (timer) return;
+        timer = setTimeout(function() {
+            timer = null;
+            removePopups();
+        }, 250);
+    }
+
+    function start() {
+        removePopups();
+        new MutationObserver(scheduleRemoval).observe(document.documentElement, {childList: true, subtree: true});
+    }
+
+    if (document.readyState === 'loading') {
+        document.addEventListener('DOMContentLoaded', start, {once: true});
+    } else {
+        start();
+    }
+    window.addEventListener('load', removePopups, {once: true});
+})(%s);
+"""
+
+# The wait script of the readiness check enforces its own deadline, so the WebDriver limit only
+# has to stay out of the way
+MAX_SCRIPT_TIMEOUT = 300
+
+# Per driver: (script identifier, bundle source, device scale) of the installed instrumentation
+_installed_bundles = weakref.WeakKeyDictionary()
+
+
+def register_popup_rule(domain, selectors):
+    """
+    Adds pop-up selectors removed on a domain and its subdomains ("*" for every page).
+    Drivers pick up the new rules the next time set_web_driver() runs.
+
+    Parameters:
+        domain: Domain such as "linkedin.com", or "*".
+        selectors: List of CSS selectors of the pop-ups to remove.
+    """
+    POPUP_RULES.setdefault(domain, [])
+    POPUP_RULES[domain] = POPUP_RULES[domain] + [s for s in selectors if s not in POPUP_RULES[domain]]
+
+
+def get_instrumentation_bundle():
+    """
+    Returns the source of the script evaluated on every new document: the readiness tracker and
+    pop-up removal with the current rule table.
+    """
+    rules = {domain: list(selectors) for domain, selectors in POPUP_RULES.items()}
+    for domain, selectors in (get_selenium_config().get("popup_rules") or {}).items():
+        rules[domain] = rules.get(domain, []) + list(selectors)
+    return READINESS_TRACKER_SCRIPT + POPUP_REMOVAL_SCRIPT % json.dumps(rules)
+
+
+def install_instrumentation(wd):
+    """
+    Installs the page instrumentation bundle on a driver, once.
+
+    The bundle is registered with Page.addScriptToEvaluateOnNewDocument, so every document the
+    driver loads from then on is instrumented without any further WebDriver call. The page is
+    scaled with Emulation.setDeviceMetricsOverride instead of a CSS zoom on the body. Calls with
+    unchanged rules and scale return without talking to the browser.
+
+    Parameters:
+        wd: Selenium WebDriver instance.
+    """
+    source = get_instrumentation_bundle()
+    device_scale = get_selenium_config().get("device_scale", 1.2)
+
+    installed = _installed_bundles.get(wd)
+    if installed and installed[1] == source and installed[2] == device_scale:
+        return
+
+    if installed:
+        wd.execute_cdp_cmd("Page.removeScriptToEvaluateOnNewDocument", {"identifier": installed[0]})
+    else:
+        wd.set_script_timeout(MAX_SCRIPT_TIMEOUT)
+
+    identifier = wd.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": source})["identifier"]
+
+    scale_changed = not installed or installed[2] != device_scale
+    if installed and scale_changed:
+        wd.execute_cdp_cmd("Emulation.clearDeviceMetricsOverride", {})
+
+    # Instrument the document that is already loaded and measure the unscaled viewport
+    width, height = wd.execute_script(source + "return [window.innerWidth, window.innerHeight];")
+    if scale_changed and device_scale != 1:
+        _apply_device_scale(wd, width, height, device_scale)
+
+    _installed_bundles[wd] = (identifier, source, device_scale)
+
+
+def forget_driver(wd):
+    """
+    Forgets the bundle installed on a driver's page, so the next install_instrumentation() call
+    installs it again, e.g. once the driver moved to another tab.
+
+    Parameters:
+        wd: Selenium WebDriver instance.
+    """
+    _installed_bundles.pop(wd, None)
+
+
+def _apply_device_scale(wd, width, height, device_scale):
+    # A smaller CSS viewport rendered with more device pixels per CSS pixel is what browser zoom does
+    wd.execute_cdp_cmd(
+        "Emulation.setDeviceMetricsOverride",
+        {
+            "width": round(width / device_scale),
+            "height": round(height / device_scale),
+            "deviceScaleFactor": device_scale,
+            "mobile": False,
+        },
+    )
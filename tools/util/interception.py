@@ -0,0 +1,121 @@
+import logging
+import threading
+import weakref
+
+from .cdp import get_cdp_session
+
+logger = logging.getLogger(__name__)
+
+# Request interceptor of each driver
+_interceptors = weakref.WeakKeyDictionary()
+_interceptors_lock = threading.Lock()
+
+
+class RequestInterceptor:
+    """
+    Routes the Fetch.requestPaused events of a driver's page through an ordered chain of handlers.
+
+    Each handler is called with the CDP session and the event params and returns True once it
+    has resolved the request (failed, fulfilled or continued it). Requests no handler resolves are
+    continued unchanged. Fetch is only enabled for the union of the handlers' URL patterns, so
+    requests nobody is interested in never leave the browser.
+    """
+
+    def __init__(self, session):
+        self.session = session
+        self._handlers = []  # (name, handler, patterns, order), sorted by order
+        self._lock = threading.Lock()
+        session.on("Fetch.requestPaused", self._on_request_paused)
+
+    def set_handler(self, name, handler, patterns, order=0):
+        """
+        Adds a handler, or replaces the handler of the same name.
+
+        Parameters:
+            name: Handler name, e.g. "resource_policy".
+            handler: Callable taking (session, params) and returning True if it resolved the request.
+            patterns: List of Fetch.RequestPattern dictionaries the handler needs paused.
+            order: Handlers with a lower order see each request first.
+        """
+        with self._lock:
+            handlers = [entry for entry in self._handlers if entry[0] != name]
+            handlers.append((name, handler, patterns, order))
+            self._handlers = sorted(handlers, key=lambda entry: entry[3])
+            self._enable()
+
+    def has_handler(self, name):
+        """
+        Tells whether a handler of the given name is installed.
+        """
+        return any(entry[0] == name for entry in self._handlers)
+
+    def remove_handler(self, name):
+        """
+        Removes a handler. Fetch is disabled once no handler is left.
+
+        Parameters:
+            name: Handler name.
+        """
+        with self._lock:
+            self._handlers = [entry for entry in self._handlers if entry[0] != name]
+            self._enable()
+
+    def _enable(self):
+        patterns = []
+        for _, _, handler_patterns, _ in self._handlers:
+            patterns.extend(p for p in handler_patterns if p not in patterns)
+        if patterns:
+            self.session.send("Fetch.enable", {"patterns": patterns})
+        else:
+            self.session.send("Fetch.disable")
+
+    def _on_request_paused(self, params):
+        for _, handler, _, _ in list(self._handlers):
+            try:
+                if handler(self.session, params):
+                    return
+            except Exception as e:
+                logger.warning("Error while intercepting %s: %s", params["request"]["url"], e)
+                break
+        # Also valid at the response stage, where it lets the response through unchanged
+        self.session.send_async("Fetch.continueRequest", {"requestId": params["requestId"]})
+
+
+def get_request_interceptor(wd):
+    """
+    Returns the request interceptor of a driver's page, creating it on first use.
+
+    Parameters:
+        wd: Selenium WebDriver instance.
+
+    Returns:
+        RequestInterceptor instance.
+    """
+    with _interceptors_lock:
+        interceptor = _interceptors.get(wd)
+        if interceptor is None or interceptor.session.closed:
+            interceptor = RequestInterceptor(get_cdp_session(wd))
+            _interceptors[wd] = interceptor
+        return interceptor
+
+
+def has_request_interceptor(wd):
+    """
+    Tells whether a driver already has a live request interceptor.
+
+    Parameters:
+        wd: Selenium WebDriver instance.
+    """
+    interceptor = _interceptors.get(wd)
+    return interceptor is not None and not interceptor.session.closed
+
+
+def forget_driver(wd):
+    """
+    Drops the request interceptor of a driver's page, e.g. once the driver moved to another tab.
+
+    Parameters:
+        wd: Selenium WebDriver instance.
+    """
+    with _interceptors_lock:
+        _interceptors.pop(wd, None)
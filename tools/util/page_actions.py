@@ -0,0 +1,223 @@
+from selenium.webdriver import Keys
+
+from .selenium import switch_to_window
+from .history_cache import leave_page
+from .highlights import remove_highlight_and_labels, async_remove_highlight_and_labels
+from .readiness import (
+    mark_navigation,
+    wait_for_page_ready,
+    wait_for_click_outcome,
+    async_mark_navigation,
+    async_wait_for_page_ready,
+    async_wait_for_click_outcome,
+)
+
+# Scripts and helpers shared by the tools that act on a page and by ActionPlan, which runs the
+# same actions as steps. Tool modules never import each other.
+
+# Resolves the highlighted element and its text in a single round trip
+ELEMENT_AND_TEXT_SCRIPT = "return [element, (element.innerText || '').trim()];"
+
+# Scrolls by one viewport height, unless the page is already at that end. The viewport height is
+# in CSS pixels (page scaling is already applied through device emulation).
+SCROLL_SCRIPT = """
+var direction = arguments[0];
+var viewportHeight = window.innerHeight;
+var position = window.pageYOffset;
+if (direction === 'up') {
+    if (position === 0) return false;
+    window.scrollBy(0, -viewportHeight);
+} else {
+    if (position + viewportHeight >= document.body.scrollHeight) return false;
+    window.scrollBy(0, viewportHeight);
+}
+return true;
+"""
+
+# Selects an option in every dropdown at once and fires the events a user selection would.
+# Each choice is resolved as an option value, then the option text (case and whitespace
+# insensitive), then an option index, then the closest option text. A number is only taken as an
+# index when no option has it as value or text, e.g. a year or quantity picker. Returns one report
+# per dropdown.
+SELECT_OPTIONS_SCRIPT = """
+    var choices = args[0];
+
+    function normalize(text) {
+        return String(text || '').replace(/\\s+/g, ' ').trim().toLowerCase();
+    }
+
+    function similarity(a, b) {
+        if (!a || !b) return 0;
+        if (a.indexOf(b) !== -1 || b.indexOf(a) !== -1) {
+            return 0.6 + 0.4 * Math.min(a.length, b.length) / Math.max(a.length, b.length);
+        }
+        // Dice coefficient of the character bigrams
+        var bigrams = new Map(), matches = 0, i;
+        for (i = 0; i < a.length - 1; i++) {
+            var gram = a.slice(i, i + 2);
+            bigrams.set(gram, (bigrams.get(gram) || 0) + 1);
+        }
+        for (i = 0; i < b.length - 1; i++) {
+            var count = bigrams.get(b.slice(i, i + 2));
+            if (count) {
+                matches++;
+                bigrams.set(b.slice(i, i + 2), count - 1);
+            }
+        }
+        return 2 * matches / Math.max(1, a.length + b.length - 2);
+    }
+
+    function resolve(select, choice) {
+        var options = Array.from(select.options);
+        var wanted = String(choice).trim();
+        var match = options.find(option => option.value === wanted);
+        if (match) return {option: match, by: 'value'};
+        var normalized = normalize(wanted);
+        match = options.find(option => normalize(option.text) === normalized);
+        if (match) return {option: match, by: 'text'};
+        if (/^\\d+$/.test(wanted) && Number(wanted) < options.length) {
+            return {option: options[Number(wanted)], by: 'index'};
+        }
+
+        var best = null, bestScore = 0;
+        options.forEach(function(option) {
+            if (option.disabled) return;
+            var score = similarity(normalize(option.text), normalized);
+            if (score > bestScore) {
+                best = option;
+                bestScore = score;
+            }
+        });
+        return best && bestScore >= 0.5 ? {option: best, by: 'closest text'} : null;
+    }
+
+    return elements.map(function(element, i) {
+        var choice = choices[i];
+        if (element.tagName !== 'SELECT') return {error: 'Element is not a dropdown.'};
+        var match = resolve(element, choice);
+        if (!match) {
+            return {error: 'No option matches "' + choice + '", the dropdown has ' + element.options.length + ' options.'};
+        }
+        var text = match.option.text.replace(/\\s+/g, ' ').trim();
+        if (match.option.disabled) return {error: 'Option "' + text + '" is disabled.'};
+
+        element.selectedIndex = match.option.index;
+        element.dispatchEvent(new Event('input', {bubbles: true}));
+        element.dispatchEvent(new Event('change', {bubbles: true}));
+        return {text: text, value: match.option.value, by: match.by};
+    });
+"""
+
+# Fills all fields in one call: the value is set through the native value setter, which frameworks
+# like React and Vue do not override, followed by the input and change events they listen to.
+# Fields that are not plain text inputs or that do not keep the value as set (masks, maxlength,
+# invalid numbers) are reported for keystroke emulation. Returns [reports, elements].
+BULK_FILL_SCRIPT = """
+    var values = args[0];
+    var textTypes = ['text', 'email', 'password', 'search', 'tel', 'url', 'number'];
+    var reports = elements.map(function(element, i) {
+        var value = values[i];
+        var tag = element.tagName;
+        var type = (element.getAttribute('type') || 'text').toLowerCase();
+        if (element.disabled || element.readOnly) return {path: 'failed', reason: 'field is disabled or read-only'};
+        if (!(tag === 'TEXTAREA' || (tag === 'INPUT' && textTypes.indexOf(type) !== -1))) {
+            return {path: 'keys', reason: 'not a plain text field'};
+        }
+        if (element.maxLength > 0 && value.length > element.maxLength) {
+            return {path: 'keys', reason: 'value is longer than the field allows'};
+        }
+        try {
+            var prototype = tag === 'INPUT' ? HTMLInputElement.prototype : HTMLTextAreaElement.prototype;
+            var setValue = Object.getOwnPropertyDescriptor(prototype, 'value').set;
+            element.focus();
+            setValue.call(element, value);
+            element.dispatchEvent(new Event('input', {bubbles: true}));
+            element.dispatchEvent(new Event('change', {bubbles: true}));
+            element.blur();
+        } catch (e) {
+            return {path: 'keys', reason: 'value could not be set: ' + e.message};
+        }
+        if (element.value !== value) return {path: 'keys', reason: 'field did not keep the value'};
+        return {path: 'native'};
+    });
+    return [reports, elements];
+"""
+
+
+def type_with_keys(element, value):
+    """
+    Clears a field and types a value into it key by key, for fields that reject programmatic input.
+
+    Parameters:
+        element: WebElement of the field.
+        value: Text to type.
+    """
+    # Click, clear, and send keys to the input field
+    try:
+        element.click()
+        element.send_keys(Keys.CONTROL + "a")  # Select all text
+        element.send_keys(Keys.DELETE)
+        element.clear()
+    except Exception:
+        pass
+    element.send_keys(value)
+
+
+def click_element(wd, element):
+    """
+    Clicks an element and waits only as long as whatever the click triggered needs. A tab opened
+    by the click becomes the session's page.
+
+    Parameters:
+        wd: Selenium WebDriver instance.
+        element: WebElement to click.
+
+    Returns:
+        The click outcome, see wait_for_click_outcome().
+    """
+    leave_page(wd)
+    handles = wd.window_handles
+    token = mark_navigation(wd)
+    try:
+        element.click()
+    except Exception as e:
+        if "element click intercepted" in str(e).lower():
+            wd.execute_script("arguments[0].click();", element)
+        else:
+            raise e
+
+    outcome = wait_for_click_outcome(wd, token, handles)
+    if outcome["window"]:
+        remove_highlight_and_labels(wd)
+        switch_to_window(wd, outcome["window"])
+        outcome["readiness"] = wait_for_page_ready(wd)
+        outcome["waited"] += outcome["readiness"]["waited"]
+    return outcome
+
+
+async def async_click_element(driver, element):
+    """
+    Awaitable version of click_element().
+
+    Parameters:
+        driver: AsyncDriver instance.
+        element: WebElement to click.
+    """
+    await driver.run(leave_page, driver.wd)
+    handles = await driver.run(getattr, driver.wd, "window_handles")
+    token = await async_mark_navigation(driver)
+    try:
+        await driver.click(element)
+    except Exception as e:
+        if "element click intercepted" in str(e).lower():
+            await driver.execute_script("arguments[0].click();", element)
+        else:
+            raise e
+
+    outcome = await async_wait_for_click_outcome(driver, token, handles)
+    if outcome["window"]:
+        await async_remove_highlight_and_labels(driver)
+        await driver.run(switch_to_window, driver.wd, outcome["window"])
+        outcome["readiness"] = await async_wait_for_page_ready(driver)
+        outcome["waited"] += outcome["readiness"]["waited"]
+    return outcome
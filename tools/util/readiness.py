@@ -0,0 +1,530 @@
+import asyncio
+import time
+import uuid
+import weakref
+
+from selenium.common.exceptions import WebDriverException
+
+from .selenium import get_selenium_config
+
+# In-page tracker of the signals the readiness check waits on. It is registered with
+# Page.addScriptToEvaluateOnNewDocument so it runs before any page script on every new
+# document, which lets it count requests that start while the page is still parsing.
+READINESS_TRACKER_SCRIPT = """
+(function() {
+    if (window.__browsingReadiness) return;
+    var state = {
+        inflight: 0,
+        lastNetwork: performance.now(),
+        lastMutation: performance.now(),
+        mutations: 0,
+        requestsStarted: 0,
+        structuralMutations: 0,
+        navigationsStarted: 0,
+        restoredFromCache: false,
+        documentId: Math.random().toString(36).slice(2)
+    };
+    window.__browsingReadiness = state;
+
+    function requestStarted() {
+        state.requestsStarted++;
+        state.inflight++;
+        state.lastNetwork = performance.now();
+    }
+    function requestEnded() {
+        state.inflight = Math.max(0, state.inflight - 1);
+        state.lastNetwork = performance.now();
+    }
+
+    // Count fetch() and XMLHttpRequest calls that are still in flight
+    if (window.fetch) {
+        var originalFetch = window.fetch;
+        window.fetch = function() {
+            requestStarted();
+            return originalFetch.apply(this, arguments).finally(requestEnded);
+        };
+    }
+    var originalSend = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function() {
+        requestStarted();
+        this.addEventListener('loadend', requestEnded, {once: true});
+        return originalSend.apply(this, arguments);
+    };
+
+    // Images, scripts and stylesheets only show up once they finish loading
+    try {
+        new PerformanceObserver(function() {
+            state.lastNetwork = performance.now();
+        }).observe({type: 'resource', buffered: true});
+    } catch (e) {}
+
+    new MutationObserver(function(records) {
+        state.mutations += records.length;
+        // Nodes added or removed, unlike class toggles, animations and ticking timers
+        state.structuralMutations += records.filter(function(record) { return record.type === 'childList'; }).length;
+        state.lastMutation = performance.now();
+    }).observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+
+    // A navigation to another document shows no activity in this one until the new one commits
+    function navigationStarted() {
+        state.navigationsStarted++;
+    }
+    if (window.navigation) {
+        navigation.addEventListener('navigate', function(event) {
+            if (!event.destination.sameDocument && !event.downloadRequest) navigationStarted();
+        });
+    } else {
+        window.addEventListener('beforeunload', navigationStarted);
+    }
+
+    window.addEventListener('pageshow', function(event) {
+        state.restoredFromCache = event.persisted;
+    });
+})();
+"""
+
+# Resolves once the document is complete, the network is idle and the DOM stopped changing, or
+# when the time budget runs out. A few open requests are tolerated (max_inflight_requests), since
+# long-polling and analytics beacons never finish. Runs as a single execute_async_script call.
+WAIT_FOR_READY_SCRIPT = READINESS_TRACKER_SCRIPT + """
+var options = arguments[0];
+var done = arguments[arguments.length - 1];
+var started = performance.now();
+
+function snapshot(stable) {
+    var state = window.__browsingReadiness;
+    return {
+        stable: stable,
+        navigated: !!options.token && window.__browsingNavigationToken !== options.token,
+        host: location.host,
+        url: location.href,
+        document: state.documentId,
+        readyState: document.readyState,
+        inflight: state.inflight,
+        mutations: state.mutations
+    };
+}
+
+function check() {
+    var state = window.__browsingReadiness;
+    var now = performance.now();
+    var committed = !options.requireNavigation || window.__browsingNavigationToken !== options.token;
+    var complete = document.readyState === 'complete';
+    var networkIdle = state.inflight <= options.maxInflight && now - state.lastNetwork >= options.networkIdleMs;
+    var domQuiet = now - state.lastMutation >= options.domQuietMs;
+
+    if (committed && complete && networkIdle && domQuiet) return done(snapshot(true));
+    if (now - started >= options.timeoutMs) return done(snapshot(false));
+    setTimeout(check, 50);
+}
+check();
+"""
+
+# Tags the current document for mark_navigation() and records the state the effect of the coming
+# action is measured against
+MARK_NAVIGATION_SCRIPT = READINESS_TRACKER_SCRIPT + """
+var state = window.__browsingReadiness;
+window.__browsingNavigationToken = arguments[0];
+window.__browsingNavigationMark = {
+    structuralMutations: state.structuralMutations,
+    requestsStarted: state.requestsStarted,
+    navigationsStarted: state.navigationsStarted,
+    url: location.href
+};
+"""
+
+# Resolves as soon as the action marked by mark_navigation() shows an effect on the page (a new
+# document or one being requested, a URL change, nodes added or removed, or a fetch/XHR request
+# started), or with no effect at all once the effect window passed. Requests that were already
+# running, resources finishing and attribute or text changes do not count: pages with polling,
+# beacons or animations do them all the time. A document unloaded while waiting makes the script
+# fail instead.
+CLICK_EFFECT_SCRIPT = """
+var options = arguments[0];
+var done = arguments[arguments.length - 1];
+var started = performance.now();
+
+function check() {
+    var state = window.__browsingReadiness;
+    var mark = window.__browsingNavigationMark ||
+        {structuralMutations: 0, requestsStarted: 0, navigationsStarted: 0, url: ''};
+    var effect = {
+        navigated: window.__browsingNavigationToken !== options.token,
+        markedUrl: mark.url,
+        urlChanged: !!mark.url && location.href !== mark.url,
+        mutations: state ? Math.max(0, state.structuralMutations - mark.structuralMutations) : 0,
+        network: !!state && state.requestsStarted > mark.requestsStarted,
+        navigating: !!state && state.navigationsStarted > mark.navigationsStarted
+    };
+    if (effect.navigated || effect.navigating || effect.urlChanged || effect.mutations || effect.network) {
+        return done(effect);
+    }
+    if (performance.now() - started >= options.windowMs) return done(effect);
+    setTimeout(check, 20);
+}
+check();
+"""
+
+# Per-host wait statistics, used to tune timeouts per site
+_readiness_stats = {}
+
+# Page loads waited on per driver, used by the memory watchdog to recycle long-lived drivers
+_navigation_counts = weakref.WeakKeyDictionary()
+
+# Waits that saw a navigation per driver, used by the history cache to tell pages apart
+_document_counts = weakref.WeakKeyDictionary()
+
+# Document id and URL of the last wait per driver, so waits on the same page are not counted as page loads
+_last_documents = weakref.WeakKeyDictionary()
+
+# Error messages of a script call whose document was unloaded while it ran (chromedriver, then CDP)
+UNLOADED_DOCUMENT_ERRORS = (
+    "document unloaded",
+    "no such execution context",
+    "cannot find context",
+    "execution context was destroyed",
+    "inspected target navigated or closed",
+)
+
+
+def install_readiness_tracker(wd):
+    """
+    Registers the readiness tracker so it runs on every new document loaded by the driver.
+    The tracker is part of the page instrumentation bundle, see instrumentation.install_instrumentation().
+
+    Parameters:
+        wd: Selenium WebDriver instance.
+    """
+    # Imported here, the instrumentation bundle is built from this module's tracker script
+    from .instrumentation import install_instrumentation
+
+    install_instrumentation(wd)
+
+
+def mark_navigation(wd):
+    """
+    Tags the current document, so a later wait can tell whether a new document was committed.
+
+    Parameters:
+        wd: Selenium WebDriver instance.
+
+    Returns:
+        The token stored on the current document.
+    """
+    install_readiness_tracker(wd)
+    token = uuid.uuid4().hex
+    wd.execute_script(MARK_NAVIGATION_SCRIPT, token)
+    return token
+
+
+def wait_for_page_ready(wd, timeout=None, token=None, require_navigation=False):
+    """
+    Waits until the page is stable: document complete, no requests in flight and no DOM mutations
+    for a short quiet period. Returns as soon as that holds, or when the deadline passes.
+
+    Parameters:
+        wd: Selenium WebDriver instance.
+        timeout: Deadline in seconds. Defaults to selenium_config["page_ready_timeout"].
+        token: Token from mark_navigation(), taken before the action that may navigate.
+        require_navigation: Keep waiting until a new document replaced the tagged one.
+
+    Returns:
+        Dictionary with the readiness signals and the time waited in seconds.
+    """
+    config = get_selenium_config()
+    if timeout is None:
+        timeout = config.get("page_ready_timeout", 10)
+
+    install_readiness_tracker(wd)
+    started = time.monotonic()
+    deadline = started + timeout
+    navigated = False
+    state = None
+
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            state = wd.execute_async_script(
+                WAIT_FOR_READY_SCRIPT, _wait_options(config, token, require_navigation and not navigated, remaining)
+            )
+            break
+        except WebDriverException as e:
+            if not _is_unloaded_document_error(e):
+                raise
+            # The document was unloaded while we waited: a navigation was committed.
+            # Wait again on the new document with whatever time is left.
+            navigated = True
+            time.sleep(0.05)
+
+    return _finish_wait(wd, state, navigated, started)
+
+
+async def async_mark_navigation(driver):
+    """
+    Awaitable version of mark_navigation().
+
+    Parameters:
+        driver: AsyncDriver instance.
+
+    Returns:
+        The token stored on the current document.
+    """
+    await driver.run(install_readiness_tracker, driver.wd)
+    token = uuid.uuid4().hex
+    await driver.execute_script(MARK_NAVIGATION_SCRIPT, token)
+    return token
+
+
+async def async_wait_for_page_ready(driver, timeout=None, token=None, require_navigation=False):
+    """
+    Awaitable version of wait_for_page_ready(). The wait is one pending script call, so the
+    event loop runs other sessions until the page is stable.
+
+    Parameters:
+        driver: AsyncDriver instance.
+        timeout: Deadline in seconds. Defaults to selenium_config["page_ready_timeout"].
+        token: Token from async_mark_navigation(), taken before the action that may navigate.
+        require_navigation: Keep waiting until a new document replaced the tagged one.
+
+    Returns:
+        Dictionary with the readiness signals and the time waited in seconds.
+    """
+    config = get_selenium_config()
+    if timeout is None:
+        timeout = config.get("page_ready_timeout", 10)
+
+    await driver.run(install_readiness_tracker, driver.wd)
+    started = time.monotonic()
+    deadline = started + timeout
+    navigated = False
+    state = None
+
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            state = await driver.execute_async_script(
+                WAIT_FOR_READY_SCRIPT, _wait_options(config, token, require_navigation and not navigated, remaining)
+            )
+            break
+        except WebDriverException as e:
+            if not _is_unloaded_document_error(e):
+                raise
+            navigated = True
+            await asyncio.sleep(0.05)
+
+    return _finish_wait(driver.wd, state, navigated, started)
+
+
+def wait_for_click_outcome(wd, token, handles, timeout=None):
+    """
+    Classifies what a click (or key press) did and waits only as long as that outcome needs:
+    a navigation waits for the new document to settle, a DOM update for the page to settle, and a
+    click without any effect returns once the short effect window (selenium_config["click_effect_ms"])
+    passed. A newly opened tab is reported without waiting, switch to it to wait on its page.
+
+    Parameters:
+        wd: Selenium WebDriver instance.
+        token: Token from mark_navigation(), taken right before the click.
+        handles: Window handles taken before the click.
+        timeout: Deadline in seconds. Defaults to selenium_config["page_ready_timeout"].
+
+    Returns:
+        Dictionary with the "outcome" ("navigation", "same-page navigation", "new tab", "page update"
+        or "no effect"), the "window" handle of a new tab, the "readiness" of the wait (None if the
+        page was not waited on) and the seconds "waited" in total.
+    """
+    config = get_selenium_config()
+    started = time.monotonic()
+    try:
+        effect = wd.execute_async_script(CLICK_EFFECT_SCRIPT, {"token": token, "windowMs": _effect_window_ms(config)})
+    except WebDriverException:
+        # The clicked document was unloaded
+        effect = {"navigated": True}
+
+    new_handles = [handle for handle in wd.window_handles if handle not in handles]
+    readiness = None
+    if not new_handles and _has_effect(effect):
+        readiness = wait_for_page_ready(wd, timeout, token=token, require_navigation=_expects_navigation(effect))
+    return _click_outcome(effect, new_handles, readiness, started)
+
+
+async def async_wait_for_click_outcome(driver, token, handles, timeout=None):
+    """
+    Awaitable version of wait_for_click_outcome().
+
+    Parameters:
+        driver: AsyncDriver instance.
+        token: Token from async_mark_navigation(), taken right before the click.
+        handles: Window handles taken before the click.
+        timeout: Deadline in seconds. Defaults to selenium_config["page_ready_timeout"].
+    """
+    config = get_selenium_config()
+    started = time.monotonic()
+    try:
+        effect = await driver.execute_async_script(
+            CLICK_EFFECT_SCRIPT, {"token": token, "windowMs": _effect_window_ms(config)}
+        )
+    except WebDriverException:
+        effect = {"navigated": True}
+
+    new_handles = [handle for handle in await driver.run(getattr, driver.wd, "window_handles") if handle not in handles]
+    readiness = None
+    if not new_handles and _has_effect(effect):
+        readiness = await async_wait_for_page_ready(
+            driver, timeout, token=token, require_navigation=_expects_navigation(effect)
+        )
+    return _click_outcome(effect, new_handles, readiness, started)
+
+
+def describe_readiness(state):
+    """
+    Formats a readiness result for the agent.
+
+    Parameters:
+        state: Dictionary returned by wait_for_page_ready().
+
+    Returns:
+        A short sentence with the waiting time.
+    """
+    if state.get("stable"):
+        return f"Page settled in {state['waited']:.2f}s."
+    return (
+        f"Page was still loading after {state['waited']:.2f}s "
+        f"(readyState: {state.get('readyState')}, requests in flight: {state.get('inflight')})."
+    )
+
+
+def describe_click_outcome(outcome, url):
+    """
+    Formats a click outcome for the agent.
+
+    Parameters:
+        outcome: Dictionary returned by wait_for_click_outcome().
+        url: Current URL.
+
+    Returns:
+        A few sentences with the outcome, the time it took and where the agent is now.
+    """
+    details = {
+        "navigation": f"The click loaded a new page. Current URL is {url}.",
+        "same-page navigation": f"The page changed its URL without reloading. Current URL is {url}.",
+        "new tab": f"The click opened a new tab, which is now the current page. Current URL is {url}.",
+        "page update": f"The page content changed, the URL stayed {url}.",
+        "no effect": (
+            f"Nothing changed on the page, the URL stayed {url}. "
+            "The element may not react to clicks, or needs a different element to be clicked first."
+        ),
+    }
+    description = f"Outcome: {outcome['outcome']} ({outcome['waited']:.2f}s). {details[outcome['outcome']]}"
+    if outcome["readiness"]:
+        description += " " + describe_readiness(outcome["readiness"])
+    return description
+
+
+def get_readiness_stats():
+    """
+    Returns wait statistics per host: number of waits, total and maximum seconds waited and timeouts.
+    """
+    return {host: dict(stats) for host, stats in _readiness_stats.items()}
+
+
+def get_navigation_count(wd):
+    """
+    Returns how many page loads have been waited on in a driver. Waits on a page that was already
+    waited on (e.g. after a click that only updated it) do not count.
+
+    Parameters:
+        wd: Selenium WebDriver instance.
+    """
+    return _navigation_counts.get(wd, 0)
+
+
+def get_document_count(wd):
+    """
+    Returns how many waits in a driver saw a navigation (a page load or a same-page URL change).
+
+    Parameters:
+        wd: Selenium WebDriver instance.
+    """
+    return _document_counts.get(wd, 0)
+
+
+def _wait_options(config, token, require_navigation, remaining):
+    return {
+        "token": token,
+        "requireNavigation": require_navigation,
+        "timeoutMs": int(remaining * 1000),
+        "maxInflight": config.get("max_inflight_requests", 2),
+        "networkIdleMs": config.get("network_idle_ms", 500),
+        "domQuietMs": config.get("dom_quiet_ms", 300),
+    }
+
+
+def _effect_window_ms(config):
+    return config.get("click_effect_ms", 400)
+
+
+def _has_effect(effect):
+    return any(effect.get(key) for key in ("navigated", "navigating", "urlChanged", "mutations", "network"))
+
+
+def _expects_navigation(effect):
+    # A router that takes over the navigation changes the URL in place instead
+    return bool(effect.get("navigated") or (effect.get("navigating") and not effect.get("urlChanged")))
+
+
+def _click_outcome(effect, new_handles, readiness, started):
+    marked_url = effect.get("markedUrl")
+    if new_handles:
+        outcome = "new tab"
+    elif readiness is None:
+        outcome = "no effect"
+    elif readiness["navigated"]:
+        outcome = "navigation"
+    elif effect.get("urlChanged") or (marked_url and readiness.get("url", marked_url) != marked_url):
+        # pushState or a fragment change, possibly only once the data for the new view arrived
+        outcome = "same-page navigation"
+    else:
+        outcome = "page update"
+    return {
+        "outcome": outcome,
+        "window": new_handles[-1] if new_handles else None,
+        "readiness": readiness,
+        "waited": round(time.monotonic() - started, 3),
+    }
+
+
+def _is_unloaded_document_error(error):
+    message = str(error).lower()
+    return any(text in message for text in UNLOADED_DOCUMENT_ERRORS)
+
+
+def _finish_wait(wd, state, navigated, started):
+    if state is None:
+        state = {"stable": False, "navigated": navigated, "readyState": "unknown", "inflight": None}
+    state["navigated"] = state.get("navigated") or navigated
+    state["waited"] = round(time.monotonic() - started, 3)
+
+    _record_wait(state)
+    document = (state.get("document"), state.get("url"))
+    if state["navigated"] or (document[0] is not None and document != _last_documents.get(wd)):
+        _navigation_counts[wd] = _navigation_counts.get(wd, 0) + 1
+    if document[0] is not None:
+        _last_documents[wd] = document
+    if state["navigated"]:
+        _document_counts[wd] = _document_counts.get(wd, 0) + 1
+    return state
+
+
+def _record_wait(state):
+    host = state.get("host") or "unknown"
+    stats = _readiness_stats.setdefault(host, {"waits": 0, "total": 0.0, "max": 0.0, "timeouts": 0})
+    stats["waits"] += 1
+    stats["total"] += state["waited"]
+    stats["max"] = max(stats["max"], state["waited"])
+    if not state.get("stable"):
+        stats["timeouts"] += 1
@@ -0,0 +1,215 @@
+import threading
+import weakref
+from urllib.parse import urlparse
+
+from .selenium import get_selenium_config, get_session_id
+
+# Ad, analytics and tracking hosts, blocked with their subdomains
+TRACKER_DOMAINS = [
+    "doubleclick.net", "googlesyndication.com", "googleadservices.com", "google-analytics.com",
+    "googletagmanager.com", "googletagservices.com", "adservice.google.com", "amazon-adsystem.com",
+    "facebook.net", "adnxs.com", "criteo.com", "criteo.net", "taboola.com", "outbrain.com",
+    "scorecardresearch.com", "quantserve.com", "hotjar.com", "chartbeat.com", "moatads.com",
+    "doubleverify.com", "pubmatic.com", "rubiconproject.com", "casalemedia.com", "nr-data.net",
+]
+
+# resource_types are CDP Network.ResourceType names. Pages themselves (Document) are never blocked.
+RESOURCE_POLICY_PRESETS = {
+    "full": {"resource_types": [], "blocked_domains": []},
+    "no-media": {"resource_types": ["Image", "Media", "Font"], "blocked_domains": TRACKER_DOMAINS},
+    # Unstyled pages: fine for reading text, but screenshots and highlight visibility suffer
+    "text-only": {
+        "resource_types": ["Image", "Media", "Font", "Stylesheet", "TextTrack", "Manifest", "Ping"],
+        "blocked_domains": TRACKER_DOMAINS,
+    },
+}
+
+# A blocked request is never sent, so its size is unknown. Bytes saved are estimated from typical
+# transfer sizes of each resource type; anything not listed counts as "Other".
+ESTIMATED_RESOURCE_BYTES = {
+    "Image": 40_000,
+    "Media": 500_000,
+    "Font": 30_000,
+    "Stylesheet": 15_000,
+    "Script": 25_000,
+    "TextTrack": 5_000,
+    "Manifest": 1_000,
+    "Ping": 500,
+    "Other": 5_000,
+}
+
+# Resolved policy applied to each driver, see apply_resource_policy()
+_applied_policies = weakref.WeakKeyDictionary()
+
+# Policy overrides of individual browsing sessions, see set_session_resource_policy()
+_session_policies = {}
+
+# Blocking statistics, see get_resource_policy_stats()
+_stats_lock = threading.Lock()
+_resource_stats = {"blocked": 0, "estimated_bytes_saved": 0, "by_type": {}, "by_domain": 0}
+
+
+def resolve_resource_policy(policy=None):
+    """
+    Expands a resource policy into the resource types and domains to block.
+
+    Parameters:
+        policy: Preset name ("full", "no-media", "text-only"), or a dictionary with a "preset" and
+            any of "resource_types", "blocked_domains" (both replace the preset's lists) and
+            "allowed_domains" (never blocked). Defaults to selenium_config["resource_policy"].
+
+    Returns:
+        Dictionary with sorted "resource_types", "blocked_domains" and "allowed_domains" lists.
+    """
+    if policy is None:
+        policy = get_selenium_config().get("resource_policy", "full")
+    if isinstance(policy, str):
+        policy = {"preset": policy}
+
+    preset_name = policy.get("preset", "full")
+    if preset_name not in RESOURCE_POLICY_PRESETS:
+        raise ValueError(
+            f"Unknown resource policy preset '{preset_name}'. "
+            f"Use one of: {', '.join(RESOURCE_POLICY_PRESETS)}."
+        )
+    preset = RESOURCE_POLICY_PRESETS[preset_name]
+
+    resource_types = set(policy.get("resource_types", preset["resource_types"]))
+    resource_types.discard("Document")
+    return {
+        "resource_types": sorted(resource_types),
+        "blocked_domains": sorted(set(policy.get("blocked_domains", preset["blocked_domains"]))),
+        "allowed_domains": sorted(set(policy.get("allowed_domains", []))),
+    }
+
+
+def apply_resource_policy(wd, policy=None):
+    """
+    Blocks the resource types and domains of a policy in a driver's page.
+
+    Requests are dropped with Fetch interception before they are sent. Only the blocked types and
+    domains are paused, everything else loads without a round trip to Python. Applying the policy
+    the driver already has is free, and the "full" policy does not even open a DevTools connection.
+
+    Parameters:
+        wd: Selenium WebDriver instance.
+        policy: See resolve_resource_policy(). Defaults to selenium_config["resource_policy"].
+    """
+    # Imported here, so drivers that block nothing never load the DevTools client
+    from .interception import get_request_interceptor, has_request_interceptor
+
+    resolved = resolve_resource_policy(policy)
+    if _applied_policies.get(wd) == resolved and has_request_interceptor(wd):
+        return
+
+    blocks_nothing = not resolved["resource_types"] and not resolved["blocked_domains"]
+    if blocks_nothing:
+        if has_request_interceptor(wd):
+            get_request_interceptor(wd).remove_handler("resource_policy")
+        _applied_policies[wd] = resolved
+        return
+
+    patterns = [{"urlPattern": "*", "resourceType": t, "requestStage": "Request"} for t in resolved["resource_types"]]
+    for domain in resolved["blocked_domains"]:
+        patterns.append({"urlPattern": f"*://{domain}/*", "requestStage": "Request"})
+        patterns.append({"urlPattern": f"*://*.{domain}/*", "requestStage": "Request"})
+
+    get_request_interceptor(wd).set_handler("resource_policy", _make_policy_handler(resolved), patterns)
+    _applied_policies[wd] = resolved
+
+
+def set_session_resource_policy(policy, session_id=None):
+    """
+    Overrides the resource policy for one browsing session, e.g. for the duration of a task.
+
+    The policy is applied to the session's driver right away if it holds one, otherwise when it
+    checks one out.
+
+    Parameters:
+        policy: See resolve_resource_policy(). None goes back to selenium_config["resource_policy"].
+        session_id: Session to override. Defaults to the current session.
+    """
+    from .selenium import _pool_condition, _session_drivers
+
+    session_id = session_id or get_session_id()
+    resolve_resource_policy(policy)  # Validate before storing
+    if policy is None:
+        _session_policies.pop(session_id, None)
+    else:
+        _session_policies[session_id] = policy
+
+    with _pool_condition:
+        wd = _session_drivers.get(session_id)
+    if wd is not None:
+        apply_resource_policy(wd, policy)
+
+
+def forget_driver(wd):
+    """
+    Forgets the policy applied to a driver's page, so the next apply_resource_policy() call sets
+    it up again, e.g. once the driver moved to another tab.
+
+    Parameters:
+        wd: Selenium WebDriver instance.
+    """
+    _applied_policies.pop(wd, None)
+
+
+def get_session_resource_policy(session_id=None):
+    """
+    Returns the resource policy override of a session, or None if it uses the configured policy.
+
+    Parameters:
+        session_id: Browsing session. Defaults to the current session.
+    """
+    return _session_policies.get(session_id or get_session_id())
+
+
+def get_resource_policy_stats():
+    """
+    Returns blocking statistics: requests blocked in total, per resource type and because of their
+    domain, and the estimated bytes saved (see ESTIMATED_RESOURCE_BYTES).
+    """
+    with _stats_lock:
+        stats = dict(_resource_stats)
+        stats["by_type"] = dict(stats["by_type"])
+        return stats
+
+
+def _matches_domain(host, domains):
+    return any(host == domain or host.endswith("." + domain) for domain in domains)
+
+
+def _make_policy_handler(resolved):
+    resource_types = set(resolved["resource_types"])
+    blocked_domains = tuple(resolved["blocked_domains"])
+    allowed_domains = tuple(resolved["allowed_domains"])
+
+    def handle(session, params):
+        if "responseStatusCode" in params or "responseErrorReason" in params:
+            return False
+
+        resource_type = params.get("resourceType", "Other")
+        host = urlparse(params["request"]["url"]).hostname or ""
+        if resource_type == "Document" or _matches_domain(host, allowed_domains):
+            return False
+
+        blocked_by_domain = resource_type not in resource_types
+        if blocked_by_domain and not _matches_domain(host, blocked_domains):
+            return False
+
+        session.send_async("Fetch.failRequest", {"requestId": params["requestId"], "errorReason": "BlockedByClient"})
+        _record_block(resource_type, blocked_by_domain)
+        return True
+
+    return handle
+
+
+def _record_block(resource_type, blocked_by_domain):
+    estimate = ESTIMATED_RESOURCE_BYTES.get(resource_type, ESTIMATED_RESOURCE_BYTES["Other"])
+    with _stats_lock:
+        _resource_stats["blocked"] += 1
+        _resource_stats["estimated_bytes_saved"] += estimate
+        _resource_stats["by_type"][resource_type] = _resource_stats["by_type"].get(resource_type, 0) + 1
+        if blocked_by_domain:
+            _resource_stats["by_domain"] += 1
@@ -1,17 +1,299 @@
+import base64
+import io
+import logging
+import time
+
+from .selenium import get_selenium_config, get_session_id
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SCREENSHOT_SETTINGS = {
+    "format": "jpeg",  # "jpeg", "webp" or "png"
+    "quality": 70,  # Ignored for png
+    "max_dimension": 1280,  # Longest side of the image in pixels, None keeps the full resolution
+    "grayscale": False,  # Requires Pillow
+    "measure_savings": False,  # Also capture a full-resolution PNG to report the bytes saved
+    "dedup_threshold": 2,  # Max. differing hash bits for "unchanged", None disables deduplication
+    "hash_size": 16,  # dHash grid size, the hash has hash_size * hash_size bits
+}
+
+FILE_EXTENSIONS = {"jpeg": ".jpg", "webp": ".webp", "png": ".png"}
+
+# Capture statistics, see get_screenshot_stats()
+_screenshot_stats = {"captures": 0, "bytes": 0, "baseline_bytes": 0, "capture_seconds": 0.0, "last": None}
+
+# Perceptual hash and page URL of the last screenshot sent to the model, per browsing session
+_last_sent_hashes = {}
+_last_sent_urls = {}
+_dedup_stats = {"checked": 0, "skipped": 0, "bytes_skipped": 0}
+
+
+def get_screenshot_settings():
+    """
+    Returns the screenshot settings: selenium_config["screenshot"] on top of the defaults.
+    """
+    return {**DEFAULT_SCREENSHOT_SETTINGS, **(get_selenium_config().get("screenshot") or {})}
+
+
+def get_screenshot_file_extension():
+    """
+    Returns the file extension matching the configured screenshot format.
+    """
+    return FILE_EXTENSIONS.get(get_screenshot_settings()["format"], ".png")
+
+
 def get_b64_screenshot(wd, element=None):
     """
     Captures a screenshot in base64 format.
 
+    Page screenshots are taken with Page.captureScreenshot, clipped to the viewport, compressed and
+    downscaled according to selenium_config["screenshot"], which keeps the payload sent to the LLM small.
+
     Parameters:
         wd: The web driver instance.
-        element: The specific element to capture (optional). If not provided, captures the entire page.
+        element: The specific element to capture (optional). If not provided, captures the viewport.
 
     Returns:
         A base64-encoded string of the screenshot.
     """
     if element:
-        screenshot_b64 = element.screenshot_as_base64
+        return element.screenshot_as_base64
+
+    settings = get_screenshot_settings()
+    started = time.perf_counter()
+
+    viewport = wd.execute_cdp_cmd("Page.getLayoutMetrics", {})["cssVisualViewport"]
+    scale = 1
+    if settings["max_dimension"]:
+        # The image has device_scale device pixels per CSS pixel (see instrumentation.install_instrumentation)
+        device_scale = get_selenium_config().get("device_scale", 1.2)
+        longest_side = max(viewport["clientWidth"], viewport["clientHeight"]) * device_scale
+        scale = min(1, settings["max_dimension"] / longest_side)
+
+    params = {
+        "format": settings["format"],
+        "clip": {
+            "x": viewport["pageX"],
+            "y": viewport["pageY"],
+            "width": viewport["clientWidth"],
+            "height": viewport["clientHeight"],
+            "scale": scale,
+        },
+    }
+    if settings["format"] != "png":
+        params["quality"] = settings["quality"]
+    screenshot_b64 = wd.execute_cdp_cmd("Page.captureScreenshot", params)["data"]
+
+    if settings["grayscale"]:
+        screenshot_b64 = _to_grayscale(screenshot_b64, settings)
+
+    elapsed = time.perf_counter() - started
+    size = len(screenshot_b64) * 3 // 4
+
+    baseline = None
+    if settings["measure_savings"]:
+        baseline = len(wd.execute_cdp_cmd("Page.captureScreenshot", {"format": "png"})["data"]) * 3 // 4
+
+    _record_capture(size, elapsed, baseline)
+    return screenshot_b64
+
+
+def get_screenshot_stats():
+    """
+    Returns screenshot statistics: number of captures, total bytes, total capture seconds, the
+    full-resolution PNG bytes measured for comparison (with measure_savings) and the last capture.
+    """
+    stats = dict(_screenshot_stats)
+    stats["last"] = dict(stats["last"]) if stats["last"] else None
+    return stats
+
+
+def _record_capture(size, elapsed, baseline):
+    _screenshot_stats["captures"] += 1
+    _screenshot_stats["bytes"] += size
+    _screenshot_stats["capture_seconds"] += elapsed
+    last = {"bytes": size, "seconds": round(elapsed, 3)}
+
+    if baseline is not None:
+        _screenshot_stats["baseline_bytes"] += baseline
+        last["bytes_saved"] = baseline - size
+        logger.debug(
+            "Screenshot captured in %.0f ms, %.0f KB, %.0f KB saved compared to a full-resolution PNG.",
+            elapsed * 1000, size / 1024, (baseline - size) / 1024,
+        )
     else:
-        screenshot_b64 = wd.get_screenshot_as_base64()
+        logger.debug("Screenshot captured in %.0f ms, %.0f KB.", elapsed * 1000, size / 1024)
+    _screenshot_stats["last"] = last
+
+
+def compute_dhash(screenshot_b64, hash_size=16):
+    """
+    Computes the difference hash (dHash) of a screenshot: the image is reduced to a small grayscale
+    grid and every bit tells whether a pixel is brighter than its right neighbour.
+
+    Parameters:
+        screenshot_b64: Base64-encoded screenshot.
+        hash_size: Grid size, the hash has hash_size * hash_size bits.
+
+    Returns:
+        The hash as an integer.
+    """
+    import numpy as np
+    from PIL import Image
+
+    image = Image.open(io.BytesIO(base64.b64decode(screenshot_b64))).convert("L")
+    pixels = np.asarray(image.resize((hash_size + 1, hash_size), Image.BILINEAR), dtype=np.int16)
+    bits = pixels[:, 1:] > pixels[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def is_duplicate_screenshot(screenshot_b64, session_id=None, url=None):
+    """
+    Compares a screenshot with the last one sent to the model in this session.
+
+    If it differs by no more than selenium_config["screenshot"]["dedup_threshold"] hash bits the page
+    has not visibly changed and the screenshot does not need to be sent again. Otherwise its hash
+    and URL are remembered as the last one sent.
+
+    Parameters:
+        screenshot_b64: Base64-encoded screenshot about to be sent.
+        session_id: Browsing session. Defaults to the current session.
+        url: URL of the page in the screenshot, see get_last_screenshot_url().
+
+    Returns:
+        True if the screenshot is a duplicate of the last one sent.
+    """
+    settings = get_screenshot_settings()
+    if settings["dedup_threshold"] is None:
+        return False
+
+    try:
+        screenshot_hash = compute_dhash(screenshot_b64, settings["hash_size"])
+    except ImportError as e:
+        # Deduplication is an optimization only, send the screenshot when it is unavailable
+        logger.warning("Missing package: %s. Install numpy and Pillow to skip unchanged screenshots.", e)
+        return False
+
+    session_id = session_id or get_session_id()
+    previous_hash = _last_sent_hashes.get(session_id)
+    _dedup_stats["checked"] += 1
+
+    if previous_hash is not None and bin(previous_hash ^ screenshot_hash).count("1") <= settings["dedup_threshold"]:
+        _dedup_stats["skipped"] += 1
+        _dedup_stats["bytes_skipped"] += len(screenshot_b64) * 3 // 4
+        return True
+
+    _last_sent_hashes[session_id] = screenshot_hash
+    _last_sent_urls[session_id] = url
+    return False
+
+
+def get_last_screenshot_hash(session_id=None):
+    """
+    Returns the perceptual hash of the last screenshot sent to the model in a session, or None.
+
+    Parameters:
+        session_id: Browsing session. Defaults to the current session.
+    """
+    return _last_sent_hashes.get(session_id or get_session_id())
+
+
+def get_last_screenshot_url(session_id=None):
+    """
+    Returns the URL of the page in the last screenshot sent to the model in a session, or None.
+    A duplicate screenshot looks the same as that page, which is not necessarily the current one.
+
+    Parameters:
+        session_id: Browsing session. Defaults to the current session.
+    """
+    return _last_sent_urls.get(session_id or get_session_id())
+
+
+def set_last_screenshot_hash(screenshot_hash, session_id=None, url=None):
+    """
+    Makes a hash the reference of the next duplicate check, e.g. the hash of a screenshot the
+    model saw of a page it returned to.
+
+    Parameters:
+        screenshot_hash: Hash from compute_dhash().
+        session_id: Browsing session. Defaults to the current session.
+        url: URL of the page in the screenshot.
+    """
+    session_id = session_id or get_session_id()
+    _last_sent_hashes[session_id] = screenshot_hash
+    _last_sent_urls[session_id] = url
+
+
+def get_dedup_stats():
+    """
+    Returns screenshot deduplication statistics: screenshots checked, skipped and bytes not sent.
+    """
+    return dict(_dedup_stats)
+
+
+def _to_grayscale(screenshot_b64, settings):
+    try:
+        from PIL import Image
+    except ImportError as e:
+        logger.error("Missing package: %s. Install Pillow to use grayscale screenshots.", e)
+        raise ImportError
+
+    image = Image.open(io.BytesIO(base64.b64decode(screenshot_b64))).convert("L")
+    output = io.BytesIO()
+    image.save(output, format=settings["format"].upper(), quality=settings["quality"])
+    return base64.b64encode(output.getvalue()).decode("ascii")
+
+
+def draw_element_labels(screenshot_b64, elements, viewport_width):
+    """
+    Draws highlight boxes and element numbers onto a screenshot, leaving the live page untouched.
+
+    Parameters:
+        screenshot_b64: Base64-encoded screenshot of the viewport.
+        elements: Element descriptions returned by highlight_elements_with_labels (index and bbox are used).
+        viewport_width: Viewport width in CSS pixels the boxes were measured in.
+
+    Returns:
+        A base64-encoded screenshot, in the same image format, with the labels drawn on it.
+    """
+    try:
+        from PIL import Image, ImageDraw, ImageFont
+    except ImportError as e:
+        logger.error("Missing package: %s. Install Pillow to use the overlay highlight mode.", e)
+        raise ImportError
+
+    image = Image.open(io.BytesIO(base64.b64decode(screenshot_b64)))
+    image_format = image.format or "PNG"
+    image = image.convert("RGB")
+    draw = ImageDraw.Draw(image)
+
+    # Boxes are in CSS pixels, the screenshot is in device pixels
+    scale = image.width / viewport_width if viewport_width else 1
+    border = max(1, round(2 * scale))
+    try:
+        font = ImageFont.load_default(size=max(10, round(20 * scale)))
+    except TypeError:
+        # Pillow < 10.1 only ships a fixed-size bitmap font
+        font = ImageFont.load_default()
+
+    for element in elements:
+        left, top, width, height = (value * scale for value in element["bbox"])
+        draw.rectangle([left, top, left + width, top + height], outline="red", width=border)
+
+        # Label above the element's top-left corner, pushed inside the image when it would be clipped
+        text = str(element["index"])
+        text_left, text_top, text_right, text_bottom = draw.textbbox((0, 0), text, font=font)
+        padding = round(3 * scale)
+        label_width = text_right - text_left + 2 * padding
+        label_height = text_bottom - text_top + 2 * padding
+        label_left = min(max(0, left), image.width - label_width)
+        label_top = top - label_height if top - label_height >= 0 else top
+        draw.rectangle(
+            [label_left, label_top, label_left + label_width, label_top + label_height],
+            fill="yellow", outline="black",
+        )
+        draw.text((label_left + padding - text_left, label_top + padding - text_top), text, fill="black", font=font)
 
-    return screenshot_b64
\ No newline at end of file
+    output = io.BytesIO()
+    image.save(output, format=image_format)
+    return base64.b64encode(output.getvalue()).decode("ascii")
@@ -1,39 +1,189 @@
+import json
+import logging
 import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from urllib.parse import urlparse
 
-# Global variables for WebDriver and Selenium configurations
-wd = None
+# Global variables for the WebDriver pool and Selenium configurations
 selenium_config = {
     "chrome_profile_path": None,
     "headless": True,
     "full_page_screenshot": True,
+    "backend": "webdriver",
+    "pool_size": 4,
+    "warm_pool_size": 1,
+    "checkout_timeout": 60,
+    "session_idle_timeout": 900,
+    "page_ready_timeout": 10,
+    "network_idle_ms": 500,
+    "max_inflight_requests": 2,
+    "dom_quiet_ms": 300,
+    "click_effect_ms": 400,
+    "incremental_highlights": True,
+    "highlight_mode": "dom",
+    "device_scale": 1.2,
+    "popup_rules": {},
+    "resource_policy": "full",
+    "http_cache": {"enabled": False},
+    "memory_watchdog": {"enabled": True},
+    "tiered_fetch": {"enabled": True},
+    "screenshot": {
+        "format": "jpeg",
+        "quality": 70,
+        "max_dimension": 1280,
+        "grayscale": False,
+        "measure_savings": False,
+        "dedup_threshold": 2,
+        "hash_size": 16,
+    },
 }
 
+DEFAULT_SESSION_ID = "default"
 
-def get_web_driver():
+# Seconds between two checks for idle sessions while a checkout waits for a free driver
+IDLE_REAP_INTERVAL = 5
+
+# Where the resolved chromedriver path (and the Chrome version it worked with) is remembered
+DRIVER_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "browsing-agent", "driver.json")
+
+logger = logging.getLogger(__name__)
+
+# chromedriver path resolved in this process
+_chrome_driver_path = None
+
+# Session the current thread/task is browsing for. Tools call get_web_driver() without
+# arguments, so the session is carried implicitly (see browsing_session()).
+_current_session = ContextVar("browsing_session", default=DEFAULT_SESSION_ID)
+
+# Pool state, guarded by _pool_condition
+_pool_condition = threading.Condition()
+_idle_drivers = []  # Drivers not bound to any session, ready for checkout
+_session_drivers = {}  # session_id -> WebDriver checked out by that session
+_pending_creations = 0  # Drivers being launched right now (they count towards pool_size)
+_pending_resets = 0  # Checked-in drivers being wiped before they become idle (they count too)
+_session_last_used = {}  # session_id -> time.monotonic() of the session's last checkout call
+_warmer_thread = None  # Background thread keeping warm_pool_size idle drivers ready
+_warmer_stopped = False
+
+# Time from a session's first checkout request to a usable driver, split by whether an idle
+# (warm) driver was ready or Chrome had to be launched (cold). See get_pool_stats().
+_first_action_stats = {"warm": {"count": 0, "seconds": 0.0}, "cold": {"count": 0, "seconds": 0.0}}
+
+# session_id -> page read without the browser (see static_fetch.py), loaded into the session's
+# driver by the next get_web_driver() call
+_deferred_pages = {}
+
+# session_id -> time.monotonic() of the session's next memory watchdog check
+_watchdog_deadlines = {}
+
+
+def get_session_id():
+    """
+    Returns the id of the browsing session active in the current context.
+    """
+    return _current_session.get()
+
+
+@contextmanager
+def browsing_session(session_id):
+    """
+    Binds all WebDriver lookups made inside the block to the given session.
+
+    Parameters:
+        session_id: Identifier of the session (e.g. one per agent or Streamlit session).
+    """
+    token = _current_session.set(session_id)
+    try:
+        yield session_id
+    finally:
+        _current_session.reset(token)
+
+
+def _get_free_port():
+    """
+    Asks the OS for a free local TCP port, used as the Chrome remote debugging port.
     """
-    Initializes and returns a Selenium WebDriver instance.
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _read_driver_cache():
+    try:
+        with open(DRIVER_CACHE_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_driver_cache(entry):
+    try:
+        os.makedirs(os.path.dirname(DRIVER_CACHE_PATH), exist_ok=True)
+        temporary_path = f"{DRIVER_CACHE_PATH}.{os.getpid()}.tmp"
+        with open(temporary_path, "w") as f:
+            json.dump(entry, f)
+        os.replace(temporary_path, DRIVER_CACHE_PATH)
+    except OSError as e:
+        logger.warning("Could not write the driver cache %s: %s", DRIVER_CACHE_PATH, e)
+
+
+def _resolve_chrome_driver_path(refresh=False):
+    """
+    Returns the chromedriver executable to launch Chrome with.
+
+    The path resolved by a previous run is remembered on disk, so webdriver_manager (which checks
+    the Chrome version and may download a driver) only runs when nothing usable is cached.
+
+    Parameters:
+        refresh: Ignore the cached path, e.g. after Chrome was updated and the driver no longer matches.
+    """
+    global _chrome_driver_path
+
+    if not refresh:
+        if _chrome_driver_path and os.path.exists(_chrome_driver_path):
+            return _chrome_driver_path
+        cached_path = _read_driver_cache().get("chromedriver_path")
+        if cached_path and os.path.exists(cached_path):
+            _chrome_driver_path = cached_path
+            return cached_path
+
+    chrome_driver_path = "/usr/bin/chromedriver"
+    if os.path.exists(chrome_driver_path):
+        logger.info("ChromeDriver found at %s.", chrome_driver_path)
+    else:
+        logger.info("ChromeDriver not found. Installing via webdriver_manager.")
+        try:
+            from webdriver_manager.chrome import ChromeDriverManager
+        except ImportError as e:
+            logger.error("Missing package: %s. Please install the required dependencies.", e)
+            raise ImportError
+        chrome_driver_path = ChromeDriverManager().install()
+
+    _chrome_driver_path = chrome_driver_path
+    _write_driver_cache({"chromedriver_path": chrome_driver_path})
+    return chrome_driver_path
+
+
+def _create_web_driver():
+    """
+    Launches a new, fully configured Chrome instance.
 
     Returns:
         Selenium WebDriver instance.
     """
-    print("Initializing WebDriver...")
+    logger.info("Initializing WebDriver...")
     try:
         from selenium import webdriver
+        from selenium.common.exceptions import SessionNotCreatedException
         from selenium.webdriver.chrome.service import Service as ChromeService
-        from webdriver_manager.chrome import ChromeDriverManager
-        from selenium_stealth import stealth
-
-        print("Required packages imported successfully.")
     except ImportError as e:
-        print(f"Missing package: {e}. Please install the required dependencies.")
+        logger.error("Missing package: %s. Please install the required dependencies.", e)
         raise ImportError
 
-    global wd, selenium_config
-
-    if wd:
-        print("Returning existing WebDriver instance.")
-        return wd
-
     chrome_profile_path = selenium_config.get("chrome_profile_path", None)
     profile_directory = None
     user_data_dir = None
@@ -41,35 +191,25 @@ def get_web_driver():
     if isinstance(chrome_profile_path, str) and os.path.exists(chrome_profile_path):
         profile_directory = os.path.split(chrome_profile_path)[-1].strip("\\").rstrip("/")
         user_data_dir = os.path.split(chrome_profile_path)[0].strip("\\").rstrip("/")
-        print(f"Using Chrome profile: {profile_directory}")
-        print(f"Using Chrome user data dir: {user_data_dir}")
-        print(f"Using Chrome profile path: {chrome_profile_path}")
+        logger.debug("Using Chrome profile %s in user data dir %s.", profile_directory, user_data_dir)
 
     chrome_options = webdriver.ChromeOptions()
-    print("ChromeOptions initialized.")
-
-    chrome_driver_path = "/usr/bin/chromedriver"
-    if not os.path.exists(chrome_driver_path):
-        print("ChromeDriver not found. Installing via webdriver_manager.")
-        chrome_driver_path = ChromeDriverManager().install()
-    else:
-        print(f"ChromeDriver found at {chrome_driver_path}.")
 
     if selenium_config.get("headless", False):
         chrome_options.add_argument("--headless")
-        print("Headless mode enabled.")
     if selenium_config.get("full_page_screenshot", False):
         chrome_options.add_argument("--start-maximized")
-        print("Full page screenshot mode enabled.")
     else:
         chrome_options.add_argument("--window-size=1920,1080")
-        print("Window size set to 1920x1080.")
+
+    # Every pooled Chrome needs its own debugging port, otherwise the second one fails to start
+    debugging_port = _get_free_port()
 
     # General Chrome options
     chrome_options.add_argument("--no-sandbox")
     chrome_options.add_argument("--disable-gpu")
     chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--remote-debugging-port=9222")
+    chrome_options.add_argument(f"--remote-debugging-port={debugging_port}")
     chrome_options.add_argument("--disable-extensions")
     chrome_options.add_argument("--disable-popup-blocking")
     chrome_options.add_argument("--ignore-certificate-errors")
@@ -78,25 +218,48 @@ def get_web_driver():
     chrome_options.add_argument("--allow-running-insecure-content")
     chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
     chrome_options.add_experimental_option("useAutomationExtension", False)
+    logger.debug(
+        "Chrome options: headless=%s, remote debugging port %s.",
+        selenium_config.get("headless", False), debugging_port,
+    )
 
     if user_data_dir and profile_directory:
         chrome_options.add_argument(f"user-data-dir={user_data_dir}")
         chrome_options.add_argument(f"profile-directory={profile_directory}")
-        print(f"Using user data dir: {user_data_dir} and profile directory: {profile_directory}")
 
+    chrome_driver_path = _resolve_chrome_driver_path()
     try:
-        wd = webdriver.Chrome(
-            service=ChromeService(chrome_driver_path), options=chrome_options
-        )
-        print("WebDriver initialized successfully.")
+        try:
+            wd = webdriver.Chrome(service=ChromeService(chrome_driver_path), options=chrome_options)
+        except SessionNotCreatedException as e:
+            # Usually Chrome was updated and the cached driver is too old for it
+            logger.warning("Could not start Chrome with %s (%s), resolving the driver again.", chrome_driver_path, e.msg)
+            chrome_driver_path = _resolve_chrome_driver_path(refresh=True)
+            wd = webdriver.Chrome(service=ChromeService(chrome_driver_path), options=chrome_options)
+        logger.info("WebDriver initialized successfully.")
 
         if wd.capabilities.get("chrome", {}).get("userDataDir"):
-            print(f"Profile path in use: {wd.capabilities['chrome']['userDataDir']}")
+            logger.debug("Profile path in use: %s", wd.capabilities["chrome"]["userDataDir"])
     except Exception as e:
-        print(f"Error initializing WebDriver: {e}")
+        logger.error("Error initializing WebDriver: %s", e)
         raise e
 
+    # Remember which Chrome the driver works with, for diagnosing version mismatches
+    entry = {
+        "chromedriver_path": chrome_driver_path,
+        "chrome_version": wd.capabilities.get("browserVersion"),
+        "chromedriver_version": wd.capabilities.get("chrome", {}).get("chromedriverVersion", "").split(" ")[0],
+    }
+    if _read_driver_cache() != entry:
+        _write_driver_cache(entry)
+
     if not selenium_config.get("chrome_profile_path", None):
+        try:
+            from selenium_stealth import stealth
+        except ImportError as e:
+            logger.error("Missing package: %s. Please install the required dependencies.", e)
+            raise ImportError
+
         stealth(
             wd,
             languages=["en-US", "en"],
@@ -106,49 +269,531 @@ def get_web_driver():
             renderer="Intel Iris OpenGL Engine",
             fix_hairline=True,
         )
-        print("Stealth mode configured.")
+        logger.debug("Stealth mode configured.")
 
     wd.implicitly_wait(3)
-    print("Implicit wait set to 3 seconds.")
 
+    if selenium_config.get("backend", "webdriver") == "cdp":
+        from .cdp_driver import CDPDriver
+
+        # Tool commands go over a direct DevTools websocket, chromedriver only manages the browser
+        wd = CDPDriver(wd)
+        logger.debug("Direct CDP backend attached.")
+
+    from .instrumentation import install_instrumentation
+
+    install_instrumentation(wd)
+    logger.debug("Page instrumentation installed.")
+
+    return wd
+
+
+def checkout_web_driver(session_id=None, timeout=None):
+    """
+    Checks a WebDriver out of the pool for a session.
+
+    A session keeps the same driver until it is checked back in, so repeated calls are cheap.
+    When the pool is exhausted the call blocks until another session checks its driver in. Drivers
+    of sessions unused for selenium_config["session_idle_timeout"] seconds are checked in meanwhile.
+
+    Parameters:
+        session_id: Session to check the driver out for. Defaults to the current session.
+        timeout: Seconds to wait for a free driver. Defaults to selenium_config["checkout_timeout"].
+
+    Returns:
+        Selenium WebDriver instance.
+    """
+    global _pending_creations
+
+    session_id = session_id or get_session_id()
+    if timeout is None:
+        timeout = selenium_config.get("checkout_timeout", 60)
+    pool_size = max(1, int(selenium_config.get("pool_size", 4)))
+
+    with _pool_condition:
+        # Session affinity: hand back the driver this session already holds
+        _session_last_used[session_id] = time.monotonic()
+        if session_id in _session_drivers:
+            return _session_drivers[session_id]
+
+    started = time.perf_counter()
+    deadline = time.monotonic() + timeout
+
+    def can_proceed():
+        return bool(_idle_drivers) or _pool_total() < pool_size
+
+    while True:
+        # Sessions that stopped browsing without checking in (e.g. closed Streamlit tabs) free their driver
+        _reap_idle_sessions()
+
+        with _pool_condition:
+            remaining = deadline - time.monotonic()
+            if _pool_condition.wait_for(can_proceed, timeout=max(0, min(remaining, IDLE_REAP_INTERVAL))):
+                wd = None
+                if _idle_drivers:
+                    wd = _idle_drivers.pop()
+                    _session_drivers[session_id] = wd
+                    # Wake the warmer up to replace the driver
+                    _pool_condition.notify_all()
+                else:
+                    # Reserve a slot and launch Chrome outside the lock, so other sessions are not blocked
+                    _pending_creations += 1
+                break
+            if remaining <= IDLE_REAP_INTERVAL:
+                _session_last_used.pop(session_id, None)
+                raise TimeoutError(
+                    f"No WebDriver became available within {timeout} seconds "
+                    f"(pool size is {pool_size}). Try again later or increase selenium_config['pool_size']."
+                )
+
+    if wd is not None:
+        _apply_session_settings(wd, session_id)
+        _record_first_action("warm", started)
+        return wd
+
+    try:
+        wd = _create_web_driver()
+    except Exception:
+        with _pool_condition:
+            _pending_creations -= 1
+            _pool_condition.notify_all()
+        raise
+
+    with _pool_condition:
+        _pending_creations -= 1
+        _session_drivers[session_id] = wd
+    _apply_session_settings(wd, session_id)
+    _record_first_action("cold", started)
+    return wd
+
+
+def _replace_web_driver(wd, session_id):
+    """
+    Quits a session's driver and launches a fresh one for the session in the same pool slot, so
+    the pool never runs more browsers than pool_size meanwhile.
+
+    Parameters:
+        wd: The session's WebDriver instance.
+        session_id: Session holding the driver.
+
+    Returns:
+        The new WebDriver instance.
+    """
+    global _pending_creations
+
+    with _pool_condition:
+        if _session_drivers.get(session_id) is not wd:
+            raise ValueError(f"Session {session_id} does not hold the driver to replace.")
+        # The slot is held like a checkout launching Chrome
+        del _session_drivers[session_id]
+        _pending_creations += 1
+
+    try:
+        wd.quit()
+    except Exception as e:
+        logger.warning("Could not quit the replaced WebDriver: %s", e)
+
+    try:
+        new_wd = _create_web_driver()
+    except Exception:
+        with _pool_condition:
+            _pending_creations -= 1
+            _pool_condition.notify_all()
+        raise
+
+    with _pool_condition:
+        _pending_creations -= 1
+        _session_drivers[session_id] = new_wd
+    return new_wd
+
+
+def _pool_total():
+    # Drivers counting towards pool_size, call with _pool_condition held
+    return len(_idle_drivers) + len(_session_drivers) + _pending_creations + _pending_resets
+
+
+def _reap_idle_sessions():
+    """
+    Checks in the drivers of sessions that have not used them for selenium_config["session_idle_timeout"]
+    seconds, so sessions that never call checkin_web_driver() do not hold pool slots forever.
+    """
+    idle_timeout = selenium_config.get("session_idle_timeout", 900)
+    if not idle_timeout:
+        return
+
+    now = time.monotonic()
+    with _pool_condition:
+        idle_sessions = [
+            session_id for session_id, last_used in _session_last_used.items()
+            if session_id in _session_drivers and now - last_used > idle_timeout
+        ]
+    for session_id in idle_sessions:
+        logger.info("Checking in the WebDriver of session %s, unused for %s seconds.", session_id, idle_timeout)
+        checkin_web_driver(session_id)
+
+
+def _record_first_action(kind, started):
+    stats = _first_action_stats[kind]
+    stats["count"] += 1
+    stats["seconds"] += time.perf_counter() - started
+
+
+def _apply_session_settings(wd, session_id):
+    """
+    Sets a driver handed to a session up: the page instrumentation bundle and the request
+    interception settings (resource policy, HTTP cache). With session_id None, the configured
+    settings are applied (used for warm drivers).
+    """
+    from .instrumentation import install_instrumentation
+    from .resources import apply_resource_policy, get_session_resource_policy
+    from .http_cache import enable_http_cache
+
+    install_instrumentation(wd)
+
+    try:
+        apply_resource_policy(wd, get_session_resource_policy(session_id) if session_id else None)
+    except ValueError:
+        raise
+    except Exception as e:
+        # Blocking resources is an optimization, browse with everything loaded instead
+        logger.warning("Could not apply the resource policy: %s", e)
+
+    try:
+        enable_http_cache(wd)
+    except Exception as e:
+        logger.warning("Could not enable the HTTP cache: %s", e)
+
+
+def checkin_web_driver(session_id=None, quit=False):
+    """
+    Returns a session's WebDriver to the pool, wiped of the session's cookies, storage and tabs.
+
+    Parameters:
+        session_id: Session that holds the driver. Defaults to the current session.
+        quit: Quit the browser instead of keeping it idle for the next session.
+    """
+    from .history_cache import forget_history
+
+    global _pending_resets
+
+    session_id = session_id or get_session_id()
+    _deferred_pages.pop(session_id, None)
+    _watchdog_deadlines.pop(session_id, None)
+    forget_history(session_id)
+
+    with _pool_condition:
+        _session_last_used.pop(session_id, None)
+        wd = _session_drivers.pop(session_id, None)
+        if wd is None:
+            return
+        if not quit:
+            _pending_resets += 1
+
+    if not quit:
+        # The next session must not see this one's logins, storage, history or open page
+        try:
+            _reset_web_driver(wd)
+        except Exception as e:
+            logger.warning("Could not reset WebDriver, quitting it instead: %s", e)
+            quit = True
+        with _pool_condition:
+            _pending_resets -= 1
+            if not quit:
+                _idle_drivers.append(wd)
+            _pool_condition.notify_all()
+    else:
+        with _pool_condition:
+            _pool_condition.notify_all()
+
+    if quit:
+        try:
+            wd.quit()
+        except Exception as e:
+            logger.warning("Could not quit WebDriver: %s", e)
+
+
+def _reset_web_driver(wd):
+    """
+    Wipes what a session left in a driver before it goes back to the pool. Cookies, the browser
+    cache, and the storage of every origin in the history of its tabs are cleared. A fresh
+    about:blank tab then replaces all tabs, which also drops their history and sessionStorage.
+    """
+    from .cdp_driver import CDPDriver
+
+    browser = wd.webdriver if isinstance(wd, CDPDriver) else wd
+    handles = browser.window_handles
+
+    origins = set()
+    for handle in handles:
+        browser.switch_to.window(handle)
+        history = browser.execute_cdp_cmd("Page.getNavigationHistory", {})
+        for entry in history["entries"]:
+            parts = urlparse(entry["url"])
+            if parts.scheme in ("http", "https"):
+                origins.add(f"{parts.scheme}://{parts.netloc}")
+
+    browser.execute_cdp_cmd("Network.clearBrowserCookies", {})
+    browser.execute_cdp_cmd("Network.clearBrowserCache", {})
+    for origin in origins:
+        browser.execute_cdp_cmd("Storage.clearDataForOrigin", {"origin": origin, "storageTypes": "all"})
+
+    browser.switch_to.new_window("tab")
+    fresh_handle = browser.current_window_handle
+    for handle in handles:
+        browser.switch_to.window(handle)
+        browser.close()
+    if isinstance(wd, CDPDriver):
+        wd.switch_to_window(fresh_handle)
+    else:
+        browser.switch_to.window(fresh_handle)
+    forget_page_state(wd)
+
+
+def start_pool_warmer():
+    """
+    Starts the background thread that keeps selenium_config["warm_pool_size"] idle drivers ready.
+
+    Warm drivers are launched, stealthed, instrumented, set up with the configured resource policy
+    and parked on about:blank, so a new session's first checkout returns one instantly. Whenever a
+    warm driver is checked out, the warmer launches a replacement (within pool_size). Calling this
+    again while the warmer runs does nothing.
+    """
+    global _warmer_thread, _warmer_stopped
+
+    with _pool_condition:
+        if _warmer_thread is not None and _warmer_thread.is_alive():
+            return
+        _warmer_stopped = False
+        _warmer_thread = threading.Thread(target=_warm_pool, name="webdriver-warmer", daemon=True)
+        _warmer_thread.start()
+
+
+def _warm_pool():
+    global _pending_creations
+
+    failures = 0
+    while True:
+        with _pool_condition:
+            def needs_driver():
+                if _warmer_stopped:
+                    return True
+                pool_size = max(1, int(selenium_config.get("pool_size", 4)))
+                warm_pool_size = min(int(selenium_config.get("warm_pool_size", 1) or 0), pool_size)
+                return len(_idle_drivers) < warm_pool_size and _pool_total() < pool_size
+
+            _pool_condition.wait_for(needs_driver)
+            if _warmer_stopped:
+                return
+            _pending_creations += 1
+
+        try:
+            wd = _create_web_driver()
+            _apply_session_settings(wd, None)
+            wd.get("about:blank")
+        except Exception as e:
+            with _pool_condition:
+                _pending_creations -= 1
+                _pool_condition.notify_all()
+            failures += 1
+            logger.warning("Could not launch a warm WebDriver: %s", e)
+            # Back off, a broken Chrome setup would otherwise be relaunched in a tight loop
+            time.sleep(min(60, 2 ** failures))
+            continue
+
+        failures = 0
+        with _pool_condition:
+            _pending_creations -= 1
+            if _warmer_stopped:
+                stale = wd
+            else:
+                stale = None
+                _idle_drivers.append(wd)
+            _pool_condition.notify_all()
+        if stale is not None:
+            stale.quit()
+            return
+        logger.debug("Warm WebDriver ready, %d idle.", len(_idle_drivers))
+
+
+def get_pool_stats():
+    """
+    Returns pool statistics: idle, checked out and launching drivers, whether the warmer runs, and
+    the average time to first action (first checkout of a session) with a warm driver and with a
+    cold Chrome launch.
+    """
+    with _pool_condition:
+        stats = {
+            "idle": len(_idle_drivers),
+            "checked_out": len(_session_drivers),
+            "launching": _pending_creations,
+            "resetting": _pending_resets,
+            "warmer_running": _warmer_thread is not None and _warmer_thread.is_alive() and not _warmer_stopped,
+        }
+    for kind, first_action in _first_action_stats.items():
+        stats[f"{kind}_first_actions"] = first_action["count"]
+        stats[f"{kind}_first_action_seconds"] = (
+            round(first_action["seconds"] / first_action["count"], 3) if first_action["count"] else None
+        )
+    return stats
+
+
+def shutdown_web_drivers():
+    """
+    Stops the warmer and quits every driver in the pool, idle or checked out.
+    """
+    global _warmer_stopped
+
+    with _pool_condition:
+        _warmer_stopped = True
+        drivers = _idle_drivers + list(_session_drivers.values())
+        _idle_drivers.clear()
+        _session_drivers.clear()
+        _pool_condition.notify_all()
+
+    for wd in drivers:
+        try:
+            wd.quit()
+        except Exception as e:
+            logger.warning("Could not quit WebDriver: %s", e)
+
+
+def get_web_driver():
+    """
+    Returns the WebDriver of the current browsing session, checking one out of the pool if needed.
+
+    If the session's current page was only read with a plain HTTP request, it is loaded into the
+    browser first, so interactive tools always see the page the agent is on.
+
+    Returns:
+        Selenium WebDriver instance.
+    """
+    wd = checkout_web_driver()
+
+    # Memory watchdog, sampled every sample_interval seconds per session (not on the first call)
+    session_id = get_session_id()
+    deadline = _watchdog_deadlines.get(session_id)
+    if deadline is None or time.monotonic() >= deadline:
+        wd = _watch_web_driver(wd, session_id, sample=deadline is not None)
+
+    if _deferred_pages:
+        page = _deferred_pages.pop(get_session_id(), None)
+        if page is not None:
+            _load_deferred_page(wd, page)
     return wd
 
 
+def _watch_web_driver(wd, session_id, sample=True):
+    from .watchdog import check_web_driver, get_watchdog_settings
+
+    _watchdog_deadlines[session_id] = time.monotonic() + get_watchdog_settings()["sample_interval"]
+    if not sample:
+        return wd
+    try:
+        return check_web_driver(wd, session_id)
+    except Exception as e:
+        logger.warning("Memory watchdog failed: %s", e)
+        # A failed recycle may have quit the driver already, the session then checks out another one
+        return checkout_web_driver(session_id)
+
+
+def defer_page(page, session_id=None):
+    """
+    Makes a page read without the browser the session's current page. The browser only loads it
+    when a tool needs the WebDriver.
+
+    Parameters:
+        page: Page dictionary returned by static_fetch.fetch_static_page().
+        session_id: Browsing session. Defaults to the current session.
+    """
+    _deferred_pages[session_id or get_session_id()] = page
+
+
+def get_deferred_page(session_id=None):
+    """
+    Returns the page the session read without the browser and has not loaded into it yet, or None.
+
+    Parameters:
+        session_id: Browsing session. Defaults to the current session.
+    """
+    return _deferred_pages.get(session_id or get_session_id())
+
+
+def discard_deferred_page(session_id=None):
+    """
+    Forgets the session's deferred page, e.g. before navigating somewhere else.
+
+    Parameters:
+        session_id: Browsing session. Defaults to the current session.
+    """
+    _deferred_pages.pop(session_id or get_session_id(), None)
+
+
+def _load_deferred_page(wd, page):
+    from .readiness import wait_for_page_ready
+
+    logger.info("Loading %s into the browser.", page["url"])
+    wd.get(page["url"])
+    wait_for_page_ready(wd)
+
+
 def set_web_driver(new_wd):
     """
-    Updates the global WebDriver instance and removes pop-ups on the current page.
+    Updates the current session's WebDriver.
+
+    This is only a pointer update: drivers are set up when they are checked out or created, and
+    again by switch_to_window() when they move to another tab.
 
     Parameters:
         new_wd: New WebDriver instance.
     """
-    js_script = """
-    var popUpSelectors = ['modal', 'popup', 'overlay', 'dialog'];
-    popUpSelectors.forEach(function(selector) {
-        var elements = document.querySelectorAll(selector);
-        elements.forEach(function(element) {
-            element.parentNode.removeChild(element);
-        });
-    });
+    with _pool_condition:
+        _session_drivers[get_session_id()] = new_wd
+
+
+def forget_page_state(wd):
     """
+    Forgets everything set up for a driver's current tab: DevTools session, request interception,
+    resource policy, instrumentation, highlights and performance metrics. Each module sets its part
+    up again the next time the driver is used.
 
-    new_wd.execute_script(js_script)
+    Parameters:
+        wd: WebDriver instance, as returned by get_web_driver().
+    """
+    from . import cdp, highlights, instrumentation, interception, resources, watchdog
+
+    for module in (cdp, interception, resources, instrumentation, highlights, watchdog):
+        module.forget_driver(wd)
 
-    if "linkedin.com" in new_wd.current_url:
-        linkedin_js_script = """
-        var linkedinSelectors = ['div.msg-overlay-list-bubble', 'div.ml4.msg-overlay-list-bubble__tablet-height'];
-        linkedinSelectors.forEach(function(selector) {
-            var elements = document.querySelectorAll(selector);
-            elements.forEach(function(element) {
-                element.parentNode.removeChild(element);
-            });
-        });
-        """
-        new_wd.execute_script(linkedin_js_script)
 
-    new_wd.execute_script("document.body.style.zoom='1.2'")
+def switch_to_window(wd, handle):
+    """
+    Moves a driver to another tab, e.g. one opened by a click, and makes it the session's page.
+
+    Instrumentation, request interception and DevTools connections belong to a tab, so they are
+    set up again for the new tab. The DevTools connections to the previous tab are closed, which
+    also stops intercepting its requests.
+
+    Parameters:
+        wd: WebDriver instance, as returned by get_web_driver().
+        handle: Window handle of the tab.
+    """
+    from .cdp_driver import CDPDriver
 
-    global wd
-    wd = new_wd
+    if isinstance(wd, CDPDriver):
+        wd.switch_to_window(handle)
+    else:
+        wd.switch_to.window(handle)
+    forget_page_state(wd)
+
+    _apply_session_settings(wd, get_session_id())
+    set_web_driver(wd)
+
+
+def get_selenium_config():
+    """
+    Returns the current Selenium configuration.
+    """
+    return selenium_config
 
 
 def set_selenium_config(config):
@@ -159,4 +804,4 @@ def set_selenium_config(config):
         config: Dictionary with new Selenium settings.
     """
     global selenium_config
-    selenium_config = config
\ No newline at end of file
+    selenium_config = config
@@ -0,0 +1,333 @@
+import http.cookiejar
+import logging
+import re
+import threading
+import time
+from html.parser import HTMLParser
+from urllib.parse import urlparse
+
+from .selenium import get_selenium_config, get_session_id
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIERED_FETCH_SETTINGS = {
+    "enabled": True,
+    "timeout": 10,  # Seconds for the plain HTTP request
+    "max_bytes": 5 * 1024 * 1024,  # Larger pages go to the browser
+    "min_text_chars": 200,  # Less text than this without JavaScript means the page needs the browser
+    "javascript_host_ttl": 3600,  # Seconds a host that needed JavaScript goes to the browser directly
+}
+
+# Sent with plain HTTP requests, so sites answer like they would to the browser
+REQUEST_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36"
+    ),
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9",
+}
+
+# Ids of the element single-page applications render into
+SPA_ROOT_IDS = {"root", "app", "__next", "__nuxt", "svelte", "main-app"}
+
+# Looked for in the <noscript> text only, page text mentioning JavaScript is not a notice
+JAVASCRIPT_REQUIRED_PATTERN = re.compile(
+    r"(enable|turn on|activate)\s+javascript|javascript\s+(is\s+)?(required|disabled|must be enabled)",
+    re.IGNORECASE,
+)
+
+# Titles of the interstitial pages bot protection serves instead of the page
+CHALLENGE_TITLE_PATTERN = re.compile(
+    r"^(just a moment|checking your browser|attention required|please wait)\b", re.IGNORECASE
+)
+
+# Scripts and forms of bot protection challenges, looked for in the HTML source
+CHALLENGE_MARKER_PATTERN = re.compile(
+    r"challenge-platform|cf-browser-verification|cf_chl_opt|_Incapsula_Resource|px-captcha|ddos-guard",
+    re.IGNORECASE,
+)
+
+SKIPPED_TAGS = {"script", "style", "noscript", "template", "svg", "head"}
+
+# Shared HTTP client with connection pooling, created on first use. It keeps no cookies, the
+# browsing sessions would otherwise share them.
+_http_session = None
+_http_session_lock = threading.Lock()
+
+# Hosts whose pages turned out to need JavaScript -> monotonic time until which they go to the browser directly
+_javascript_hosts = {}
+
+# Tiered fetch statistics, see get_tiered_fetch_stats()
+_fetch_stats = {"static": 0, "escalated": 0, "static_seconds": 0.0, "reasons": {}}
+
+
+def get_tiered_fetch_settings():
+    """
+    Returns the tiered fetch settings: selenium_config["tiered_fetch"] on top of the defaults.
+    """
+    return {**DEFAULT_TIERED_FETCH_SETTINGS, **(get_selenium_config().get("tiered_fetch") or {})}
+
+
+def fetch_static_page(url):
+    """
+    Fetches a page with a plain HTTP request and extracts its text, without starting the browser.
+
+    Parameters:
+        url: URL of the page.
+
+    Returns:
+        A page dictionary with "url" (after redirects), "status", "title", "text" and "reason".
+        "reason" is None when the text is usable as is, otherwise it explains why the page needs
+        the browser (JavaScript rendering, a non-HTML response, an error status...).
+    """
+    settings = get_tiered_fetch_settings()
+    started = time.perf_counter()
+    page = {"url": url, "status": None, "title": "", "text": "", "reason": None}
+
+    host = urlparse(url).hostname
+    if _javascript_hosts.get(host, 0) > time.monotonic():
+        page["reason"] = "site renders its pages with JavaScript"
+        return _record_fetch(page, started)
+    _javascript_hosts.pop(host, None)
+
+    # A site the session logged into or accepted a consent banner on answers differently to the browser
+    if _browser_has_cookies(url):
+        page["reason"] = "browser session has cookies for the site"
+        return _record_fetch(page, started)
+
+    try:
+        response = _get_http_session().get(url, timeout=settings["timeout"], stream=True)
+        page["url"] = response.url
+        page["status"] = response.status_code
+        content_type = response.headers.get("Content-Type", "")
+        content = response.raw.read(settings["max_bytes"] + 1, decode_content=True)
+        response.close()
+    except ImportError:
+        raise
+    except Exception as e:
+        page["reason"] = f"plain HTTP request failed ({type(e).__name__})"
+        return _record_fetch(page, started)
+
+    if response.status_code >= 400:
+        page["reason"] = f"HTTP {response.status_code}"
+    elif "html" not in content_type:
+        page["reason"] = f"not an HTML page ({content_type.split(';')[0] or 'unknown type'})"
+    elif len(content) > settings["max_bytes"]:
+        page["reason"] = "page too large"
+    else:
+        html = content.decode(_detect_charset(content, content_type), errors="replace")
+        page["title"], page["text"], empty_spa_root, noscript_text = extract_page_text(html)
+        page["reason"] = detect_javascript_requirement(
+            page["text"], empty_spa_root, noscript_text, settings,
+            title=page["title"], challenge=bool(CHALLENGE_MARKER_PATTERN.search(html)),
+        )
+        # A single page without much text says little about the rest of the site. The others may
+        # be temporary too (a challenge, a redesign), so the host is tried again after a while.
+        if page["reason"] not in (None, "almost no text without JavaScript"):
+            _javascript_hosts[host] = time.monotonic() + settings["javascript_host_ttl"]
+
+    return _record_fetch(page, started)
+
+
+def extract_page_text(html):
+    """
+    Extracts the visible text of an HTML document, with lxml when it is installed.
+
+    Parameters:
+        html: HTML source.
+
+    Returns:
+        Tuple of (title, text, whether a single-page application root is empty, noscript text).
+    """
+    try:
+        import lxml.html
+    except ImportError:
+        return _extract_page_text_with_html_parser(html)
+
+    try:
+        document = lxml.html.document_fromstring(html)
+    except Exception:
+        # lxml refuses some documents (e.g. empty ones) that html.parser copes with
+        return _extract_page_text_with_html_parser(html)
+
+    title = " ".join((document.findtext(".//title") or "").split())
+    empty_spa_root = any(
+        not element.text_content().strip() and not len(element)
+        for element in document.xpath("//*[@id]")
+        if element.get("id") in SPA_ROOT_IDS
+    )
+    noscript_text = " ".join(element.text_content() for element in document.iter("noscript"))
+
+    for element in document.xpath("//script|//style|//noscript|//template|//svg|//head"):
+        element.drop_tree()
+    body = document.find("body")
+    text = " ".join((body if body is not None else document).text_content().split())
+    return title, text, empty_spa_root, noscript_text
+
+
+def detect_javascript_requirement(text, empty_spa_root, noscript_text, settings=None, title="", challenge=False):
+    """
+    Tells whether a page's static HTML is missing the content that JavaScript would render.
+
+    Parameters:
+        text: Visible text extracted from the static HTML.
+        empty_spa_root: Whether a single-page application root element is empty.
+        noscript_text: Text of the page's <noscript> elements.
+        settings: Tiered fetch settings. Defaults to the configured ones.
+        title: Page title.
+        challenge: Whether the HTML source holds the markers of a bot protection challenge.
+
+    Returns:
+        The reason the page needs the browser, or None if the static text is usable.
+    """
+    settings = settings or get_tiered_fetch_settings()
+    if empty_spa_root:
+        return "single-page application rendered by JavaScript"
+    if challenge or CHALLENGE_TITLE_PATTERN.search(title):
+        return "bot protection challenge"
+    if len(text) < settings["min_text_chars"]:
+        return "almost no text without JavaScript"
+    if JAVASCRIPT_REQUIRED_PATTERN.search(noscript_text) and len(text) < 10 * settings["min_text_chars"]:
+        return "page asks to enable JavaScript"
+    return None
+
+
+def get_tiered_fetch_stats():
+    """
+    Returns tiered fetch statistics: pages read without the browser, pages escalated to it (with
+    the reasons) and the total seconds spent on plain HTTP requests.
+    """
+    stats = dict(_fetch_stats)
+    stats["reasons"] = dict(stats["reasons"])
+    return stats
+
+
+def _get_http_session():
+    global _http_session
+
+    with _http_session_lock:
+        if _http_session is None:
+            try:
+                import requests
+                from requests.adapters import HTTPAdapter
+            except ImportError as e:
+                logger.error("Missing package: %s. Please install the required dependencies.", e)
+                raise ImportError
+
+            session = requests.Session()
+            session.headers.update(REQUEST_HEADERS)
+            # Cookies set during one request's redirects still apply to that request
+            session.cookies.set_policy(_NoCookiesPolicy())
+            adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _http_session = session
+        return _http_session
+
+
+class _NoCookiesPolicy(http.cookiejar.DefaultCookiePolicy):
+    def set_ok(self, cookie, request):
+        return False
+
+    def return_ok(self, cookie, request):
+        return False
+
+
+def _browser_has_cookies(url):
+    from .selenium import _pool_condition, _session_drivers
+
+    with _pool_condition:
+        wd = _session_drivers.get(get_session_id())
+    if wd is None:
+        # Drivers go back to the pool without cookies, a session without one has none
+        return False
+    try:
+        return bool(wd.execute_cdp_cmd("Network.getCookies", {"urls": [url]})["cookies"])
+    except Exception:
+        # The browser is busy or gone, it decides itself
+        return True
+
+
+def _record_fetch(page, started):
+    elapsed = time.perf_counter() - started
+    if page["reason"] is None:
+        _fetch_stats["static"] += 1
+        _fetch_stats["static_seconds"] += elapsed
+        logger.debug("Read %s without the browser in %.0f ms.", page["url"], elapsed * 1000)
+    else:
+        _fetch_stats["escalated"] += 1
+        _fetch_stats["reasons"][page["reason"]] = _fetch_stats["reasons"].get(page["reason"], 0) + 1
+    return page
+
+
+def _detect_charset(content, content_type):
+    # The charset of the header, then of a <meta> tag, then UTF-8 (not the ISO-8859-1 HTTP default)
+    match = re.search(r"charset=[\"']?([\w-]+)", content_type) or re.search(
+        rb"<meta[^>]+charset=[\"']?([\w-]+)", content[:4096], re.IGNORECASE
+    )
+    if match:
+        charset = match.group(1)
+        charset = charset.decode("ascii") if isinstance(charset, bytes) else charset
+        try:
+            "".encode(charset)
+            return charset
+        except LookupError:
+            pass
+    return "utf-8"
+
+
+class _TextExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.title = []
+        self.text = []
+        self.noscript = []
+        self.empty_spa_root = False
+        self._stack = []
+        self._spa_root_depth = None
+        self._spa_root_has_content = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ("br", "img", "input", "meta", "link", "hr", "wbr", "source", "area", "col", "base"):
+            if self._spa_root_depth is not None:
+                self._spa_root_has_content = True
+            return
+        if self._spa_root_depth is not None:
+            self._spa_root_has_content = True
+        elif dict(attrs).get("id") in SPA_ROOT_IDS:
+            self._spa_root_depth = len(self._stack)
+            self._spa_root_has_content = False
+        self._stack.append(tag)
+
+    def handle_endtag(self, tag):
+        if tag not in self._stack:
+            return
+        while self._stack:
+            if self._stack.pop() == tag:
+                break
+        if self._spa_root_depth is not None and len(self._stack) <= self._spa_root_depth:
+            self.empty_spa_root = self.empty_spa_root or not self._spa_root_has_content
+            self._spa_root_depth = None
+
+    def handle_data(self, data):
+        if self._spa_root_depth is not None and data.strip():
+            self._spa_root_has_content = True
+        if "title" in self._stack:
+            self.title.append(data)
+        elif "noscript" in self._stack:
+            self.noscript.append(data)
+        elif not SKIPPED_TAGS.intersection(self._stack):
+            self.text.append(data)
+
+
+def _extract_page_text_with_html_parser(html):
+    extractor = _TextExtractor()
+    extractor.feed(html)
+    extractor.close()
+    return (
+        " ".join("".join(extractor.title).split()),
+        " ".join(" ".join(extractor.text).split()),
+        extractor.empty_spa_root,
+        " ".join(extractor.noscript),
+    )
@@ -0,0 +1,234 @@
+import collections
+import logging
+import time
+import weakref
+
+from .selenium import get_selenium_config
+from .readiness import get_navigation_count
+
+DEFAULT_WATCHDOG_SETTINGS = {
+    "enabled": True,
+    "sample_interval": 30,  # Seconds between two samples of the same session's driver
+    "max_rss_mb": 2048,  # Chrome processes (browser, renderers, GPU) started by the driver
+    "max_js_heap_mb": 768,  # JavaScript heap of the current page
+    "max_navigations": 200,  # Page loads before the driver is replaced anyway
+    "history_size": 120,  # Samples kept per driver for the memory trend
+}
+
+# Cookie fields accepted by Network.setCookies
+COOKIE_PARAMS = ("name", "value", "domain", "path", "secure", "httpOnly", "sameSite", "expires", "priority")
+
+logger = logging.getLogger(__name__)
+
+# Memory samples of each driver, oldest first
+_memory_history = weakref.WeakKeyDictionary()
+
+# Drivers the Performance domain was enabled for
+_performance_enabled = weakref.WeakSet()
+
+# Recycles done by the watchdog, see get_recycle_events()
+_recycle_events = collections.deque(maxlen=200)
+
+_missing_psutil_reported = False
+
+
+def get_watchdog_settings():
+    """
+    Returns the memory watchdog settings: selenium_config["memory_watchdog"] on top of the defaults.
+    """
+    return {**DEFAULT_WATCHDOG_SETTINGS, **(get_selenium_config().get("memory_watchdog") or {})}
+
+
+def sample_memory(wd):
+    """
+    Measures the memory used by a driver's browser and records it in the driver's trend.
+
+    Parameters:
+        wd: Selenium WebDriver instance.
+
+    Returns:
+        Dictionary with the sample time, "rss_mb" of the Chrome process tree (None without psutil),
+        "js_heap_mb" and "dom_nodes" of the current page and the "navigations" so far.
+    """
+    sample = {
+        "time": time.time(),
+        "rss_mb": _process_tree_rss_mb(wd),
+        "js_heap_mb": None,
+        "dom_nodes": None,
+        "navigations": get_navigation_count(wd),
+    }
+
+    try:
+        if wd not in _performance_enabled:
+            wd.execute_cdp_cmd("Performance.enable", {})
+            _performance_enabled.add(wd)
+        metrics = {m["name"]: m["value"] for m in wd.execute_cdp_cmd("Performance.getMetrics", {})["metrics"]}
+        sample["js_heap_mb"] = round(metrics.get("JSHeapUsedSize", 0) / 2**20, 1)
+        sample["dom_nodes"] = int(metrics.get("Nodes", 0))
+    except Exception as e:
+        logger.debug("Could not read the page metrics: %s", e)
+
+    settings = get_watchdog_settings()
+    history = _memory_history.get(wd)
+    if history is None or history.maxlen != settings["history_size"]:
+        history = _memory_history[wd] = collections.deque(history or (), maxlen=settings["history_size"])
+    history.append(sample)
+    return sample
+
+
+def get_recycle_reason(sample, settings=None):
+    """
+    Tells whether a memory sample crosses one of the watchdog thresholds.
+
+    Parameters:
+        sample: Dictionary returned by sample_memory().
+        settings: Watchdog settings. Defaults to the configured ones.
+
+    Returns:
+        A description of the exceeded threshold, or None.
+    """
+    settings = settings or get_watchdog_settings()
+    if sample["rss_mb"] is not None and sample["rss_mb"] > settings["max_rss_mb"]:
+        return f"browser memory {sample['rss_mb']:.0f} MB > {settings['max_rss_mb']} MB"
+    if sample["js_heap_mb"] is not None and sample["js_heap_mb"] > settings["max_js_heap_mb"]:
+        return f"JavaScript heap {sample['js_heap_mb']:.0f} MB > {settings['max_js_heap_mb']} MB"
+    if settings["max_navigations"] and sample["navigations"] >= settings["max_navigations"]:
+        return f"{sample['navigations']} navigations"
+    return None
+
+
+def check_web_driver(wd, session_id):
+    """
+    Samples a session's driver and recycles it if it crossed a threshold.
+
+    Parameters:
+        wd: The session's WebDriver instance.
+        session_id: Session holding the driver.
+
+    Returns:
+        The driver to use from now on: wd itself, or its replacement.
+    """
+    settings = get_watchdog_settings()
+    if not settings["enabled"]:
+        return wd
+
+    sample = sample_memory(wd)
+    reason = get_recycle_reason(sample, settings)
+    if reason is None:
+        return wd
+    return recycle_web_driver(wd, session_id, reason, sample)
+
+
+def recycle_web_driver(wd, session_id, reason="manual", sample=None):
+    """
+    Replaces a session's driver with a fresh browser on the same page.
+
+    Cookies of all domains, the current URL and the scroll position are carried over. The old
+    browser is quit before the new one starts, and its pool slot is held for the new one, so a
+    recycle never runs more browsers than selenium_config["pool_size"]. Highlights are not carried
+    over, element numbers must be highlighted again.
+
+    Parameters:
+        wd: The session's WebDriver instance.
+        session_id: Session holding the driver.
+        reason: Why the driver is recycled, recorded in the recycle events.
+        sample: Last memory sample of the driver, recorded in the recycle events.
+
+    Returns:
+        The new WebDriver instance.
+    """
+    from .readiness import wait_for_page_ready
+    from .selenium import _apply_session_settings, _replace_web_driver
+
+    started = time.perf_counter()
+    url = wd.current_url
+    scroll = wd.execute_script("return [window.scrollX, window.scrollY];")
+    cookies = wd.execute_cdp_cmd("Network.getAllCookies", {})["cookies"]
+
+    new_wd = _replace_web_driver(wd, session_id)
+    _apply_session_settings(new_wd, session_id)
+
+    cookie_params = [
+        {key: cookie[key] for key in COOKIE_PARAMS if key in cookie and not (key == "expires" and cookie.get("session"))}
+        for cookie in cookies
+    ]
+    if cookie_params:
+        new_wd.execute_cdp_cmd("Network.setCookies", {"cookies": cookie_params})
+
+    if url.startswith(("http://", "https://")):
+        new_wd.get(url)
+        wait_for_page_ready(new_wd)
+        new_wd.execute_script("window.scrollTo(arguments[0], arguments[1]);", *scroll)
+
+    event = {
+        "time": time.time(),
+        "session_id": session_id,
+        "reason": reason,
+        "url": url,
+        "cookies": len(cookie_params),
+        "seconds": round(time.perf_counter() - started, 3),
+        "sample": sample,
+    }
+    _recycle_events.append(event)
+    logger.info("Recycled the WebDriver of session %s (%s) in %.1fs.", session_id, reason, event["seconds"])
+    return new_wd
+
+
+def get_recycle_events():
+    """
+    Returns the recycles done so far (oldest first): time, session, reason, URL, cookies carried
+    over, seconds it took and the memory sample that triggered it.
+    """
+    return [dict(event) for event in _recycle_events]
+
+
+def forget_driver(wd):
+    """
+    Forgets that the Performance domain was enabled for a driver's page, e.g. once the driver
+    moved to another tab.
+
+    Parameters:
+        wd: Selenium WebDriver instance.
+    """
+    _performance_enabled.discard(wd)
+
+
+def get_memory_trends():
+    """
+    Returns the memory samples of every live driver, keyed by the driver's session id (or
+    "idle" for drivers not checked out), oldest sample first.
+    """
+    from .selenium import _pool_condition, _session_drivers
+
+    with _pool_condition:
+        sessions = {id(wd): session_id for session_id, wd in _session_drivers.items()}
+    trends = {}
+    for wd, history in list(_memory_history.items()):
+        trends.setdefault(sessions.get(id(wd), "idle"), []).extend(dict(sample) for sample in history)
+    return trends
+
+
+def _process_tree_rss_mb(wd):
+    global _missing_psutil_reported
+
+    try:
+        import psutil
+    except ImportError as e:
+        if not _missing_psutil_reported:
+            _missing_psutil_reported = True
+            logger.warning("Missing package: %s. Install psutil to watch the browser memory.", e)
+        return None
+
+    try:
+        driver_process = psutil.Process(wd.service.process.pid)
+        processes = [driver_process] + driver_process.children(recursive=True)
+    except (AttributeError, psutil.Error):
+        return None
+
+    rss = 0
+    for process in processes:
+        try:
+            rss += process.memory_info().rss
+        except psutil.Error:
+            pass
+    return round(rss / 2**20, 1)